@@ -0,0 +1,27 @@
+"""add articles (upload_time, id) index for keyset pagination
+
+Revision ID: 3f2a9c7d41e5
+Revises: add_memory_summary
+Create Date: 2025-10-20 10:12:31.204518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f2a9c7d41e5'
+down_revision: Union[str, None] = 'add_memory_summary'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 文档列表按 (upload_time DESC, id DESC) 游标分页
+    op.create_index('ix_articles_upload_time_id', 'articles', ['upload_time', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_articles_upload_time_id', table_name='articles')
@@ -0,0 +1,38 @@
+"""add article_review_stats table
+
+Revision ID: 5b7e2d9f0c14
+Revises: 8d51b0e3c6a2
+Create Date: 2025-10-22 15:03:47.118250
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b7e2d9f0c14'
+down_revision: Union[str, None] = '8d51b0e3c6a2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 审查完成时写入的每篇文档统计（句子数、违规数、标签分布、耗时）
+    op.create_table(
+        'article_review_stats',
+        sa.Column('article_id', sa.Integer(), nullable=False),
+        sa.Column('total_sentences', sa.Integer(), nullable=False),
+        sa.Column('reviewed_sentences', sa.Integer(), nullable=False),
+        sa.Column('violation_count', sa.Integer(), nullable=False),
+        sa.Column('label_histogram', sa.JSON(), nullable=False),
+        sa.Column('review_duration_ms', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['article_id'], ['articles.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('article_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('article_review_stats')
@@ -0,0 +1,33 @@
+"""add composite indexes for sentence/chat hot paths
+
+Revision ID: 8d51b0e3c6a2
+Revises: d83b7e2f4c61
+Create Date: 2025-10-21 09:40:02.517733
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d51b0e3c6a2'
+down_revision: Union[str, None] = 'd83b7e2f4c61'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 审查/详情/全文：WHERE article_id = ? [AND has_problem = 1]
+    op.create_index('ix_sentences_article_id_has_problem', 'sentences', ['article_id', 'has_problem'], unique=False)
+    # 会话消息：WHERE session_id = ? ORDER BY created_at
+    op.create_index('ix_chat_messages_session_id_created_at', 'chat_messages', ['session_id', 'created_at'], unique=False)
+    # 会话列表：WHERE user_id = ? ORDER BY updated_at DESC
+    op.create_index('ix_chat_sessions_user_id_updated_at', 'chat_sessions', ['user_id', 'updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_chat_sessions_user_id_updated_at', table_name='chat_sessions')
+    op.drop_index('ix_chat_messages_session_id_created_at', table_name='chat_messages')
+    op.drop_index('ix_sentences_article_id_has_problem', table_name='sentences')
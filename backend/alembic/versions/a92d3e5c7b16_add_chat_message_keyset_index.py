@@ -0,0 +1,31 @@
+"""add chat_messages (session_id, created_at, id) index for tail-first paging
+
+Revision ID: a92d3e5c7b16
+Revises: f7c2a94e1d58
+Create Date: 2025-10-26 09:41:18.305724
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a92d3e5c7b16'
+down_revision: Union[str, None] = 'f7c2a94e1d58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 会话消息按 (created_at DESC, id DESC) 游标分页；新索引覆盖原 (session_id, created_at) 索引的前缀
+    op.create_index(
+        'ix_chat_messages_session_id_created_at_id', 'chat_messages', ['session_id', 'created_at', 'id'], unique=False
+    )
+    op.drop_index('ix_chat_messages_session_id_created_at', table_name='chat_messages')
+
+
+def downgrade() -> None:
+    op.create_index('ix_chat_messages_session_id_created_at', 'chat_messages', ['session_id', 'created_at'], unique=False)
+    op.drop_index('ix_chat_messages_session_id_created_at_id', table_name='chat_messages')
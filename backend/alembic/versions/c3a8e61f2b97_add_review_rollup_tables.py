@@ -0,0 +1,48 @@
+"""add review analytics rollup tables
+
+Revision ID: c3a8e61f2b97
+Revises: 5b7e2d9f0c14
+Create Date: 2025-10-23 11:26:55.730914
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3a8e61f2b97'
+down_revision: Union[str, None] = '5b7e2d9f0c14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 违规标签周汇总
+    op.create_table(
+        'rollup_label_weekly',
+        sa.Column('week_start', sa.Date(), nullable=False),
+        sa.Column('annotation_id', sa.Integer(), nullable=False),
+        sa.Column('violation_count', sa.Integer(), nullable=False),
+        sa.Column('article_count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('week_start', 'annotation_id')
+    )
+    # 审查月汇总（按风险等级）
+    op.create_table(
+        'rollup_review_monthly',
+        sa.Column('month_start', sa.Date(), nullable=False),
+        sa.Column('risk_level', sa.String(length=20), nullable=False),
+        sa.Column('article_count', sa.Integer(), nullable=False),
+        sa.Column('sentence_count', sa.Integer(), nullable=False),
+        sa.Column('violation_count', sa.Integer(), nullable=False),
+        sa.Column('timed_article_count', sa.Integer(), nullable=False),
+        sa.Column('total_review_ms', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('month_start', 'risk_level')
+    )
+    # 回填请执行：python -m app.services.analytics_service backfill
+
+
+def downgrade() -> None:
+    op.drop_table('rollup_review_monthly')
+    op.drop_table('rollup_label_weekly')
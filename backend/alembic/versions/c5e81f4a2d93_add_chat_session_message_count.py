@@ -0,0 +1,33 @@
+"""add chat_sessions.message_count
+
+Revision ID: c5e81f4a2d93
+Revises: a92d3e5c7b16
+Create Date: 2025-10-26 14:20:53.617092
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5e81f4a2d93'
+down_revision: Union[str, None] = 'a92d3e5c7b16'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 会话消息数（随消息写入原子+1），按现有消息回填
+    op.add_column('chat_sessions', sa.Column('message_count', sa.Integer(), nullable=False, server_default='0'))
+    op.execute(
+        "UPDATE chat_sessions SET message_count = ("
+        "SELECT COUNT(*) FROM chat_messages "
+        "WHERE chat_messages.session_id = chat_sessions.session_id"
+        ")"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('chat_sessions', 'message_count')
@@ -0,0 +1,26 @@
+"""add articles.review_time index
+
+Revision ID: d83b7e2f4c61
+Revises: 3f2a9c7d41e5
+Create Date: 2025-10-20 16:05:47.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd83b7e2f4c61'
+down_revision: Union[str, None] = '3f2a9c7d41e5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 检索索引按审查完成时间增量刷新句子标签
+    op.create_index('ix_articles_review_time', 'articles', ['review_time'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_articles_review_time', table_name='articles')
@@ -0,0 +1,41 @@
+"""add article response cache and review model version
+
+Revision ID: e4f19b2d7a30
+Revises: c3a8e61f2b97
+Create Date: 2025-10-24 09:41:12.508317
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4f19b2d7a30'
+down_revision: Union[str, None] = 'c3a8e61f2b97'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 审查结果对应的模型版本（历史数据为空，ETag计算时回退当前配置的版本）
+    op.add_column('article_review_stats', sa.Column('model_version', sa.String(length=64), nullable=True))
+    # 已审查文档的响应缓存（含预压缩正文）
+    op.create_table(
+        'article_response_cache',
+        sa.Column('article_id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=32), nullable=False),
+        sa.Column('etag', sa.String(length=80), nullable=False),
+        sa.Column('body', sa.LargeBinary(length=2 ** 32 - 1), nullable=False),
+        sa.Column('body_gzip', sa.LargeBinary(length=2 ** 32 - 1), nullable=False),
+        sa.Column('body_br', sa.LargeBinary(length=2 ** 32 - 1), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['article_id'], ['articles.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('article_id', 'kind')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('article_response_cache')
+    op.drop_column('article_review_stats', 'model_version')
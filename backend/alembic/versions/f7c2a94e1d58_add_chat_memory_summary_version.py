@@ -0,0 +1,36 @@
+"""add chat memory summary version
+
+Revision ID: f7c2a94e1d58
+Revises: e4f19b2d7a30
+Create Date: 2025-10-25 15:02:37.184226
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f7c2a94e1d58'
+down_revision: Union[str, None] = 'e4f19b2d7a30'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 摘要版本号（每次更新+1）与摘要已覆盖到的最后一条消息ID
+    op.add_column('chat_sessions', sa.Column('memory_summary_version', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('chat_sessions', sa.Column('memory_summarized_message_id', sa.Integer(), nullable=True))
+    # 已有摘要的会话视为覆盖到当前最后一条消息，避免上线后重新摘要全部历史
+    op.execute(
+        "UPDATE chat_sessions SET memory_summarized_message_id = ("
+        "SELECT MAX(chat_messages.id) FROM chat_messages "
+        "WHERE chat_messages.session_id = chat_sessions.session_id"
+        ") WHERE memory_summary IS NOT NULL"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('chat_sessions', 'memory_summarized_message_id')
+    op.drop_column('chat_sessions', 'memory_summary_version')
@@ -0,0 +1,53 @@
+"""
+统计分析API端点（读取按周/按月汇总表，不扫描文档与句子明细）
+"""
+from datetime import date
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from app.models import get_read_db
+from app.services import analytics_service
+
+router = APIRouter(tags=["统计分析"])
+
+
+@router.get("/labels/weekly", summary="每周各违规标签数量趋势")
+def label_weekly_trend(
+        start: Optional[date] = Query(None, description="起始日期（含）"),
+        end: Optional[date] = Query(None, description="结束日期（含）"),
+        annotation_id: Optional[int] = Query(None, ge=1, le=54, description="违规标签（1-54）"),
+        db: Session = Depends(get_read_db)
+) -> Dict[str, Any]:
+    return {
+        "success": True,
+        "msg": "标签趋势查询成功",
+        "data": analytics_service.label_weekly_trend(db, start, end, annotation_id)
+    }
+
+
+@router.get("/risk/monthly", summary="每月风险等级分布")
+def risk_monthly_distribution(
+        start: Optional[date] = Query(None, description="起始日期（含）"),
+        end: Optional[date] = Query(None, description="结束日期（含）"),
+        db: Session = Depends(get_read_db)
+) -> Dict[str, Any]:
+    return {
+        "success": True,
+        "msg": "风险分布查询成功",
+        "data": analytics_service.risk_monthly_distribution(db, start, end)
+    }
+
+
+@router.get("/review-time/monthly", summary="每月平均审查耗时与审查量")
+def review_time_monthly(
+        start: Optional[date] = Query(None, description="起始日期（含）"),
+        end: Optional[date] = Query(None, description="结束日期（含）"),
+        db: Session = Depends(get_read_db)
+) -> Dict[str, Any]:
+    return {
+        "success": True,
+        "msg": "审查耗时查询成功",
+        "data": analytics_service.review_time_monthly(db, start, end)
+    }
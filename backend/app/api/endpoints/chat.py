@@ -3,8 +3,9 @@
 """
 import os
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, Response
 from fastapi.responses import StreamingResponse, FileResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 import json
 
@@ -14,8 +15,11 @@ from app.models.schemas import (
     FileUploadResponse, FileAnalysisRequest, FileAnalysisResponse,
     ChatSettingsCreate, ChatSettingsSchema
 )
+from app.services.async_chat_service import AsyncChatService
+from app.services.chat_export_service import EXPORT_FORMATS, stream_conversation, stream_user_archive
 from app.services.chat_service import ChatService
-from app.models import get_db
+from app.models import AsyncSessionLocal, get_async_db, get_db, get_read_db, serializers
+from app.utils.json_response import FastJSONResponse
 
 router = APIRouter(prefix="/api/chat", tags=["chat"])
 
@@ -33,12 +37,7 @@ async def create_conversation(
         chat_service = ChatService(db)
         session = chat_service.create_session(session_data, user_id)
         
-        # 添加消息数量
-        message_count = chat_service.get_message_count(session.session_id)
-        session_dict = session.__dict__.copy()
-        session_dict['message_count'] = message_count
-        
-        return ChatSessionSchema(**session_dict)
+        return FastJSONResponse(content=serializers.chat_session_to_dict(session))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -47,22 +46,17 @@ async def create_conversation(
 async def get_conversations(
     user_id: Optional[str] = Query(None, description="用户ID"),
     limit: int = Query(50, ge=1, le=100, description="返回数量限制"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """获取用户的会话列表"""
     try:
         chat_service = ChatService(db)
         sessions = chat_service.get_user_sessions(user_id, limit)
         
-        # 为每个会话添加消息数量
-        result = []
-        for session in sessions:
-            message_count = chat_service.get_message_count(session.session_id)
-            session_dict = session.__dict__.copy()
-            session_dict['message_count'] = message_count
-            result.append(ChatSessionSchema(**session_dict))
+        # 消息数量取自会话上的计数列，不再逐个会话 COUNT
+        result = [serializers.chat_session_to_dict(session) for session in sessions]
         
-        return result
+        return FastJSONResponse(content=result)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -70,7 +64,7 @@ async def get_conversations(
 @router.get("/conversations/{conversation_id}", response_model=ChatSessionSchema)
 async def get_conversation(
     conversation_id: str,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """获取特定会话信息"""
     try:
@@ -80,12 +74,7 @@ async def get_conversation(
         if not session:
             raise HTTPException(status_code=404, detail="会话不存在")
         
-        # 添加消息数量
-        message_count = chat_service.get_message_count(session.session_id)
-        session_dict = session.__dict__.copy()
-        session_dict['message_count'] = message_count
-        
-        return ChatSessionSchema(**session_dict)
+        return FastJSONResponse(content=serializers.chat_session_to_dict(session))
     except HTTPException:
         raise
     except Exception as e:
@@ -136,15 +125,22 @@ async def delete_conversation(
 # -------------------------- 消息管理 --------------------------
 
 @router.get("/conversations/{conversation_id}/messages", response_model=List[ChatMessageSchema])
-async def get_conversation_messages(
+def get_conversation_messages(
     conversation_id: str,
+    response: Response,
     limit: int = Query(100, ge=1, le=500, description="返回数量限制"),
-    db: Session = Depends(get_db)
+    before: Optional[str] = Query(None, description="分页游标（上一页响应头 X-Next-Cursor 的值），返回更早的消息"),
+    db: Session = Depends(get_read_db)
 ):
-    """获取特定会话的消息列表"""
+    """
+    获取会话消息：默认返回最近的 limit 条（按时间正序）；
+    还有更早的消息时响应头带 X-Next-Cursor，作为 before 参数继续向前翻页
+    """
     try:
         chat_service = ChatService(db)
-        messages = chat_service.get_session_messages(conversation_id, limit)
+        messages, next_cursor = chat_service.get_message_page(conversation_id, limit, before)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
         
         return [ChatMessageSchema(**msg.__dict__) for msg in messages]
     except Exception as e:
@@ -154,12 +150,12 @@ async def get_conversation_messages(
 @router.post("/message", response_model=ChatResponse)
 async def send_message(
     request: ChatRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """发送消息并获取AI回复"""
+    """发送消息并获取AI回复（异步会话 + 异步模型调用，不阻塞事件循环）"""
     try:
-        chat_service = ChatService(db)
-        response = chat_service.send_message(request)
+        chat_service = AsyncChatService(db)
+        response = await chat_service.send_message(request)
         
         if not response.success:
             raise HTTPException(status_code=400, detail=response.message)
@@ -171,42 +167,40 @@ async def send_message(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/stream")
-async def send_message_stream(
-    request: ChatRequest,
-    db: Session = Depends(get_db)
-):
-    """流式发送消息"""
+async def _sse_frames(request: ChatRequest):
+    """
+    把异步聊天流包装为SSE帧：模型每返回一段增量就立即发送
+    数据库会话在生成器内部打开（依赖注入的会话会在响应开始发送前关闭）
+    """
     try:
-        chat_service = ChatService(db)
-        
-        def generate():
-            try:
-                for chunk in chat_service.send_message_stream(request):
-                    yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
-                yield "data: [DONE]\n\n"
-            except Exception as e:
-                error_chunk = {
-                    "content": f"错误: {str(e)}",
-                    "session_id": request.session_id or "",
-                    "message_id": 0
-                }
-                yield f"data: {json.dumps(error_chunk, ensure_ascii=False)}\n\n"
-                yield "data: [DONE]\n\n"
-        
-        return StreamingResponse(
-            generate(),
-            media_type="text/event-stream",
-            headers={
-                "Cache-Control": "no-cache",
-                "Connection": "keep-alive",
-                "Content-Type": "text/event-stream",
-                # 禁用反向代理（如 Nginx）的缓冲，确保真正流式
-                "X-Accel-Buffering": "no"
-            }
-        )
+        async with AsyncSessionLocal() as db:
+            async for chunk in AsyncChatService(db).send_message_stream(request):
+                yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+        yield "data: [DONE]\n\n"
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        error_chunk = {
+            "content": f"错误: {str(e)}",
+            "session_id": request.session_id or "",
+            "message_id": 0
+        }
+        yield f"data: {json.dumps(error_chunk, ensure_ascii=False)}\n\n"
+        yield "data: [DONE]\n\n"
+
+
+@router.post("/stream")
+async def send_message_stream(request: ChatRequest):
+    """流式发送消息"""
+    return StreamingResponse(
+        _sse_frames(request),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "Content-Type": "text/event-stream",
+            # 禁用反向代理（如 Nginx）的缓冲，确保真正流式
+            "X-Accel-Buffering": "no"
+        }
+    )
 
 
 # -------------------------- 文件上传和分析 --------------------------
@@ -263,7 +257,7 @@ async def analyze_file(
 @router.get("/attachments/{attachment_id}")
 async def download_attachment(
     attachment_id: str,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """下载附件"""
     try:
@@ -292,7 +286,7 @@ async def download_attachment(
 @router.get("/settings")
 async def get_chat_settings(
     user_id: Optional[str] = Query(None, description="用户ID"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """获取聊天设置"""
     try:
@@ -328,52 +322,50 @@ async def update_chat_settings(
 # -------------------------- 搜索和导出 --------------------------
 
 @router.get("/search")
-async def search_conversations(
+def search_conversations(
     q: str = Query(..., description="搜索关键词"),
     user_id: Optional[str] = Query(None, description="用户ID"),
     limit: int = Query(20, ge=1, le=100, description="返回数量限制"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
-    """搜索会话"""
+    """按消息内容与标题搜索会话（命中多的在前，附带命中消息片段）"""
     try:
         chat_service = ChatService(db)
-        sessions = chat_service.search_conversations(q, user_id, limit)
-        
-        # 为每个会话添加消息数量
-        result = []
-        for session in sessions:
-            message_count = chat_service.get_message_count(session.session_id)
-            session_dict = session.__dict__.copy()
-            session_dict['message_count'] = message_count
-            result.append(ChatSessionSchema(**session_dict))
-        
-        return result
+        result = chat_service.search_conversations(q, user_id, limit)
+        return FastJSONResponse(content=result)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/conversations/{conversation_id}/export")
-async def export_conversation(
+def export_conversation(
     conversation_id: str,
-    format: str = Query("json", regex="^(json|txt)$", description="导出格式"),
-    db: Session = Depends(get_db)
+    format: str = Query("json", regex="^(json|ndjson|txt)$", description="导出格式"),
+    db: Session = Depends(get_read_db)
 ):
-    """导出会话"""
-    try:
-        chat_service = ChatService(db)
-        content = chat_service.export_conversation(conversation_id, format)
-        
-        if format == "json":
-            media_type = "application/json"
-            filename = f"conversation_{conversation_id}.json"
-        else:
-            media_type = "text/plain"
-            filename = f"conversation_{conversation_id}.txt"
-        
-        return StreamingResponse(
-            iter([content]),
-            media_type=media_type,
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
-        )
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    """导出会话（分批读取消息、边读边写，不限消息条数）"""
+    chat_service = ChatService(db)
+    if not chat_service.get_session(conversation_id):
+        raise HTTPException(status_code=400, detail="会话不存在")
+
+    filename = f"conversation_{conversation_id}.{format}"
+    return StreamingResponse(
+        stream_conversation(db.get_bind(), conversation_id, format),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+
+@router.get("/export")
+def export_user_conversations(
+    user_id: str = Query(..., description="用户ID"),
+    format: str = Query("json", regex="^(json|ndjson|txt)$", description="每个会话文件的导出格式"),
+    db: Session = Depends(get_read_db)
+):
+    """把用户的全部会话导出为 zip（流式生成，每个会话一个文件）"""
+    filename = f"conversations_{user_id}.zip"
+    return StreamingResponse(
+        stream_user_archive(db.get_bind(), user_id, format),
+        media_type="application/zip",
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
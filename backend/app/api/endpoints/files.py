@@ -1,14 +1,21 @@
 from pathlib import Path  # 新增：统一文件操作风格
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Query  # 新增Query：参数验证
+from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException, Query, BackgroundTasks, Request  # 新增Query：参数验证
 from sqlalchemy.orm import Session
-from typing import Optional, Dict, Any  # 优化类型注解
+from typing import Optional, Dict, Any, List  # 优化类型注解
 
 # 导入Pydantic Schema（用于过滤敏感字段，需提前在app/models/schemas.py定义）
-from app.models import get_db, schemas
+from app.models import get_db, get_read_db, schemas, serializers
 # 导入数据库模型（仅用于数据库操作，不直接返回）
 from app.models.db_models import Article, Sentence, Annotation
 # 导入优化后的文件服务
+from app.utils.json_response import FastJSONResponse
 from app.services.file_service import save_uploaded_file, extract_sentences_from_docx, read_full_doc_content, extract_sentences_with_position
+from app.services.bulk_upload_service import bulk_upload
+from app.services import article_list_service, review_cache_service
+from app.services.search_service import search_index
+from app.services.near_duplicate_service import near_duplicate_index
+from app.services.article_delete_service import delete_articles
+from app.services.review_service import run_review_tasks
 
 
 # 创建路由实例（tags用于自动文档分类）
@@ -64,15 +71,16 @@ def upload_file(
             ]
             db.add_all(sentence_objs)
             db.commit()
+        article_list_service.article_count_cache.invalidate()
+        search_index.on_ingest(db)  # 增量更新检索索引
+        near_duplicate_index.on_ingest(db)  # 增量更新近似重复条款索引
 
-        # 4. 核心优化：用Pydantic Schema过滤敏感字段（不返回服务器文件路径）
-        article_response = schemas.ArticleResponseSchema.from_orm(article_db)
-
-        return {
+        # 4. 按响应Schema字段过滤敏感信息（不返回服务器文件路径）
+        return FastJSONResponse(content={
             "success": True,
             "msg": "文件上传成功，等待审查",
-            "data": article_response.dict()  # 转换为字典返回，前端易处理
-        }
+            "data": serializers.article_to_dict(article_db)
+        })
 
     except HTTPException as e:
         # 已知错误（如文件类型/大小错误），直接抛出
@@ -86,37 +94,85 @@ def upload_file(
         )
 
 
-@router.get("/list", summary="获取文档列表（分页+关键词搜索）")
+@router.post("/upload/batch", summary="批量上传文件（多文件或zip压缩包，并行解析）")
+def upload_files_batch(
+        background_tasks: BackgroundTasks,
+        files: List[UploadFile] = File(..., description="上传文件列表（docx/pdf，或包含它们的zip压缩包）"),
+        enqueue_review: bool = Form(False, description="上传成功后是否直接加入审查队列"),
+        db: Session = Depends(get_db)
+) -> Dict[str, Any]:
+    """
+    批量上传并初始化：
+    1. 逐个分块保存文件（zip压缩包自动展开，单文件最大10MB）
+    2. 线程池并行完成PDF转换和句子提取
+    3. 分批事务写入Article/Sentence
+    4. 可选：将上传成功的文档一次性加入审查队列
+    单个文件失败不影响其他文件，结果逐个返回
+    """
+    items = bulk_upload(db, files, MAX_FILE_SIZE)
+    article_list_service.article_count_cache.invalidate()
+    search_index.on_ingest(db)  # 增量更新检索索引
+    near_duplicate_index.on_ingest(db)  # 增量更新近似重复条款索引
+    results = [item.to_result() for item in items]
+    succeeded_ids = [item.article.id for item in items if item.article is not None]
+
+    if enqueue_review and succeeded_ids:
+        db.query(Article).filter(Article.id.in_(succeeded_ids)).update(
+            {Article.status: "审查中", Article.review_progress: 0},
+            synchronize_session=False
+        )
+        db.commit()
+        background_tasks.add_task(run_review_tasks, article_ids=succeeded_ids)
+        for result in results:
+            if result["success"]:
+                result["data"]["status"] = "审查中"
+
+    failed = len(results) - len(succeeded_ids)
+    return FastJSONResponse(content={
+        "success": True,
+        "msg": f"批量上传完成：成功{len(succeeded_ids)}个，失败{failed}个",
+        "data": {
+            "total": len(results),
+            "succeeded": len(succeeded_ids),
+            "failed": failed,
+            "review_enqueued": bool(enqueue_review and succeeded_ids),
+            "results": results
+        }
+    })
+
+
+@router.get("/list", summary="获取文档列表（游标分页+关键词搜索）")
 def get_article_list(
-        db: Session = Depends(get_db),
-        page: int = Query(MIN_PAGE, description="页码", ge=MIN_PAGE),  # 新增：验证页码≥1
+        db: Session = Depends(get_read_db),
+        page: int = Query(MIN_PAGE, description="页码（未传cursor时生效）", ge=MIN_PAGE),  # 新增：验证页码≥1
         page_size: int = Query(10, description="每页数量", ge=MIN_PAGE_SIZE, le=MAX_PAGE_SIZE),  # 验证数量范围
-        keyword: Optional[str] = Query(None, description="搜索关键词（匹配文件名）")
+        keyword: Optional[str] = Query(None, description="搜索关键词（匹配文件名）"),
+        cursor: Optional[str] = Query(None, description="分页游标（上一页返回的next_cursor，传入后忽略page）")
 ) -> Dict[str, Any]:
     """
     分页获取所有文档，支持关键词搜索：
     - 关键词：模糊匹配文件名（忽略空格）
-    - 排序：按上传时间倒序（最新上传在前）
-    - 分页：默认10条/页，最大100条/页
+    - 排序：按上传时间倒序（最新上传在前），同一时间按ID倒序
+    - 分页：默认10条/页，最大100条/页；推荐用next_cursor翻页（不随页码变深而变慢）
+    - 总数：来自缓存（过期后后台刷新），可能短暂落后于实际数量
     """
-    # 1. 构建查询条件（基础查询+关键词过滤）
-    query = db.query(Article)
-    if keyword and keyword.strip():
-        # 关键词非空：模糊匹配文件名（不区分大小写，需数据库支持，如MySQL的LIKE）
-        query = query.filter(Article.name.ilike(f"%{keyword.strip()}%"))
-
-    # 2. 计算分页参数+执行查询
-    total = query.count()  # 总文档数
-    skip = (page - 1) * page_size  # 跳过的记录数
-    articles_db = query.order_by(Article.upload_time.desc()).offset(skip).limit(page_size).all()
-
-    # 3. 过滤敏感字段：用Schema转换所有记录
-    articles_response = [
-        schemas.ArticleResponseSchema.from_orm(art).dict()
-        for art in articles_db
-    ]
+    keyword = keyword.strip() if keyword and keyword.strip() else None
 
-    return {
+    # 1. 取一页数据（游标分页优先，兼容页码分页）
+    try:
+        articles_db, next_cursor = article_list_service.fetch_article_page(
+            db, page_size, keyword=keyword, cursor=cursor, page=page
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # 2. 总文档数（缓存值，避免每页都全表COUNT）
+    total = article_list_service.article_count_cache.get(db, keyword)
+
+    # 3. 过滤敏感字段：按响应Schema字段直接转dict（跳过Pydantic校验与jsonable_encoder）
+    articles_response = serializers.articles_to_dicts(articles_db)
+
+    return FastJSONResponse(content={
         "success": True,
         "msg": "文档列表查询成功",
         "data": {
@@ -125,16 +181,17 @@ def get_article_list(
                 "page": page,
                 "page_size": page_size,
                 "total": total,
-                "total_pages": (total + page_size - 1) // page_size  # 向上取整计算总页数
+                "total_pages": (total + page_size - 1) // page_size,  # 向上取整计算总页数
+                "next_cursor": next_cursor
             }
         }
-    }
+    })
 
 
 @router.get("/detail/{article_id}", summary="获取文档详情")
 def get_article_detail(
         article_id: int,
-        db: Session = Depends(get_db)
+        db: Session = Depends(get_read_db)
 ) -> Dict[str, Any]:
     """
     获取指定文档的详细信息（不含服务器文件路径）：
@@ -150,13 +207,13 @@ def get_article_detail(
         )
 
     # 2. 过滤敏感字段：转换为前端可用的响应格式
-    article_response = schemas.ArticleResponseSchema.from_orm(article_db).dict()
+    article_response = serializers.article_to_dict(article_db)
 
-    return {
+    return FastJSONResponse(content={
         "success": True,
         "msg": "文档详情查询成功",
         "data": article_response
-    }
+    })
 
 
 @router.delete("/delete/{article_id}", summary="删除文档（含文件+数据）")
@@ -166,56 +223,61 @@ def delete_article(
 ) -> Dict[str, Any]:
     """
     彻底删除文档：
-    1. 删除服务器上的原始文件和批注文件
-    2. 删除数据库中的Article记录（关联的Sentence自动删除，需模型配置cascade）
+    1. 分批删除数据库中的句子与Article记录（不加载ORM对象）
+    2. 服务器上的原始文件和批注文件由后台线程删除
     3. 若文档不存在，返回404错误
     """
-    # 1. 查询文档（不存在则抛出404）
-    article_db = db.query(Article).filter(Article.id == article_id).first()
-    if not article_db:
+    try:
+        deleted, _ = delete_articles(db, [article_id])
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"文档删除失败（ID：{article_id}）：{str(e)}，请重试"
+        )
+    if not deleted:
         raise HTTPException(
             status_code=404,
             detail=f"文档不存在（ID：{article_id}），无需删除"
         )
 
-    try:
-        # 2. 统一用Path方法操作文件（和file_service.py风格一致）
-        original_path = Path(article_db.original_path)
-        annotated_path = Path(article_db.annotated_path)
-
-        # 3. 删除服务器文件（忽略不存在的文件，避免报错）
-        if original_path.exists():
-            original_path.unlink()  # 替代os.remove()
-        if annotated_path.exists():
-            annotated_path.unlink()
-
-        # 4. 删除数据库记录（需确保Article模型配置了cascade="all, delete-orphan"）
-        db.delete(article_db)
-        db.commit()
+    return {
+        "success": True,
+        "msg": f"文档删除成功（ID：{article_id}）",
+        "data": None
+    }
 
-        return {
-            "success": True,
-            "msg": f"文档删除成功（ID：{article_id}）",
-            "data": None
-        }
 
+@router.post("/delete/batch", summary="批量删除文档（含文件+数据）")
+def delete_articles_batch(
+        payload: schemas.ArticleBatchDeleteSchema,
+        db: Session = Depends(get_db)
+) -> Dict[str, Any]:
+    """按ID批量删除文档，不存在的ID在 not_found 中返回（不视为失败）"""
+    try:
+        deleted, missing = delete_articles(db, payload.article_ids)
     except Exception as e:
-        # 未知错误：回滚事务，避免数据不一致
-        db.rollback()
-        raise HTTPException(
-            status_code=500,
-            detail=f"文档删除失败（ID：{article_id}）：{str(e)}，请重试"
-        )
+        raise HTTPException(status_code=500, detail=f"批量删除失败：{str(e)}，请重试")
+
+    return {
+        "success": True,
+        "msg": f"已删除{len(deleted)}个文档",
+        "data": {
+            "deleted": deleted,
+            "not_found": missing
+        }
+    }
 
 @router.get("/full-content/{article_id}", summary="获取完整文档内容（含句子位置，用于前端高亮）")
 def get_full_article_content(
         article_id: int,
-        db: Session = Depends(get_db)
-) -> Dict[str, Any]:
+        request: Request,
+        db: Session = Depends(get_read_db)
+):
     """
     返回完整文档文本+所有句子的详细信息（支撑前端“全文展示+违规高亮”）：
     - full_content：完整文档文本（保留段落结构，用\n换行）
     - sentences：所有句子列表（含位置、是否违规、标注内容）
+    已审查文档返回强ETag（If-None-Match 命中返回304），响应体缓存并预压缩，不再重复解析docx
     """
     # 1. 验证文档是否存在
     article_db = db.query(Article).filter(Article.id == article_id).first()
@@ -225,6 +287,16 @@ def get_full_article_content(
             detail=f"文档不存在（ID：{article_id}），请检查ID是否正确"
         )
 
+    if article_db.status == "已审查":
+        return review_cache_service.serve_reviewed(
+            request, db, article_db, "full_content", lambda: _build_full_content(db, article_db)
+        )
+    # 未审查完成的文档句子状态仍在变化，不缓存
+    return FastJSONResponse(content=_build_full_content(db, article_db))
+
+
+def _build_full_content(db: Session, article_db: Article) -> Dict[str, Any]:
+    article_id = article_db.id
     # 2. 读取完整文档内容（用转换后的docx文件，兼容PDF上传）
     try:
         # 注：PDF已在上传时转为docx，故用annotated_path（转后的docx路径）
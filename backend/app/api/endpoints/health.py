@@ -4,9 +4,11 @@
 from datetime import datetime
 from typing import Dict, Any
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import text
 from sqlalchemy.orm import Session
 from app.models import get_db
 from app.utils.logging import business_logger
+from app.utils.metrics import metrics
 
 router = APIRouter()
 
@@ -18,7 +20,7 @@ async def health_check(db: Session = Depends(get_db)):
     """
     try:
         # 检查数据库连接
-        db.execute("SELECT 1")
+        db.execute(text("SELECT 1"))
         db_status = "healthy"
     except Exception as e:
         db_status = f"unhealthy: {str(e)}"
@@ -78,4 +80,6 @@ async def get_metrics():
         "files_uploaded_total": 0,  # 上传文件总数
         "reviews_completed_total": 0,  # 完成审查总数
         "active_connections": 0,  # 活跃连接数
+        # 进程内注册的指标（数据库连接池借出数/溢出数/等待耗时等）
+        **metrics.snapshot(),
     }
@@ -1,12 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Response
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query, Request, Response
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 import asyncio
 from typing import Optional
 
-from app.models import get_db
+from app.models import get_db, get_read_db, serializers
 from app.models.db_models import Article, Sentence, Annotation
 from app.services.review_service import start_review_task
+from app.services import review_cache_service
+from app.services.near_duplicate_service import near_duplicate_index
 
 router = APIRouter(tags=["审查管理"])
 
@@ -99,9 +101,13 @@ async def review_progress_sse(
 @router.get("/detail/{article_id}", summary="获取审查详情")
 def get_review_detail(
         article_id: int,
-        db: Session = Depends(get_db)
+        request: Request,
+        db: Session = Depends(get_read_db)
 ):
-    """获取审查完成后的详细结果（包含违规句子及标注）"""
+    """
+    获取审查完成后的详细结果（包含违规句子及标注）
+    审查结果在重新审查前不变：返回强ETag，If-None-Match 命中返回304，响应体缓存并预压缩
+    """
     article = db.query(Article).filter(Article.id == article_id).first()
     if not article:
         raise HTTPException(status_code=404, detail=f"文档ID {article_id} 不存在")
@@ -109,6 +115,44 @@ def get_review_detail(
     if article.status != "已审查":
         raise HTTPException(status_code=400, detail="文档尚未完成审查")
 
+    return review_cache_service.serve_reviewed(
+        request, db, article, "review_detail", lambda: _build_review_detail(db, article)
+    )
+
+
+@router.get("/precedents/{article_id}", summary="获取近似重复条款的历史审查结果")
+def get_review_precedents(
+        article_id: int,
+        db: Session = Depends(get_read_db)
+):
+    """
+    文档中与更早的已审查文档近似重复（MinHash/LSH，轻微改写也能匹配）的句子，
+    以及这些句子当时被标注的违规类型和涉及文档数，例如“该条款在12份更早的文档中被标注为标签7”
+    """
+    article = db.query(Article.id).filter(Article.id == article_id).first()
+    if not article:
+        raise HTTPException(status_code=404, detail=f"文档ID {article_id} 不存在")
+
+    precedents = near_duplicate_index.precedents(db, article_id)
+    return {"success": True, "data": {
+        "article_id": article_id,
+        "total": len(precedents),
+        "sentences": precedents
+    }}
+
+
+@router.get("/near-duplicates", summary="跨文档的近似重复条款簇")
+def get_near_duplicate_clusters(
+        min_articles: int = Query(2, ge=2, description="簇内至少涉及的文档数"),
+        limit: int = Query(50, ge=1, le=200, description="返回数量限制"),
+        db: Session = Depends(get_read_db)
+):
+    """按涉及文档数降序返回近似重复条款簇（示例句子 + 各违规标签的句子数）"""
+    clusters = near_duplicate_index.clusters(db, min_articles=min_articles, limit=limit)
+    return {"success": True, "data": {"total": len(clusters), "clusters": clusters}}
+
+
+def _build_review_detail(db: Session, article: Article) -> dict:
     # 关联查询违规句子及对应的标注内容
     violation_sentences = db.query(
         Sentence,
@@ -117,7 +161,7 @@ def get_review_detail(
         Annotation,
         Sentence.annotation_id == Annotation.id
     ).filter(
-        Sentence.article_id == article_id,
+        Sentence.article_id == article.id,
         Sentence.has_problem == True
     ).all()
 
@@ -137,5 +181,6 @@ def get_review_detail(
         "review_time": article.review_time,
         "risk_level": article.risk_level,
         "total_violation": len(violation_details),
+        "review_stats": serializers.review_stats_to_dict(article.review_stats),
         "violation_sentences": violation_details
     }}
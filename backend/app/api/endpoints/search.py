@@ -0,0 +1,73 @@
+"""
+检索API端点
+"""
+import time
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import get_read_db, serializers
+from app.services.search_service import search_index
+
+router = APIRouter(tags=["检索"])
+
+
+def _validate_query(q: str) -> str:
+    keyword = q.strip()
+    if len("".join(keyword.split())) < settings.search_ngram_size:
+        raise HTTPException(status_code=400, detail=f"搜索关键词至少需要{settings.search_ngram_size}个字符")
+    return keyword
+
+
+@router.get("/sentences", summary="检索句子内容（可按违规/标注类型过滤）")
+def search_sentences(
+        q: str = Query(..., description="搜索关键词（匹配句子内容）"),
+        has_problem: Optional[bool] = Query(None, description="是否违规"),
+        annotation_id: Optional[int] = Query(None, ge=1, le=54, description="违规标签（1-54）"),
+        article_id: Optional[int] = Query(None, description="限定文档ID"),
+        limit: int = Query(50, ge=1, le=200, description="返回数量限制"),
+        db: Session = Depends(get_read_db)
+) -> Dict[str, Any]:
+    """
+    基于字符 n-gram 倒排索引检索句子，例如“所有提到X的违规句子”：
+    q=X&has_problem=true
+    """
+    keyword = _validate_query(q)
+    start = time.perf_counter()
+    results = search_index.search_sentences(
+        db, keyword, has_problem=has_problem, annotation_id=annotation_id, article_id=article_id, limit=limit
+    )
+    return {
+        "success": True,
+        "msg": "句子检索成功",
+        "data": {
+            "query": keyword,
+            "count": len(results),
+            "took_ms": round((time.perf_counter() - start) * 1000, 2),
+            "list": results
+        }
+    }
+
+
+@router.get("/articles", summary="按文件名检索文档")
+def search_articles(
+        q: str = Query(..., description="搜索关键词（匹配文件名）"),
+        limit: int = Query(20, ge=1, le=100, description="返回数量限制"),
+        db: Session = Depends(get_read_db)
+) -> Dict[str, Any]:
+    """基于字符 n-gram 倒排索引检索文档名称"""
+    keyword = _validate_query(q)
+    start = time.perf_counter()
+    articles = search_index.search_articles(db, keyword, limit=limit)
+    return {
+        "success": True,
+        "msg": "文档检索成功",
+        "data": {
+            "query": keyword,
+            "count": len(articles),
+            "took_ms": round((time.perf_counter() - start) * 1000, 2),
+            "list": serializers.articles_to_dicts(articles)
+        }
+    }
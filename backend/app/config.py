@@ -90,6 +90,11 @@ class Settings(BaseSettings):
     db_max_overflow: int = 20
     db_pool_timeout: int = 30
     db_pool_recycle: int = 3600
+    db_pool_pre_ping: bool = True  # 借出连接前探活（避免使用已被数据库断开的连接）
+    database_replica_url: Optional[str] = None  # 只读副本地址（未配置时读请求走主库）
+    replica_max_lag_seconds: float = 5.0  # 副本复制延迟超过该值时读请求回退主库
+    replica_lag_check_interval: float = 5.0  # 复制延迟检测间隔（秒）
+    read_your_writes_window: float = 10.0  # 客户端写入后该时间内的读请求走主库（秒）
     
     # Redis配置
     redis_url: str = "redis://localhost:6379"
@@ -100,6 +105,55 @@ class Settings(BaseSettings):
     # 缓存配置
     cache_ttl: int = 3600
     cache_max_size: int = 1000
+    article_count_cache_ttl: int = 30  # 文档列表总数缓存时间（秒），过期后后台刷新
+    chat_memory_backend: str = "local"  # 会话记忆缓存后端：local（进程内，仅限单worker）/ redis（多worker共享，使用 redis_url）
+    chat_memory_cache_max_entries: int = 2000  # 进程内会话记忆缓存条目上限
+    chat_memory_cache_max_bytes: int = 64 * 1024 * 1024  # 进程内会话记忆缓存总大小上限（字节）
+    chat_memory_cache_ttl: int = 1800  # 会话记忆缓存时间（秒）
+    chat_summary_queue_size: int = 256  # 待更新摘要的会话队列上限（满时丢弃，下一轮对话再触发）
+    chat_summary_min_turns: int = 6  # 未摘要消息达到该条数时更新摘要
+    chat_summary_min_tokens: int = 1500  # 或未摘要消息估算token数达到该值时更新摘要
+    chat_memory_mode: str = "extractive"  # 默认会话记忆方式：extractive（本地抽取要点，定期再用LLM合并摘要）/ llm（按阈值LLM摘要）
+    chat_keypoints_max_tokens: int = 300  # 本地抽取要点的token上限
+    chat_keypoints_recent_turns: int = 4  # 最近若干条消息原文发送，不参与要点抽取
+    chat_summary_consolidate_turns: int = 40  # extractive 模式下未摘要消息达到该条数才调用LLM合并摘要
+    answer_cache_enabled: bool = True  # 与会话无关的相同问题直接返回缓存的回答
+    answer_cache_max_entries: int = 5000  # 回答缓存条目上限（LRU淘汰）
+    answer_cache_ttl: int = 6 * 3600  # 回答缓存时间（秒）
+    chat_prompt_max_tokens: int = 3000  # 发送给模型的提示总token预算（不含回复的 ai_max_tokens）
+    chat_summary_max_tokens: int = 400  # 其中对话摘要最多占用的token数
+    chat_facts_max_tokens: int = 800  # 其中参考资料最多占用的token数
+    chat_export_batch_size: int = 500  # 导出会话时每批读取的消息数（导出内存占用与会话长度无关）
+    chat_tokenizer_path: Optional[str] = None  # 提示token计数使用的分词器目录（默认依次尝试 TOKENIZER_PATH、仓库自带 tokenizer/）
+
+    # 检索配置
+    search_ngram_size: int = 2  # 句子/文档名倒排索引的字符 n-gram 长度（查询词至少 n 个字符）
+    search_warm_on_startup: bool = True  # 服务启动时在后台构建进程内检索索引（含聊天消息索引，每个worker各一份；构建完成前的查询直接回库，不在请求内构建）
+    chat_search_max_candidates: int = 20000  # 聊天消息检索每次最多回库校验的候选消息数（超出时只校验最新的）
+    near_dup_shingle_size: int = 4  # 近似重复检测的字符 shingle 长度
+    near_dup_num_perm: int = 64  # MinHash 签名长度（需能被 near_dup_bands 整除）
+    near_dup_bands: int = 16  # LSH 分段数（每段 num_perm/bands 个值，段数越多召回越高、候选越多）
+    near_dup_threshold: float = 0.7  # 估计 Jaccard 相似度达到该值视为近似重复
+    near_dup_min_chars: int = 10  # 短于该字符数的句子不参与（模板短句）
+
+    # 向量检索（RAG）配置
+    rag_enabled: bool = True  # 聊天时检索法规/审查要点作为参考资料（索引目录不存在时自动跳过）
+    rag_index_dir: str = "./rag_index"  # 检索索引目录（python -m app.rag.indexer 生成）
+    rag_corpus_dir: str = "./regulations"  # 法规语料目录（.txt/.md/.docx）
+    rag_embedder: str = "hashing"  # 检索向量化方式：hashing（字符n-gram哈希，无需模型）/ bert（embedding_service，修改后需重建索引）
+    rag_embedding_dim: int = 256  # hashing 向量维度（修改后需重建索引）
+    rag_top_k: int = 4  # 每次检索注入提示的片段数
+    rag_min_score: float = 0.2  # 余弦相似度低于该值的片段不注入
+    rag_chunk_tokens: int = 200  # 切块token上限
+    rag_chunk_overlap_sentences: int = 1  # 相邻块重叠的句子数
+    rag_ivf_min_vectors: int = 50000  # 片段数达到该值时构建 IVF 分区（按 sqrt(N) 分区）
+    rag_ivf_nprobe: int = 16  # IVF 检索时扫描的分区数
+    embedding_model_path: Optional[str] = None  # 句向量模型目录（transformers 格式的 BERT 系列模型）
+    embedding_model_version: str = "bert-base-chinese"  # 句向量模型版本（参与缓存键，更换模型时修改）
+    embedding_batch_size: int = 32  # 每批编码的句子数
+    embedding_max_length: int = 256  # 单句最大token数（超出截断）
+    embedding_device: str = "cpu"  # 推理设备
+    embedding_cache_path: Optional[str] = "./embedding_cache.sqlite3"  # 句向量磁盘缓存文件（为空时不缓存）
     
     # AI服务配置
     ai_api_key: str = ""
@@ -107,6 +161,12 @@ class Settings(BaseSettings):
     ai_model: str = "doubao-seed-1-6-250615"
     ai_max_tokens: int = 4000
     ai_processing_timeout: int = 60
+    llm_max_connections: int = 20  # 大模型接口连接池上限（每个worker）
+    llm_max_keepalive_connections: int = 10  # 保持的空闲长连接数
+    llm_keepalive_expiry: float = 60.0  # 空闲长连接保留时间（秒）
+    llm_connect_timeout: float = 10.0  # 建立连接超时（秒）
+    llm_max_retries: int = 2  # SDK 自动重试次数
+    review_model_version: str = "Fair_2"  # 审查模型版本（更换模型权重时修改，已审查结果的ETag随之失效）
     
     # 安全配置
     secret_key: str = "set-secret-key-in-env"
@@ -124,6 +184,11 @@ class Settings(BaseSettings):
     file_processing_timeout: int = 300
     max_concurrent_uploads: int = 5
     max_concurrent_reviews: int = 3
+    bulk_upload_max_files: int = 200  # 批量上传单次最多文件数（含zip内成员）
+    bulk_upload_batch_size: int = 20  # 批量入库时每个事务包含的文件数
+    delete_chunk_size: int = 1000  # 删除文档时每条DELETE语句包含的句子数
+    file_cleanup_max_retries: int = 3  # 文件删除失败的重试次数
+    file_cleanup_retry_delay: float = 5.0  # 文件删除重试间隔（秒）
     
     # 日志配置
     log_level: str = "INFO"
@@ -2,7 +2,13 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import settings
-from app.api.endpoints import files, reviews, chat
+from app.models import ReadSessionLocal
+from app.models.read_routing import ReadYourWritesMiddleware
+from app.utils.json_response import FastJSONResponse
+from app.services.llm_client import llm_provider
+from app.services.chat_search_service import chat_search_index
+from app.services.search_service import search_index
+from app.api.endpoints import files, reviews, chat, search, analytics, health
 
 # 创建FastAPI实例（自动生成文档的配置）
 app = FastAPI(
@@ -10,7 +16,8 @@ app = FastAPI(
     description="支持文档上传、AI审查、风险评估、报告生成的完整API服务",
     version="1.0.0",
     docs_url="/docs",  # 自动文档地址（Swagger UI）
-    redoc_url="/redoc" # 另一种文档风格（ReDoc）
+    redoc_url="/redoc", # 另一种文档风格（ReDoc）
+    default_response_class=FastJSONResponse  # orjson 序列化（未安装时回退标准库json）
 )
 
 # 配置CORS（解决前端跨域问题）
@@ -20,12 +27,31 @@ app.add_middleware(
     allow_credentials=True,                  # 允许携带Cookie
     allow_methods=["*"],                     # 允许所有HTTP方法
     allow_headers=["*"],                     # 允许所有HTTP头
+    expose_headers=["X-Next-Cursor"],        # 跨域时前端可读取的分页游标响应头
 )
 
+# 读己之写：写请求成功后，短时间内该客户端的读请求走主库
+app.add_middleware(ReadYourWritesMiddleware)
+
 # 注册API路由（前缀统一为/api，方便前端调用）
 app.include_router(files.router, prefix="/api/files")
 app.include_router(reviews.router, prefix="/api/reviews")
+app.include_router(search.router, prefix="/api/search")
+app.include_router(analytics.router, prefix="/api/analytics")
 app.include_router(chat.router)  # 聊天API路由（已在router中定义了/api/chat前缀）
+app.include_router(health.router, tags=["健康检查"])  # /health、/metrics
+
+# 启动时在后台线程构建进程内检索索引（首个查询不承担整体构建）
+@app.on_event("startup")
+def warm_search_indexes():
+    if settings.search_warm_on_startup:
+        search_index.warm_in_background(ReadSessionLocal, "search")
+        chat_search_index.warm_in_background(ReadSessionLocal, "chat-search")
+
+# 关闭时释放大模型接口连接池
+@app.on_event("shutdown")
+async def close_llm_clients():
+    await llm_provider.aclose()
 
 # 根路由（测试用）
 @app.get("/", summary="首页")
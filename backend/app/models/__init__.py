@@ -1,16 +1,27 @@
-from sqlalchemy import create_engine
+from fastapi import Request
 from sqlalchemy.orm import sessionmaker
 from app.config import settings
 from app.models.db_models import Base  # 导入修正后的基础模型
+from app.models.engine_factory import LazyAsyncSessionFactory, create_db_engine, create_replica_engine
+from app.models.read_routing import ReplicaLagMonitor, choose_read_primary
 
-# 创建数据库引擎（SQLite 特殊配置）
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
-)
+# 创建数据库引擎（连接池参数见 engine_factory）
+engine = create_db_engine(settings.DATABASE_URL)
+# 只读副本引擎（未配置 database_replica_url 时即主库引擎）
+read_engine = create_replica_engine(engine, settings.database_replica_url)
 
 # 会话工厂：独立会话，线程安全
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# 只读会话工厂：仅用于不写入的查询
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+# 异步会话工厂：聊天等长耗时接口在事件循环内访问数据库（不占用线程池）
+# 异步引擎在首次使用时创建（AsyncSessionLocal.engine），不支持异步驱动的数据库不影响启动
+AsyncSessionLocal = LazyAsyncSessionFactory(settings.DATABASE_URL)
+# 副本复制延迟检测（未配置只读副本时为None）
+replica_lag_monitor = (
+    ReplicaLagMonitor(read_engine, settings.replica_max_lag_seconds, settings.replica_lag_check_interval)
+    if read_engine is not engine else None
+)
 
 # 数据库会话依赖：FastAPI 自动注入，用完关闭
 def get_db():
@@ -20,6 +31,21 @@ def get_db():
     finally:
         db.close()
 
+# 只读会话依赖：查询接口使用，分流到只读副本
+# （读己之写窗口内或副本延迟过大时回退主库，见 read_routing）
+def get_read_db(request: Request):
+    factory = SessionLocal if choose_read_primary(request, replica_lag_monitor) else ReadSessionLocal
+    db = factory()
+    try:
+        yield db
+    finally:
+        db.close()
+
+# 异步会话依赖：async def 接口使用
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
 # 首次运行自动创建所有表（基于修正后的 DB 模型）
 Base.metadata.create_all(bind=engine)
 
@@ -34,7 +60,8 @@ from app.models.schemas import (
 
 # 导出列表：方便其他文件导入
 __all__ = [
-    "Base", "engine", "SessionLocal", "get_db",
+    "Base", "engine", "read_engine",
+    "SessionLocal", "ReadSessionLocal", "AsyncSessionLocal", "get_db", "get_read_db", "get_async_db",
     "Article", "Sentence", "Annotation",
     "ArticleSchema", "SentenceSchema", "AnnotationSchema",
     "ReviewProgressSchema"
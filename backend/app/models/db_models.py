@@ -1,5 +1,7 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, ForeignKey, JSON
+from sqlalchemy import (
+    Column, Integer, BigInteger, String, Text, Boolean, Date, DateTime, ForeignKey, JSON, Index, LargeBinary
+)
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 import uuid
@@ -26,6 +28,18 @@ class Article(Base):
     sentences = relationship("Sentence", back_populates="article", cascade="all, delete-orphan")
     # 关联：1个文档 → 多个标注（删除文档级联删标注）
     # annotations = relationship("Annotation", back_populates="article", cascade="all, delete-orphan")
+    # 关联：1个文档 → 1条审查统计（审查完成时写入；随文档一起加载，列表/详情无需聚合查询）
+    review_stats = relationship(
+        "ArticleReviewStats", uselist=False, lazy="joined",
+        cascade="all, delete-orphan", passive_deletes=True
+    )
+
+    __table_args__ = (
+        # 文档列表游标分页：ORDER BY upload_time DESC, id DESC
+        Index("ix_articles_upload_time_id", "upload_time", "id"),
+        # 检索索引按审查完成时间刷新句子标签：WHERE review_time > ? / MAX(review_time)
+        Index("ix_articles_review_time", "review_time"),
+    )
 
 
 class Sentence(Base):
@@ -44,6 +58,65 @@ class Sentence(Base):
     # 关联：1个句子 → 1个文档
     article = relationship("Article", back_populates="sentences")
 
+    __table_args__ = (
+        # 审查/详情/全文查询都按 article_id 过滤，详情页另加 has_problem = True
+        Index("ix_sentences_article_id_has_problem", "article_id", "has_problem"),
+    )
+
+
+class ArticleReviewStats(Base):
+    """文档审查统计表：start_review_task 完成时写入的物化统计（1:1 对应文档）"""
+    __tablename__ = "article_review_stats"
+
+    article_id = Column(Integer, ForeignKey("articles.id", ondelete="CASCADE"), primary_key=True)
+    total_sentences = Column(Integer, nullable=False, default=0)  # 文档句子总数
+    reviewed_sentences = Column(Integer, nullable=False, default=0)  # 成功审查的句子数
+    violation_count = Column(Integer, nullable=False, default=0)  # 违规句子数
+    label_histogram = Column(JSON, nullable=False, default=dict)  # 违规标签分布 {"标签(1-54)": 句子数}，只记非零项
+    review_duration_ms = Column(Integer)  # 审查耗时（毫秒）
+    model_version = Column(String(64))  # 产出本次审查结果的模型版本（参与详情接口ETag计算）
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class ArticleResponseCache(Base):
+    """
+    已审查文档的响应缓存：审查详情/全文内容序列化后的JSON，及预压缩的 gzip/brotli 版本
+    etag 与请求时计算的不一致（重新审查、模型升级）即视为失效并覆盖
+    """
+    __tablename__ = "article_response_cache"
+
+    article_id = Column(Integer, ForeignKey("articles.id", ondelete="CASCADE"), primary_key=True)
+    kind = Column(String(32), primary_key=True)  # review_detail / full_content
+    etag = Column(String(80), nullable=False)
+    body = Column(LargeBinary(length=2 ** 32 - 1), nullable=False)  # 未压缩JSON（MySQL下为LONGBLOB）
+    body_gzip = Column(LargeBinary(length=2 ** 32 - 1), nullable=False)
+    body_br = Column(LargeBinary(length=2 ** 32 - 1))  # 未安装brotli时为空
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+# -------------------------- 审查统计汇总表（按时间分桶，审查完成时增量更新）--------------------------
+class LabelWeeklyRollup(Base):
+    """违规标签周汇总：每周（按审查完成时间）每个标签的违规句子数"""
+    __tablename__ = "rollup_label_weekly"
+
+    week_start = Column(Date, primary_key=True)  # 所在周的周一
+    annotation_id = Column(Integer, primary_key=True)  # 违规标签（1-54）
+    violation_count = Column(Integer, nullable=False, default=0)  # 违规句子数
+    article_count = Column(Integer, nullable=False, default=0)  # 出现该标签的文档数
+
+
+class ReviewMonthlyRollup(Base):
+    """审查月汇总：每月每个风险等级的文档数、句子数与审查耗时"""
+    __tablename__ = "rollup_review_monthly"
+
+    month_start = Column(Date, primary_key=True)  # 所在月的1号
+    risk_level = Column(String(20), primary_key=True)  # 无风险/低风险/中风险/高风险
+    article_count = Column(Integer, nullable=False, default=0)
+    sentence_count = Column(Integer, nullable=False, default=0)
+    violation_count = Column(Integer, nullable=False, default=0)
+    timed_article_count = Column(Integer, nullable=False, default=0)  # 有审查耗时记录的文档数
+    total_review_ms = Column(BigInteger, nullable=False, default=0)  # 审查耗时合计（毫秒）
+
 
 # app/models/db_models.py（最终版 Annotation 模型）
 class Annotation(Base):
@@ -69,10 +142,20 @@ class ChatSession(Base):
     is_active = Column(Boolean, default=True, nullable=False)  # 会话是否活跃
     # 记忆摘要（用于LangChain对话记忆的持久化）
     memory_summary = Column(Text, nullable=True)
+    # 摘要版本（每次更新+1，用于并发更新检测）与摘要已覆盖到的最后一条消息ID
+    memory_summary_version = Column(Integer, default=0, nullable=False)
+    memory_summarized_message_id = Column(Integer, nullable=True)
+    # 消息数（与消息写入在同一事务内原子+1，会话列表不再逐个 COUNT）
+    message_count = Column(Integer, default=0, server_default="0", nullable=False)
 
     # 关联：1个会话 → 多个消息
     messages = relationship("ChatMessage", back_populates="session", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # 会话列表：按 user_id 过滤后按 updated_at 倒序
+        Index("ix_chat_sessions_user_id_updated_at", "user_id", "updated_at"),
+    )
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         if not self.session_id:
@@ -94,6 +177,11 @@ class ChatMessage(Base):
     # 关联：1个消息 → 1个会话
     session = relationship("ChatSession", back_populates="messages")
 
+    __table_args__ = (
+        # 会话消息：按 session_id 过滤后按 (created_at, id) 排序，支持从最新消息往前的游标分页
+        Index("ix_chat_messages_session_id_created_at_id", "session_id", "created_at", "id"),
+    )
+
 
 class ChatAttachment(Base):
     """聊天附件表"""
@@ -0,0 +1,152 @@
+"""
+数据库引擎工厂 - 按配置创建主库/只读副本引擎，并导出连接池指标
+"""
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import create_engine, exc
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.config import settings
+from app.utils.metrics import metrics
+
+# 等待连接的耗时分桶（秒）：正常应远小于1ms，接近 db_pool_timeout 说明连接池过小
+POOL_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0)
+
+
+class InstrumentedQueuePool(QueuePool):
+    """记录每次借出连接的等待时间与超时次数的 QueuePool"""
+
+    metrics_name = "primary"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            metrics.counter(f"db_pool_{self.metrics_name}_timeouts_total").inc()
+            raise
+        finally:
+            metrics.histogram(
+                f"db_pool_{self.metrics_name}_wait_seconds", POOL_WAIT_BUCKETS
+            ).observe(time.perf_counter() - started)
+
+
+class InstrumentedAsyncQueuePool(InstrumentedQueuePool, AsyncAdaptedQueuePool):
+    """异步引擎使用的带指标 QueuePool"""
+
+
+# 同步驱动 -> 异步驱动（异步聊天链路使用）
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "mysql": "mysql+aiomysql",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def _register_pool_gauges(engine: Engine, name: str) -> None:
+    """连接池实时状态（通过 engine.pool 读取，dispose 重建后仍有效）"""
+    def reader(method: str):
+        return lambda: getattr(engine.pool, method)() if hasattr(engine.pool, method) else None
+
+    metrics.gauge(f"db_pool_{name}_size", reader("size"))
+    metrics.gauge(f"db_pool_{name}_checked_out", reader("checkedout"))
+    metrics.gauge(f"db_pool_{name}_checked_in", reader("checkedin"))
+    metrics.gauge(f"db_pool_{name}_overflow", reader("overflow"))
+
+
+def create_db_engine(url: str, name: str = "primary") -> Engine:
+    """
+    创建数据库引擎：
+    - MySQL等：应用 db_pool_size / db_max_overflow / db_pool_timeout / db_pool_recycle，并开启 pre-ping
+      （SSE 长连接会长期占用连接，需要按 worker 数与并发流数量调整池大小）
+    - SQLite：仅用于开发/测试，保持 SQLAlchemy 默认连接池
+    :param name: 指标名称前缀（primary / replica）
+    """
+    if url.startswith("sqlite"):
+        engine = create_engine(url, connect_args={"check_same_thread": False})
+    else:
+        # 每个引擎一个子类，dispose() 重建连接池时沿用同一指标名称
+        pool_class = type(f"InstrumentedQueuePool_{name}", (InstrumentedQueuePool,), {"metrics_name": name})
+        engine = create_engine(
+            url,
+            poolclass=pool_class,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout,
+            pool_recycle=settings.db_pool_recycle,
+            pool_pre_ping=settings.db_pool_pre_ping,
+        )
+    _register_pool_gauges(engine, name)
+    return engine
+
+
+def to_async_url(url: str) -> str:
+    """把同步连接串换成对应的异步驱动（如 mysql+pymysql -> mysql+aiomysql），其余参数不变"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"不支持的异步数据库类型: {backend}")
+    return parsed.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+def create_async_db_engine(url: str, name: str = "primary_async") -> AsyncEngine:
+    """
+    创建异步数据库引擎（与同步引擎连接同一数据库、使用相同的连接池参数）
+    事件循环内的长耗时请求（如流式聊天）使用它，不占用线程池
+    """
+    async_url = to_async_url(url)
+    if url.startswith("sqlite"):
+        engine = create_async_engine(async_url)
+    else:
+        pool_class = type(
+            f"InstrumentedAsyncQueuePool_{name}", (InstrumentedAsyncQueuePool,), {"metrics_name": name}
+        )
+        engine = create_async_engine(
+            async_url,
+            poolclass=pool_class,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout,
+            pool_recycle=settings.db_pool_recycle,
+            pool_pre_ping=settings.db_pool_pre_ping,
+        )
+    _register_pool_gauges(engine.sync_engine, name)
+    return engine
+
+
+class LazyAsyncSessionFactory:
+    """
+    异步会话工厂：首次调用时才创建异步引擎
+    数据库没有对应异步驱动时，只有异步接口在使用时报错，不影响应用启动与同步接口
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self._lock = threading.Lock()
+        self._factory: Optional[async_sessionmaker] = None
+
+    @property
+    def engine(self) -> AsyncEngine:
+        return self._get().kw["bind"]
+
+    def _get(self) -> async_sessionmaker:
+        if self._factory is None:
+            with self._lock:
+                if self._factory is None:
+                    engine = create_async_db_engine(self.url)
+                    self._factory = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+        return self._factory
+
+    def __call__(self, **kw) -> AsyncSession:
+        return self._get()(**kw)
+
+
+def create_replica_engine(primary: Engine, replica_url: Optional[str]) -> Engine:
+    """未配置只读副本时，只读会话直接使用主库引擎"""
+    if not replica_url:
+        return primary
+    return create_db_engine(replica_url, name="replica")
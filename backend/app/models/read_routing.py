@@ -0,0 +1,139 @@
+"""
+读写分离路由：
+- 客户端写入后的短时间内（读己之写窗口）读请求仍走主库
+- 只读副本复制延迟超过阈值或无法获取状态时回退主库
+"""
+import logging
+import threading
+import time
+from typing import Optional
+
+from fastapi import Request, Response
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+from app.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# 记录“最近一次写入时间”的Cookie（客户端携带，跨worker生效）
+READ_YOUR_WRITES_COOKIE = "fair_last_write"
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+def mark_write(response, now: Optional[float] = None) -> None:
+    """写请求成功后在响应上设置读己之写Cookie"""
+    response.set_cookie(
+        READ_YOUR_WRITES_COOKIE,
+        str(int((now or time.time()) * 1000)),
+        max_age=max(int(settings.read_your_writes_window), 1),
+        httponly=True,
+        samesite="lax",
+    )
+
+
+def recently_wrote(request: Request, now: Optional[float] = None) -> bool:
+    """请求是否处于读己之写窗口内"""
+    value = request.cookies.get(READ_YOUR_WRITES_COOKIE)
+    if not value:
+        return False
+    try:
+        written_at = int(value) / 1000
+    except ValueError:
+        return False
+    return (now or time.time()) - written_at < settings.read_your_writes_window
+
+
+class ReadYourWritesMiddleware:
+    """
+    写请求（POST/PUT/PATCH/DELETE）成功后标记客户端，后续读请求在窗口内走主库
+    纯ASGI中间件：只在 http.response.start 消息上追加Cookie，不缓冲/包装响应体（流式响应不受影响）
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in WRITE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                marker = Response()
+                mark_write(marker)
+                MutableHeaders(scope=message).append("set-cookie", marker.headers["set-cookie"])
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
+
+
+class ReplicaLagMonitor:
+    """
+    只读副本复制延迟检测（结果缓存 check_interval 秒，避免每个请求都查询复制状态）
+    MySQL 执行 SHOW REPLICA STATUS（旧版本回退 SHOW SLAVE STATUS）读取 Seconds_Behind_Source；
+    其他数据库无法检测，视为可用。
+    """
+
+    def __init__(self, engine: Engine, max_lag: float, check_interval: float = 5.0):
+        self.engine = engine
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self._usable = True
+        self.last_lag: Optional[float] = None
+        metrics.gauge("db_replica_lag_seconds", lambda: self.last_lag)
+
+    def _query_lag(self) -> Optional[float]:
+        """返回复制延迟（秒）；复制线程停止时返回None"""
+        with self.engine.connect() as conn:
+            for statement, column in (
+                    ("SHOW REPLICA STATUS", "Seconds_Behind_Source"),
+                    ("SHOW SLAVE STATUS", "Seconds_Behind_Master"),
+            ):
+                try:
+                    row = conn.execute(text(statement)).mappings().first()
+                except Exception:
+                    continue
+                if row is None:
+                    return None  # 未配置复制
+                lag = row.get(column)
+                return None if lag is None else float(lag)
+        return None
+
+    def usable(self) -> bool:
+        if self.engine.dialect.name != "mysql":
+            return True
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return self._usable
+        with self._lock:
+            if now - self._checked_at < self.check_interval:
+                return self._usable
+            try:
+                lag = self._query_lag()
+            except Exception:
+                logger.exception("只读副本状态检测失败，读请求回退主库")
+                lag = None
+            self.last_lag = lag
+            self._usable = lag is not None and lag <= self.max_lag
+            self._checked_at = now
+            return self._usable
+
+
+def choose_read_primary(request: Request, lag_monitor: Optional[ReplicaLagMonitor]) -> bool:
+    """判断本次读请求是否需要走主库（并记录分流指标）"""
+    if lag_monitor is None:
+        return True  # 未配置只读副本
+    if recently_wrote(request):
+        metrics.counter("db_reads_primary_sticky_total").inc()
+        return True
+    if not lag_monitor.usable():
+        metrics.counter("db_reads_primary_lagging_total").inc()
+        return True
+    metrics.counter("db_reads_replica_total").inc()
+    return False
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 
 # -------------------------- 1. 文档相关 Schema（删除与 Annotation 的无关关联）--------------------------
@@ -29,6 +29,18 @@ class ArticleSchema(ArticleBase):
 
 
 # -------------------------- 2. 前端专用文档响应 Schema（无修改，保持过滤敏感路径）--------------------------
+class ArticleReviewStatsSchema(BaseModel):
+    """审查统计（审查完成时物化，读取无需聚合）"""
+    total_sentences: int = Field(..., ge=0, description="句子总数")
+    reviewed_sentences: int = Field(..., ge=0, description="成功审查的句子数")
+    violation_count: int = Field(..., ge=0, description="违规句子数")
+    label_histogram: Dict[str, int] = Field(default_factory=dict, description="违规标签分布（标签1-54 → 句子数，仅含非零项）")
+    review_duration_ms: Optional[int] = Field(None, ge=0, description="审查耗时（毫秒）")
+
+    class Config:
+        from_attributes = True
+
+
 class ArticleResponseSchema(BaseModel):
     id: int = Field(..., description="文档唯一ID（用于后续操作，如审查/删除）")
     name: str = Field(..., max_length=255, description="原始文件名（前端展示用）")
@@ -37,11 +49,16 @@ class ArticleResponseSchema(BaseModel):
     risk_level: Optional[str] = Field(None, pattern="^(无风险|低风险|中风险|高风险)$", description="风险等级（前端展示）")
     upload_time: datetime = Field(..., description="上传时间（前端排序/展示）")
     review_time: Optional[datetime] = Field(None, description="审查完成时间（审查后展示）")
+    review_stats: Optional[ArticleReviewStatsSchema] = Field(None, description="审查统计（审查完成后返回）")
 
     class Config:
         from_attributes = True
 
 
+class ArticleBatchDeleteSchema(BaseModel):
+    article_ids: List[int] = Field(..., min_length=1, max_length=500, description="待删除的文档ID列表（单次最多500个）")
+
+
 # -------------------------- 3. 句子相关 Schema（无核心修改，仅关联逻辑适配新 Annotation）--------------------------
 class SentenceBase(BaseModel):
     content: str = Field(..., description="句子内容（必填）")
@@ -172,6 +189,7 @@ class ChatRequest(BaseModel):
     user_id: Optional[str] = Field(None, max_length=255, description="用户ID（可选）")
     context: Optional[str] = Field(None, description="上下文信息（可选）")
     attachments: Optional[List[dict]] = Field(None, description="附件列表")
+    use_cache: bool = Field(True, description="是否允许使用常见问题回答缓存（会话相关提问自动跳过）")
 
 
 class ChatResponse(BaseModel):
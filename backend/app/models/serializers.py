@@ -0,0 +1,41 @@
+"""
+ORM对象 → dict 的直接序列化（按响应Schema字段取属性，不经过 Pydantic 校验）
+字段列表取自 schemas 中的响应模型，新增字段时只需修改 Schema。
+"""
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.models import schemas
+
+ARTICLE_FIELDS = tuple(f for f in schemas.ArticleResponseSchema.model_fields if f != "review_stats")
+REVIEW_STATS_FIELDS = tuple(schemas.ArticleReviewStatsSchema.model_fields)
+CHAT_SESSION_FIELDS = tuple(f for f in schemas.ChatSessionSchema.model_fields if f != "message_count")
+
+
+def row_to_dict(obj: Any, fields: Iterable[str]) -> Dict[str, Any]:
+    return {field: getattr(obj, field) for field in fields}
+
+
+def review_stats_to_dict(stats) -> Optional[Dict[str, Any]]:
+    if stats is None:
+        return None
+    data = row_to_dict(stats, REVIEW_STATS_FIELDS)
+    data["label_histogram"] = data["label_histogram"] or {}
+    return data
+
+
+def article_to_dict(article) -> Dict[str, Any]:
+    """等价于 ArticleResponseSchema.from_orm(article).dict()（不含服务器文件路径）"""
+    data = row_to_dict(article, ARTICLE_FIELDS)
+    data["review_stats"] = review_stats_to_dict(article.review_stats)
+    return data
+
+
+def articles_to_dicts(articles: Iterable) -> List[Dict[str, Any]]:
+    return [article_to_dict(article) for article in articles]
+
+
+def chat_session_to_dict(session, message_count: Optional[int] = None) -> Dict[str, Any]:
+    """等价于 ChatSessionSchema(**session.__dict__, message_count=...)（未传 message_count 时取会话上的计数列）"""
+    data = row_to_dict(session, CHAT_SESSION_FIELDS)
+    data["message_count"] = session.message_count if message_count is None else message_count
+    return data
@@ -0,0 +1,22 @@
+"""
+RAG 检索模块 - 法规语料与审查要点的本地向量检索，检索结果作为参考资料注入聊天提示
+- chunker：按条款/句子切块
+- embedder：文本向量化
+- vector_store：内存映射 float32 向量矩阵 + 块信息旁路文件，NumPy 批量 top-k，可选 IVF 分区
+- retriever：聊天检索入口（rag_retriever）
+- indexer：从语料目录与 Annotation 表构建索引（python -m app.rag.indexer）
+"""
+from app.rag.chunker import chunk_text
+from app.rag.embedder import HashingEmbedder
+from app.rag.retriever import Passage, Retriever, rag_retriever
+from app.rag.vector_store import VectorStore, write_store
+
+__all__ = [
+    "chunk_text",
+    "HashingEmbedder",
+    "Passage",
+    "Retriever",
+    "rag_retriever",
+    "VectorStore",
+    "write_store",
+]
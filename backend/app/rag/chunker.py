@@ -0,0 +1,58 @@
+"""
+文本切块 - 法规按“第X条”分条，条内按句子装箱到 token 上限
+- 分句复用文档审查的 extract_sentences_with_position（按段落分别切分）
+- 相邻块之间保留 overlap 个句子，避免关键信息落在块边界上
+"""
+import re
+from typing import List
+
+from app.services.context_builder import token_counter
+from app.services.file_service import extract_sentences_with_position
+
+# 法规条款开头：第十二条 / 第12条
+ARTICLE_START = re.compile(r"^第[零一二三四五六七八九十百千\d]+条")
+
+
+def _sections(text: str) -> List[List[str]]:
+    """按条款分组的段落：[[段落, ...], ...]（没有条款编号的文本整体为一组）"""
+    sections: List[List[str]] = []
+    for paragraph in (p.strip() for p in (text or "").splitlines()):
+        if not paragraph:
+            continue
+        if not sections or ARTICLE_START.match(paragraph):
+            sections.append([])
+        sections[-1].append(paragraph)
+    return sections
+
+
+def chunk_text(text: str, max_tokens: int, overlap: int = 1) -> List[str]:
+    """
+    把文本切成不超过 max_tokens 的块（单句超长时截断）
+    :param overlap: 同一条款内相邻块重叠的句子数
+    """
+    chunks: List[str] = []
+    for section in _sections(text):
+        sentences = [
+            s["content"].strip()
+            for paragraph in section
+            for s in extract_sentences_with_position(paragraph)
+            if s["content"].strip()
+        ]
+        current: List[str] = []
+        used = 0
+        for sentence in sentences:
+            cost = token_counter.count(sentence)
+            if cost > max_tokens:
+                sentence = token_counter.truncate(sentence, max_tokens)
+                cost = max_tokens
+            if current and used + cost > max_tokens:
+                chunks.append("".join(current))
+                current = current[-overlap:] if overlap else []
+                used = sum(token_counter.count(s) for s in current)
+                if used + cost > max_tokens:
+                    current, used = [], 0
+            current.append(sentence)
+            used += cost
+        if current:
+            chunks.append("".join(current))
+    return chunks
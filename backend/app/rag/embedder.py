@@ -0,0 +1,39 @@
+"""
+文本向量化 - 字符 n-gram 特征哈希（无需模型，毫秒级，进程间结果稳定）
+查询与索引必须使用同一个向量化器：名称（含维度）写入索引元数据，加载时校验
+"""
+import zlib
+from typing import Sequence
+
+import numpy as np
+
+from app.services.search_service import normalize_text
+
+
+class HashingEmbedder:
+    """字符一元/二元组哈希到 dim 维，次线性词频，L2 归一化（点积即余弦相似度）"""
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+
+    @property
+    def name(self) -> str:
+        return f"hashing-{self.dim}"
+
+    def _features(self, text: str):
+        text = normalize_text(text)
+        yield from text
+        for i in range(len(text) - 1):
+            yield text[i:i + 2]
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                h = zlib.crc32(feature.encode("utf-8"))
+                # 最高位决定符号，减小哈希冲突带来的偏差
+                vectors[row, h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        np.copysign(np.log1p(np.abs(vectors)), vectors, out=vectors)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.divide(vectors, norms, out=vectors, where=norms > 0)
+        return vectors
@@ -0,0 +1,111 @@
+"""
+构建检索索引 - 法规语料目录（.txt/.md/.docx）+ Annotation 表中的审查要点描述
+
+运行（在 backend 目录）：python -m app.rag.indexer [--corpus ./regulations] [--output ./rag_index]
+"""
+import argparse
+import logging
+import math
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.db_models import Annotation
+from app.rag.chunker import chunk_text
+from app.rag.vector_store import write_store
+from app.services.file_service import read_full_doc_content
+
+logger = logging.getLogger(__name__)
+
+CORPUS_SUFFIXES = {".txt", ".md", ".docx"}
+EMBED_BATCH = 1024
+
+
+def _read(path: Path) -> str:
+    if path.suffix.lower() == ".docx":
+        return read_full_doc_content(path)
+    return path.read_text(encoding="utf-8", errors="ignore")
+
+
+def iter_corpus_chunks(corpus_dir: Path, max_tokens: int, overlap: int) -> Iterator[Dict]:
+    """语料目录下每个文件按条款切块，标题为文件名"""
+    corpus_dir = Path(corpus_dir)
+    if not corpus_dir.is_dir():
+        return
+    for path in sorted(p for p in corpus_dir.rglob("*") if p.suffix.lower() in CORPUS_SUFFIXES):
+        try:
+            text = _read(path)
+        except Exception as e:
+            logger.warning(f"语料读取失败，已跳过：{path}，{str(e)}")
+            continue
+        source = path.relative_to(corpus_dir).as_posix()
+        for i, chunk in enumerate(chunk_text(text, max_tokens, overlap)):
+            yield {"id": f"{source}#{i}", "source": source, "title": path.stem, "text": chunk}
+
+
+def iter_annotation_chunks(db: Session) -> Iterator[Dict]:
+    """审查要点（标注类型描述）每条一个块"""
+    for annotation in db.query(Annotation).order_by(Annotation.id):
+        yield {
+            "id": f"annotation:{annotation.id}",
+            "source": "annotation",
+            "title": "审查要点",
+            "text": annotation.content,
+        }
+
+
+def build_index(
+        db: Optional[Session],
+        embedder,
+        corpus_dir: Path,
+        output_dir: Path,
+        max_tokens: Optional[int] = None,
+        overlap: Optional[int] = None,
+        nlist: Optional[int] = None
+) -> int:
+    """
+    构建并写入索引，返回块数
+    :param nlist: IVF 分区数；None 时块数达到 rag_ivf_min_vectors 才按 sqrt(N) 分区
+    """
+    max_tokens = max_tokens or settings.rag_chunk_tokens
+    overlap = settings.rag_chunk_overlap_sentences if overlap is None else overlap
+    chunks: List[Dict] = list(iter_corpus_chunks(corpus_dir, max_tokens, overlap))
+    if db is not None:
+        chunks.extend(iter_annotation_chunks(db))
+
+    vectors = np.zeros((len(chunks), embedder.dim), dtype=np.float32)
+    for start in range(0, len(chunks), EMBED_BATCH):
+        batch = chunks[start:start + EMBED_BATCH]
+        vectors[start:start + len(batch)] = embedder.embed([c["text"] for c in batch])
+
+    if nlist is None:
+        nlist = int(math.sqrt(len(chunks))) if len(chunks) >= settings.rag_ivf_min_vectors else 0
+    write_store(output_dir, vectors, chunks, embedder.name, nlist=nlist)
+    return len(chunks)
+
+
+def main():
+    from app.models import SessionLocal
+    from app.rag.retriever import rag_retriever
+
+    parser = argparse.ArgumentParser(description="构建法规检索索引")
+    parser.add_argument("--corpus", default=settings.rag_corpus_dir)
+    parser.add_argument("--output", default=settings.rag_index_dir)
+    parser.add_argument("--nlist", type=int, default=None, help="IVF 分区数（0 为不分区）")
+    parser.add_argument("--skip-annotations", action="store_true", help="不读取数据库中的审查要点")
+    args = parser.parse_args()
+
+    db = None if args.skip_annotations else SessionLocal()
+    try:
+        count = build_index(db, rag_retriever.embedder, Path(args.corpus), Path(args.output), nlist=args.nlist)
+    finally:
+        if db is not None:
+            db.close()
+    print(f"索引构建完成：{count} 个片段 -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+聊天检索入口 - 按用户问题检索法规/审查要点片段，拼成提示中的 [参考资料]
+- 索引目录不存在或向量化器不匹配时不检索（聊天照常进行）
+- 每次检索前检查 meta.json 的修改时间，索引重建后自动重新加载
+"""
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional
+
+from app.config import settings
+from app.rag.embedder import HashingEmbedder
+from app.rag.vector_store import VectorStore
+from app.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+SEARCH_BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1)
+
+
+@dataclass
+class Passage:
+    """检索到的片段"""
+    id: str
+    source: str
+    title: str
+    text: str
+    score: float
+
+
+class Retriever:
+    """向量检索（索引懒加载，线程安全）"""
+
+    def __init__(
+            self,
+            index_dir: Path,
+            embedder,
+            top_k: int,
+            min_score: float,
+            nprobe: int,
+            enabled: bool = True
+    ):
+        self.index_dir = Path(index_dir)
+        self.embedder = embedder
+        self.top_k = top_k
+        self.min_score = min_score
+        self.nprobe = nprobe
+        self.enabled = enabled
+        self._store: Optional[VectorStore] = None
+        self._loaded_mtime: Optional[float] = None
+        self._lock = threading.Lock()
+        metrics.gauge("rag_index_chunks", lambda: self._store.count if self._store else 0)
+
+    def _current_store(self) -> Optional[VectorStore]:
+        try:
+            mtime = os.stat(self.index_dir / "meta.json").st_mtime
+        except OSError:
+            return None
+        if mtime != self._loaded_mtime:
+            with self._lock:
+                if mtime != self._loaded_mtime:
+                    self._loaded_mtime = mtime
+                    store = None
+                    try:
+                        store = VectorStore(self.index_dir)
+                        if store.embedder != self.embedder.name:
+                            logger.warning(f"检索索引向量化器不匹配：{store.embedder} != {self.embedder.name}，请重建索引")
+                            store.close()
+                            store = None
+                    except Exception:
+                        logger.exception(f"检索索引加载失败：{self.index_dir}")
+                    self._store = store
+        return self._store
+
+    def search(self, query: str, k: Optional[int] = None) -> List[Passage]:
+        """检索与问题最相关的片段（相似度低于 min_score 的丢弃）"""
+        if not self.enabled or not query:
+            return []
+        store = self._current_store()
+        if store is None:
+            return []
+        started = time.perf_counter()
+        hits = store.search(self.embedder.embed([query])[0], k or self.top_k, nprobe=self.nprobe)
+        passages = []
+        for row, score in hits:
+            if score < self.min_score:
+                continue
+            chunk = store.chunk(row)
+            passages.append(Passage(chunk["id"], chunk["source"], chunk.get("title", ""), chunk["text"], score))
+        metrics.histogram("rag_search_seconds", SEARCH_BUCKETS).observe(time.perf_counter() - started)
+        metrics.counter("rag_passages_returned_total").inc(len(passages))
+        if not passages:
+            metrics.counter("rag_empty_results_total").inc()
+        return passages
+
+    def facts_for(self, query: str, context: Optional[str] = None) -> Optional[str]:
+        """请求携带的上下文 + 检索片段，作为提示中的参考资料（按相关度排序，预算不足时截掉末尾）"""
+        sections = [context] if context else []
+        try:
+            passages = self.search(query)
+        except Exception:
+            logger.exception("检索失败")
+            passages = []
+        sections.extend(f"【{p.title}】{p.text}" if p.title else p.text for p in passages)
+        return "\n".join(sections) or None
+
+
+def create_embedder():
+    """按 rag_embedder 配置选择向量化器（索引与查询共用）"""
+    if settings.rag_embedder == "bert":
+        from app.services.embedding_service import embedding_service
+        return embedding_service
+    return HashingEmbedder(settings.rag_embedding_dim)
+
+
+rag_retriever = Retriever(
+    index_dir=Path(settings.rag_index_dir),
+    embedder=create_embedder(),
+    top_k=settings.rag_top_k,
+    min_score=settings.rag_min_score,
+    nprobe=settings.rag_ivf_nprobe,
+    enabled=settings.rag_enabled,
+)
@@ -0,0 +1,172 @@
+"""
+向量存储 - 内存映射的 float32 向量矩阵 + 块信息旁路文件
+目录结构：
+- meta.json：向量化器名称、维度、条数、IVF 分区数
+- vectors.npy：N×D 归一化向量（np.load mmap_mode="r"，按需换页，不整体读入内存）
+- chunks.jsonl / chunks_offsets.npy：与向量逐行对应的块信息（id/source/title/text）及字节偏移
+- ivf_centroids.npy / ivf_offsets.npy：可选 IVF 分区（向量按分区连续存放，每个分区是一段切片）
+检索：查询向量与矩阵做一次矩阵乘法，np.argpartition 取 top-k；开启 IVF 时只扫描最近的 nprobe 个分区
+"""
+import json
+import mmap
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+ASSIGN_BATCH = 10000  # 计算分区归属时每批向量数
+KMEANS_SAMPLE_PER_LIST = 64  # 训练聚类中心时每个分区的采样向量数
+KMEANS_ITERATIONS = 10
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    return np.concatenate([
+        np.argmax(vectors[start:start + ASSIGN_BATCH] @ centroids.T, axis=1)
+        for start in range(0, len(vectors), ASSIGN_BATCH)
+    ])
+
+
+def train_ivf(vectors: np.ndarray, nlist: int, seed: int = 0) -> np.ndarray:
+    """球面 k-means（余弦距离）训练 nlist 个聚类中心，只在采样上迭代"""
+    rng = np.random.default_rng(seed)
+    sample_size = min(len(vectors), nlist * KMEANS_SAMPLE_PER_LIST)
+    sample = np.asarray(vectors[np.sort(rng.choice(len(vectors), sample_size, replace=False))])
+    centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+    for _ in range(KMEANS_ITERATIONS):
+        assign = _assign(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, sample)
+        # 空分区保留原中心
+        filled = np.bincount(assign, minlength=nlist) > 0
+        centroids[filled] = _normalize(sums[filled])
+    return centroids
+
+
+def write_store(
+        directory: Path,
+        vectors: np.ndarray,
+        chunks: Sequence[Dict],
+        embedder_name: str,
+        nlist: int = 0
+) -> Path:
+    """
+    写入向量存储（先写临时目录，完成后替换，检索进程不会读到半成品）
+    :param vectors: N×D，写入前归一化
+    :param chunks: 与向量逐行对应的块信息
+    :param nlist: IVF 分区数（0 表示不分区，全量扫描）
+    """
+    directory = Path(directory)
+    if len(vectors) != len(chunks):
+        raise ValueError("向量条数与块信息条数不一致")
+    vectors = _normalize(np.asarray(vectors, dtype=np.float32))
+    nlist = min(nlist, len(vectors))
+
+    building = directory.with_name(directory.name + ".building")
+    shutil.rmtree(building, ignore_errors=True)
+    building.mkdir(parents=True)
+
+    order = np.arange(len(vectors))
+    if nlist > 1:
+        centroids = train_ivf(vectors, nlist)
+        assign = _assign(vectors, centroids)
+        order = np.argsort(assign, kind="stable")
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=nlist))]).astype(np.int64)
+        np.save(building / "ivf_centroids.npy", centroids)
+        np.save(building / "ivf_offsets.npy", offsets)
+    else:
+        nlist = 0
+
+    out = np.lib.format.open_memmap(building / "vectors.npy", mode="w+", dtype=np.float32, shape=vectors.shape)
+    out[:] = vectors[order]
+    out.flush()
+    del out
+
+    byte_offsets = np.zeros(len(chunks) + 1, dtype=np.int64)
+    with open(building / "chunks.jsonl", "wb") as f:
+        for row, index in enumerate(order):
+            f.write(json.dumps(chunks[index], ensure_ascii=False).encode("utf-8") + b"\n")
+            byte_offsets[row + 1] = f.tell()
+    np.save(building / "chunks_offsets.npy", byte_offsets)
+
+    meta = {
+        "embedder": embedder_name,
+        "dim": int(vectors.shape[1]) if vectors.ndim == 2 else 0,
+        "count": len(chunks),
+        "nlist": nlist,
+        "built_at": time.time(),
+    }
+    (building / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+
+    if directory.exists():
+        retired = directory.with_name(directory.name + ".old")
+        shutil.rmtree(retired, ignore_errors=True)
+        os.replace(directory, retired)
+        os.replace(building, directory)
+        shutil.rmtree(retired, ignore_errors=True)
+    else:
+        os.replace(building, directory)
+    return directory
+
+
+class VectorStore:
+    """只读向量存储（加载即内存映射，多进程共享页缓存）"""
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.meta = json.loads((self.directory / "meta.json").read_text(encoding="utf-8"))
+        self.vectors = np.load(self.directory / "vectors.npy", mmap_mode="r")
+        self._chunk_offsets = np.load(self.directory / "chunks_offsets.npy")
+        self._chunks_file = open(self.directory / "chunks.jsonl", "rb")
+        self._chunks = mmap.mmap(self._chunks_file.fileno(), 0, access=mmap.ACCESS_READ) if self.count else None
+        self.centroids: Optional[np.ndarray] = None
+        self.list_offsets: Optional[np.ndarray] = None
+        if self.meta.get("nlist"):
+            self.centroids = np.load(self.directory / "ivf_centroids.npy")
+            self.list_offsets = np.load(self.directory / "ivf_offsets.npy")
+
+    @property
+    def count(self) -> int:
+        return int(self.meta["count"])
+
+    @property
+    def embedder(self) -> str:
+        return self.meta["embedder"]
+
+    def chunk(self, row: int) -> Dict:
+        start, end = self._chunk_offsets[row], self._chunk_offsets[row + 1]
+        return json.loads(self._chunks[start:end])
+
+    def search(self, query: np.ndarray, k: int, nprobe: Optional[int] = None) -> List[Tuple[int, float]]:
+        """
+        返回 [(行号, 余弦相似度)]，按相似度降序
+        :param nprobe: IVF 扫描的分区数（None 或不小于分区数时全量扫描）
+        """
+        if not self.count or k <= 0:
+            return []
+        query = _normalize(np.asarray(query, dtype=np.float32))
+        if self.centroids is not None and nprobe and nprobe < len(self.centroids):
+            probe = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+            segments = [(int(self.list_offsets[i]), int(self.list_offsets[i + 1])) for i in probe]
+            segments = [(start, end) for start, end in segments if end > start]
+            scores = np.concatenate([self.vectors[start:end] @ query for start, end in segments])
+            rows = np.concatenate([np.arange(start, end) for start, end in segments])
+        else:
+            scores = self.vectors @ query
+            rows = None
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(rows[i] if rows is not None else i), float(scores[i])) for i in top]
+
+    def close(self) -> None:
+        if self._chunks is not None:
+            self._chunks.close()
+        self._chunks_file.close()
@@ -0,0 +1,338 @@
+"""
+审查统计分析服务 - 按时间分桶的汇总表（审查完成时增量更新，支持分批回填）
+"""
+import argparse
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.db_models import (
+    Article, ArticleReviewStats, LabelWeeklyRollup, ReviewMonthlyRollup, Sentence
+)
+
+REVIEWED_STATUS = "已审查"
+UNKNOWN_RISK = "未知"
+
+
+def week_start(dt: datetime) -> date:
+    """所在周的周一"""
+    d = dt.date() if isinstance(dt, datetime) else dt
+    return d - timedelta(days=d.weekday())
+
+
+def month_start(dt: datetime) -> date:
+    """所在月的1号"""
+    d = dt.date() if isinstance(dt, datetime) else dt
+    return d.replace(day=1)
+
+
+def _increment(db: Session, model, keys: Dict, deltas: Dict) -> None:
+    """
+    原子累加一行汇总数据：先 UPDATE col = col + delta，不存在再 INSERT
+    并发插入同一主键时（另一审查任务先插入）回退为 UPDATE
+    """
+    conditions = [getattr(model, k) == v for k, v in keys.items()]
+    stmt = update(model).where(*conditions).values(
+        {getattr(model, c): getattr(model, c) + d for c, d in deltas.items()}
+    )
+    if db.execute(stmt).rowcount:
+        return
+    try:
+        with db.begin_nested():
+            db.execute(insert(model).values(**keys, **deltas))
+    except IntegrityError:
+        db.execute(stmt)
+
+
+def review_contribution(article: Article, stats: Optional[ArticleReviewStats] = None) -> Optional[Dict]:
+    """
+    取出一篇已审查文档计入汇总表的数据（复制为普通dict，不随ORM对象后续修改而变化）
+    文档尚未完成过审查时返回None
+    """
+    stats = stats if stats is not None else article.review_stats
+    if stats is None or article.review_time is None:
+        return None
+    return {
+        "reviewed_at": article.review_time,
+        "risk_level": article.risk_level or UNKNOWN_RISK,
+        "total_sentences": stats.total_sentences,
+        "violation_count": stats.violation_count,
+        "label_histogram": dict(stats.label_histogram or {}),
+        "review_duration_ms": stats.review_duration_ms,
+    }
+
+
+def _apply_contribution(db: Session, contribution: Dict, sign: int) -> None:
+    week = week_start(contribution["reviewed_at"])
+    for label, count in contribution["label_histogram"].items():
+        _increment(
+            db, LabelWeeklyRollup,
+            {"week_start": week, "annotation_id": int(label)},
+            {"violation_count": sign * count, "article_count": sign}
+        )
+
+    duration = contribution["review_duration_ms"]
+    _increment(
+        db, ReviewMonthlyRollup,
+        {"month_start": month_start(contribution["reviewed_at"]), "risk_level": contribution["risk_level"]},
+        {
+            "article_count": sign,
+            "sentence_count": sign * contribution["total_sentences"],
+            "violation_count": sign * contribution["violation_count"],
+            "timed_article_count": sign if duration is not None else 0,
+            "total_review_ms": sign * duration if duration is not None else 0,
+        }
+    )
+
+
+def apply_review_to_rollups(
+        db: Session,
+        article: Article,
+        stats: ArticleReviewStats,
+        previous: Optional[Dict] = None
+) -> None:
+    """
+    审查完成时把本篇文档计入汇总表（与审查结果同一事务提交，由调用方commit）
+    :param previous: 重新审查时，上一次审查的 review_contribution()，先从汇总表中扣除
+    """
+    if previous is not None:
+        _apply_contribution(db, previous, -1)
+    current = review_contribution(article, stats)
+    if current is not None:
+        _apply_contribution(db, current, 1)
+
+
+# -------------------------- 回填 --------------------------
+
+def _histograms_from_sentences(db: Session, article_ids: List[int]) -> Dict[int, Tuple[int, int, Dict[str, int]]]:
+    """缺少物化统计的历史文档：按文档聚合句子表（一次 GROUP BY 一批文档）"""
+    result: Dict[int, Tuple[int, int, Dict[str, int]]] = {
+        article_id: (0, 0, {}) for article_id in article_ids
+    }
+    rows = db.query(
+        Sentence.article_id, Sentence.has_problem, Sentence.annotation_id, func.count(Sentence.id)
+    ).filter(
+        Sentence.article_id.in_(article_ids)
+    ).group_by(Sentence.article_id, Sentence.has_problem, Sentence.annotation_id).all()
+
+    for article_id, has_problem, annotation_id, count in rows:
+        total, violations, histogram = result[article_id]
+        total += count
+        if has_problem:
+            violations += count
+            if annotation_id is not None:
+                histogram[str(annotation_id)] = histogram.get(str(annotation_id), 0) + count
+        result[article_id] = (total, violations, histogram)
+    return result
+
+
+def _batch_contributions(db: Session, articles) -> List[Dict]:
+    """
+    一批已审查文档（Article.id/review_time/risk_level 行）计入汇总表的数据，格式同 review_contribution
+    有物化统计的取统计表，没有的（历史文档）按句子表聚合
+    """
+    ids = [a.id for a in articles]
+    stats_by_id = {
+        s.article_id: s for s in db.query(ArticleReviewStats).filter(ArticleReviewStats.article_id.in_(ids))
+    }
+    missing = [i for i in ids if i not in stats_by_id]
+    aggregated = _histograms_from_sentences(db, missing) if missing else {}
+
+    contributions = []
+    for article in articles:
+        stats = stats_by_id.get(article.id)
+        if stats is not None:
+            total, violations, histogram = stats.total_sentences, stats.violation_count, stats.label_histogram or {}
+            duration = stats.review_duration_ms
+        else:
+            total, violations, histogram = aggregated[article.id]
+            duration = None
+        contributions.append({
+            "reviewed_at": article.review_time,
+            "risk_level": article.risk_level or UNKNOWN_RISK,
+            "total_sentences": total,
+            "violation_count": violations,
+            "label_histogram": dict(histogram),
+            "review_duration_ms": duration,
+        })
+    return contributions
+
+
+def remove_articles_from_rollups(db: Session, article_ids: List[int]) -> int:
+    """
+    文档删除前从汇总表中扣除其审查结果（与删除同一事务提交，由调用方commit；需在删除句子之前调用）
+    计入口径与 rebuild_rollups 相同，删除后增量汇总与重建结果一致
+    :return: 扣除的文档数
+    """
+    articles = db.query(Article.id, Article.review_time, Article.risk_level).filter(
+        Article.id.in_(article_ids),
+        Article.status == REVIEWED_STATUS,
+        Article.review_time.isnot(None)
+    ).all()
+    contributions = _batch_contributions(db, articles) if articles else []
+    for contribution in contributions:
+        _apply_contribution(db, contribution, -1)
+    return len(contributions)
+
+
+def remove_review_from_rollups(db: Session, article: Article) -> None:
+    """
+    审查失败、文档回到待审查时，从汇总表中扣除其上一次审查的结果（由调用方commit，并随后清空 review_time）
+    计入口径与 rebuild_rollups 相同：有物化统计的取统计表，历史文档按句子表聚合
+    """
+    if article.review_time is None:
+        return
+    for contribution in _batch_contributions(db, [article]):
+        _apply_contribution(db, contribution, -1)
+
+
+def rebuild_rollups(db: Session, chunk_size: int = 500) -> Dict[str, int]:
+    """
+    从历史数据重建汇总表：按文档ID分批读取已审查文档，内存中累加后一次性替换汇总表
+    （汇总表行数只与 周数×标签数 / 月数×风险等级 有关，内存占用很小）
+    """
+    label_weekly: Dict[Tuple[date, int], List[int]] = defaultdict(lambda: [0, 0])
+    monthly: Dict[Tuple[date, str], List[int]] = defaultdict(lambda: [0, 0, 0, 0, 0])
+    processed = 0
+    last_id = 0
+
+    while True:
+        articles = db.query(Article.id, Article.review_time, Article.risk_level).filter(
+            Article.status == REVIEWED_STATUS,
+            Article.review_time.isnot(None),
+            Article.id > last_id
+        ).order_by(Article.id).limit(chunk_size).all()
+        if not articles:
+            break
+        last_id = articles[-1].id
+        for contribution in _batch_contributions(db, articles):
+            week = week_start(contribution["reviewed_at"])
+            for label, count in contribution["label_histogram"].items():
+                bucket = label_weekly[(week, int(label))]
+                bucket[0] += count
+                bucket[1] += 1
+
+            bucket = monthly[(month_start(contribution["reviewed_at"]), contribution["risk_level"])]
+            bucket[0] += 1
+            bucket[1] += contribution["total_sentences"]
+            bucket[2] += contribution["violation_count"]
+            duration = contribution["review_duration_ms"]
+            if duration is not None:
+                bucket[3] += 1
+                bucket[4] += duration
+            processed += 1
+
+        db.expunge_all()  # 释放本批ORM对象，保持内存平稳
+
+    try:
+        db.execute(delete(LabelWeeklyRollup))
+        db.execute(delete(ReviewMonthlyRollup))
+        if label_weekly:
+            db.execute(insert(LabelWeeklyRollup), [
+                {"week_start": w, "annotation_id": label, "violation_count": v, "article_count": a}
+                for (w, label), (v, a) in label_weekly.items()
+            ])
+        if monthly:
+            db.execute(insert(ReviewMonthlyRollup), [
+                {
+                    "month_start": m, "risk_level": risk, "article_count": a, "sentence_count": s,
+                    "violation_count": v, "timed_article_count": t, "total_review_ms": ms
+                }
+                for (m, risk), (a, s, v, t, ms) in monthly.items()
+            ])
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise Exception(f"重建统计汇总表失败: {str(e)}")
+
+    return {"articles": processed, "label_weekly_rows": len(label_weekly), "monthly_rows": len(monthly)}
+
+
+# -------------------------- 查询 --------------------------
+
+def label_weekly_trend(
+        db: Session,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        annotation_id: Optional[int] = None
+) -> List[dict]:
+    """每周各标签违规数"""
+    query = db.query(LabelWeeklyRollup)
+    if start:
+        query = query.filter(LabelWeeklyRollup.week_start >= week_start(start))
+    if end:
+        query = query.filter(LabelWeeklyRollup.week_start <= end)
+    if annotation_id is not None:
+        query = query.filter(LabelWeeklyRollup.annotation_id == annotation_id)
+    return [
+        {
+            "week_start": row.week_start.isoformat(),
+            "annotation_id": row.annotation_id,
+            "violation_count": row.violation_count,
+            "article_count": row.article_count,
+        }
+        for row in query.order_by(LabelWeeklyRollup.week_start, LabelWeeklyRollup.annotation_id)
+    ]
+
+
+def _monthly_rows(db: Session, start: Optional[date], end: Optional[date]):
+    query = db.query(ReviewMonthlyRollup)
+    if start:
+        query = query.filter(ReviewMonthlyRollup.month_start >= month_start(start))
+    if end:
+        query = query.filter(ReviewMonthlyRollup.month_start <= end)
+    return query.order_by(ReviewMonthlyRollup.month_start, ReviewMonthlyRollup.risk_level).all()
+
+
+def risk_monthly_distribution(db: Session, start: Optional[date] = None, end: Optional[date] = None) -> List[dict]:
+    """每月风险等级分布"""
+    months: Dict[date, Dict[str, int]] = defaultdict(dict)
+    for row in _monthly_rows(db, start, end):
+        months[row.month_start][row.risk_level] = row.article_count
+    return [
+        {"month_start": m.isoformat(), "total": sum(levels.values()), "risk_levels": levels}
+        for m, levels in months.items()
+    ]
+
+
+def review_time_monthly(db: Session, start: Optional[date] = None, end: Optional[date] = None) -> List[dict]:
+    """每月平均审查耗时与审查量"""
+    months: Dict[date, List[int]] = defaultdict(lambda: [0, 0, 0, 0, 0])
+    for row in _monthly_rows(db, start, end):
+        bucket = months[row.month_start]
+        bucket[0] += row.article_count
+        bucket[1] += row.sentence_count
+        bucket[2] += row.violation_count
+        bucket[3] += row.timed_article_count
+        bucket[4] += row.total_review_ms
+    return [
+        {
+            "month_start": m.isoformat(),
+            "article_count": articles,
+            "sentence_count": sentences,
+            "violation_count": violations,
+            "avg_review_ms": round(total_ms / timed) if timed else None,
+        }
+        for m, (articles, sentences, violations, timed, total_ms) in months.items()
+    ]
+
+
+# 回填命令：python -m app.services.analytics_service backfill --chunk-size 500
+if __name__ == "__main__":
+    from app.models import SessionLocal
+
+    parser = argparse.ArgumentParser(description="审查统计汇总表维护")
+    parser.add_argument("command", choices=["backfill"], help="backfill：从历史数据重建汇总表")
+    parser.add_argument("--chunk-size", type=int, default=500, help="每批读取的文档数")
+    args = parser.parse_args()
+
+    session = SessionLocal()
+    try:
+        result = rebuild_rollups(session, chunk_size=args.chunk_size)
+        print(f"汇总表重建完成：{result}")
+    finally:
+        session.close()
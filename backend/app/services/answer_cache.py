@@ -0,0 +1,90 @@
+"""
+常见问题回答缓存 - 相同（规范化后）问题 + 相同参考资料 + 相同模型 直接返回已生成的回答
+- 只缓存与会话无关的提问：提示中带有对话摘要、要点或历史对话时不缓存（回答依赖上下文）
+- 请求可通过 ChatRequest.use_cache=False 跳过缓存
+- 命中时流式接口按相同的SSE格式分段回放
+"""
+import hashlib
+import re
+import unicodedata
+from typing import Iterator, Optional
+
+from app.config import settings
+from app.services.context_builder import PromptContext
+from app.utils.cache import TTLCache
+from app.utils.metrics import metrics
+
+# 规范化时去掉的标点与空白（中文标点、全角符号、ASCII标点）
+_PUNCTUATION = re.compile(r"[\s\u3000-\u303f\u2010-\u206f\uff01-\uff65!-/:-@\[-`{-~]+")
+
+
+def normalize_question(text: str) -> str:
+    """规范化问题文本：全角转半角、英文小写、去掉标点与空白"""
+    return _PUNCTUATION.sub("", unicodedata.normalize("NFKC", text).lower())
+
+
+class AnswerCache:
+    """回答缓存（LRU + TTL），记录命中率与节省的生成耗时"""
+
+    def __init__(self, max_entries: int, ttl: float, replay_chunk_chars: int = 16, enabled: bool = True):
+        self.enabled = enabled
+        self.replay_chunk_chars = replay_chunk_chars
+        self._cache = TTLCache(max_entries=max_entries, ttl=ttl)
+        self._hits = metrics.counter("chat_answer_cache_hits_total")
+        self._misses = metrics.counter("chat_answer_cache_misses_total")
+        self._bypass = metrics.counter("chat_answer_cache_bypass_total")
+        self._saved = metrics.counter("chat_answer_cache_saved_seconds_total")
+        metrics.gauge("chat_answer_cache_entries", lambda: len(self._cache))
+        metrics.gauge("chat_answer_cache_hit_ratio", self.hit_ratio)
+
+    def hit_ratio(self) -> Optional[float]:
+        lookups = self._hits.value + self._misses.value
+        return round(self._hits.value / lookups, 4) if lookups else None
+
+    def key_for(self, question: str, prompt: PromptContext, model: str, use_cache: bool = True) -> Optional[str]:
+        """
+        计算缓存键；不可缓存（关闭缓存、会话相关提问）时返回None
+        键 = 模型 + 规范化问题 + 系统消息（系统提示与参考资料）的哈希
+        """
+        if not (self.enabled and use_cache) or prompt.turns_included or "summary" in prompt.tokens \
+                or "keypoints" in prompt.tokens:
+            self._bypass.inc()
+            return None
+        normalized = normalize_question(question)
+        if not normalized:
+            self._bypass.inc()
+            return None
+        context_hash = hashlib.sha256(prompt.messages[0]["content"].encode("utf-8")).hexdigest()
+        return hashlib.sha256(f"{model}\x00{normalized}\x00{context_hash}".encode("utf-8")).hexdigest()
+
+    def get(self, key: Optional[str]) -> Optional[str]:
+        """读取缓存的回答（命中时把原始生成耗时计入节省时间）"""
+        if key is None:
+            return None
+        entry = self._cache.get(key)
+        if entry is None:
+            self._misses.inc()
+            return None
+        answer, generation_seconds = entry
+        self._hits.inc()
+        self._saved.inc(generation_seconds)
+        return answer
+
+    def put(self, key: Optional[str], answer: str, generation_seconds: float) -> None:
+        if key is not None and answer:
+            self._cache.set(key, (answer, generation_seconds))
+
+    def replay(self, answer: str) -> Iterator[str]:
+        """把缓存的回答切成小段，按流式接口的增量格式产出"""
+        for start in range(0, len(answer), self.replay_chunk_chars):
+            yield answer[start:start + self.replay_chunk_chars]
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+
+answer_cache = AnswerCache(
+    max_entries=settings.answer_cache_max_entries,
+    ttl=settings.answer_cache_ttl,
+    enabled=settings.answer_cache_enabled,
+)
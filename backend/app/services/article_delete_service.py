@@ -0,0 +1,69 @@
+"""
+文档删除服务 - 集合式分批删除（不加载ORM对象）+ 后台清理文件
+"""
+from typing import Iterable, List, Tuple
+
+from sqlalchemy import delete
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.db_models import Article, ArticleResponseCache, ArticleReviewStats, Sentence
+from app.services import analytics_service
+from app.services.article_list_service import article_count_cache
+from app.services.file_janitor import file_janitor
+from app.services.near_duplicate_service import near_duplicate_index
+from app.services.search_service import search_index
+
+
+def _chunks(ids: List[int], size: int) -> Iterable[List[int]]:
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def delete_articles(db: Session, article_ids: Iterable[int], chunk_size: int = None) -> Tuple[List[int], List[int]]:
+    """
+    删除文档及其句子/审查统计：
+    1. 只查询 ID 和文件路径（不加载 Article/Sentence 对象，避免 ORM 级联逐行删除）
+    2. 句子按主键分批 DELETE，控制单条语句的锁范围与undo体积
+    3. 删除前先从统计汇总表中扣除这些文档的审查结果（同一事务）
+    4. 审查统计/响应缓存等子表由外键 ondelete=CASCADE 兜底，这里显式删除以兼容未开启外键约束的SQLite
+    5. 提交成功后再清理索引/缓存，文件交给后台线程删除
+    :return: (已删除的文档ID, 不存在的文档ID)
+    """
+    chunk_size = chunk_size or settings.delete_chunk_size
+    requested = list(dict.fromkeys(article_ids))
+    rows = []
+    for chunk in _chunks(requested, chunk_size):
+        rows.extend(
+            db.query(Article.id, Article.original_path, Article.annotated_path).filter(Article.id.in_(chunk)).all()
+        )
+    found = [row.id for row in rows]
+    missing = sorted(set(requested) - set(found))
+    if not found:
+        return [], missing
+
+    sentence_ids: List[int] = []
+    try:
+        for chunk in _chunks(found, chunk_size):
+            analytics_service.remove_articles_from_rollups(db, chunk)
+        for chunk in _chunks(found, chunk_size):
+            sentence_ids.extend(sid for (sid,) in db.query(Sentence.id).filter(Sentence.article_id.in_(chunk)))
+        for chunk in _chunks(sentence_ids, chunk_size):
+            db.execute(delete(Sentence).where(Sentence.id.in_(chunk)).execution_options(synchronize_session=False))
+        for chunk in _chunks(found, chunk_size):
+            for child in (ArticleReviewStats, ArticleResponseCache):
+                db.execute(
+                    delete(child).where(child.article_id.in_(chunk)).execution_options(synchronize_session=False)
+                )
+            db.execute(delete(Article).where(Article.id.in_(chunk)).execution_options(synchronize_session=False))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    db.expire_all()  # 会话中可能残留已删除文档的对象
+    article_count_cache.invalidate()
+    search_index.forget_articles(found, sentence_ids)
+    near_duplicate_index.forget(sentence_ids)
+    file_janitor.schedule(path for row in rows for path in (row.original_path, row.annotated_path))
+    return found, missing
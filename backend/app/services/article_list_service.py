@@ -0,0 +1,134 @@
+"""
+文档列表服务 - 游标分页（upload_time, id）与总数缓存
+"""
+import base64
+import json
+import logging
+import threading
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query, Session
+
+from app.config import settings
+from app.models import SessionLocal
+from app.models.db_models import Article
+from app.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+def encode_cursor(article: Article) -> str:
+    """把一页最后一条记录的 (upload_time, id) 编码为不透明游标"""
+    payload = json.dumps([article.upload_time.isoformat(), article.id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """解析游标，格式错误时抛 ValueError"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        upload_time, article_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(upload_time), int(article_id)
+    except Exception as e:
+        raise ValueError(f"无效的分页游标：{cursor}") from e
+
+
+def build_article_query(db: Session, keyword: Optional[str] = None) -> Query:
+    """基础查询+关键词过滤（模糊匹配文件名）"""
+    query = db.query(Article)
+    if keyword:
+        query = query.filter(Article.name.ilike(f"%{keyword}%"))
+    return query
+
+
+def fetch_article_page(
+        db: Session,
+        page_size: int,
+        keyword: Optional[str] = None,
+        cursor: Optional[str] = None,
+        page: int = 1
+) -> Tuple[List[Article], Optional[str]]:
+    """
+    按 (upload_time DESC, id DESC) 取一页文档：
+    - 传入 cursor：从游标之后继续取（走 ix_articles_upload_time_id 索引，无 OFFSET）
+    - 未传 cursor：兼容原有 page 参数（OFFSET 分页）
+    :return: (文档列表, 下一页游标；没有更多数据时为None)
+    """
+    query = build_article_query(db, keyword).order_by(Article.upload_time.desc(), Article.id.desc())
+    if cursor:
+        upload_time, article_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            Article.upload_time < upload_time,
+            and_(Article.upload_time == upload_time, Article.id < article_id)
+        ))
+    elif page > 1:
+        query = query.offset((page - 1) * page_size)
+
+    # 多取一条用于判断是否还有下一页，避免额外的 COUNT
+    rows = query.limit(page_size + 1).all()
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        return rows, encode_cursor(rows[-1])
+    return rows, None
+
+
+class ArticleCountCache:
+    """
+    文档总数缓存（先返回旧值、后台刷新）：
+    - 首次查询同步 COUNT 并缓存
+    - 超过 TTL 后仍返回缓存值，同时由后台线程重新计数（同一关键词同时只刷新一次）
+    - 上传/删除后调用 invalidate()，下次读取即触发后台刷新
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 256, session_factory=None):
+        self.ttl = ttl
+        self._session_factory = session_factory or SessionLocal
+        # 条目本身不过期（由 ArticleCountCache 判断新旧），仅按LRU淘汰
+        self._cache = TTLCache(max_entries=max_entries, ttl=float("inf"))
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    @staticmethod
+    def _count(db: Session, keyword: Optional[str]) -> int:
+        return build_article_query(db, keyword).order_by(None).count()
+
+    def get(self, db: Session, keyword: Optional[str] = None) -> int:
+        cached = self._cache.get_with_age(keyword)
+        if cached is None:
+            total = self._count(db, keyword)
+            self._cache.set(keyword, (total, self._generation))
+            return total
+
+        (total, generation), age = cached
+        if age > self.ttl or generation != self._generation:
+            self._refresh_async(keyword)
+        return total
+
+    def _refresh_async(self, keyword: Optional[str]) -> None:
+        with self._lock:
+            if keyword in self._refreshing:
+                return
+            self._refreshing.add(keyword)
+        threading.Thread(target=self._refresh, args=(keyword,), daemon=True).start()
+
+    def _refresh(self, keyword: Optional[str]) -> None:
+        generation = self._generation
+        db = self._session_factory()
+        try:
+            self._cache.set(keyword, (self._count(db, keyword), generation))
+        except Exception:
+            logger.exception(f"文档总数刷新失败（关键词：{keyword}）")
+        finally:
+            db.close()
+            with self._lock:
+                self._refreshing.discard(keyword)
+
+    def invalidate(self) -> None:
+        """标记所有缓存为旧值（不清空，读取方仍可立即拿到近似总数）"""
+        self._generation += 1
+
+
+article_count_cache = ArticleCountCache(ttl=settings.article_count_cache_ttl)
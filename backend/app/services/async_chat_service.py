@@ -0,0 +1,200 @@
+"""
+异步聊天服务 - 发送消息/流式回复全程在事件循环内完成
+（数据库走异步会话，模型调用走共享 httpx 异步连接池，不占用线程池）
+"""
+import asyncio
+import time
+from datetime import datetime
+from typing import AsyncGenerator, Dict, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.db_models import ChatMessage, ChatSession
+from app.models.schemas import ChatRequest, ChatResponse
+from app.rag.retriever import rag_retriever
+from app.services.answer_cache import answer_cache
+from app.services.chat_search_service import chat_search_index
+from app.services.context_builder import PromptContext, context_builder
+from app.services.llm_client import llm_provider
+from app.services.memory_service import MemoryService, PromptMemory
+from app.services.summary_worker import summary_worker
+from app.services.volcengine_service import volcengine_service
+
+
+def _session_title(message: str) -> str:
+    return message[:30] + "..." if len(message) > 30 else message
+
+
+class AsyncChatService:
+    """异步聊天服务类"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        # 未配置API Key时不使用记忆功能
+        self.memory_enabled = bool(llm_provider.config.api_key)
+
+    # -------------------------- 会话与消息 --------------------------
+
+    async def get_session(self, session_id: str) -> Optional[ChatSession]:
+        """获取会话信息"""
+        result = await self.db.execute(
+            select(ChatSession).where(
+                ChatSession.session_id == session_id,
+                ChatSession.is_active == True
+            )
+        )
+        return result.scalars().first()
+
+    async def create_session(self, title: str, user_id: Optional[str] = None) -> ChatSession:
+        """创建新的聊天会话"""
+        try:
+            session = ChatSession(user_id=user_id, title=title or "新对话")
+            self.db.add(session)
+            await self.db.commit()
+            return session
+        except Exception as e:
+            await self.db.rollback()
+            raise Exception(f"创建会话失败: {str(e)}")
+
+    async def create_message(self, session_id: str, role: str, content: str) -> ChatMessage:
+        """创建新消息，并更新会话的更新时间与消息数"""
+        try:
+            session = await self.get_session(session_id)
+            if not session:
+                raise Exception("会话不存在")
+
+            message = ChatMessage(session_id=session_id, role=role, content=content, message_type="text")
+            self.db.add(message)
+            session.updated_at = datetime.utcnow()
+            session.message_count = ChatSession.message_count + 1
+
+            await self.db.commit()
+            chat_search_index.on_insert(message.id, content, session.user_id)
+            return message
+        except Exception as e:
+            await self.db.rollback()
+            raise Exception(f"创建消息失败: {str(e)}")
+
+    async def _prepare(self, request: ChatRequest):
+        """获取或创建会话，保存用户消息，返回 (session_id, 用户消息, 组装好的提示, 回答缓存键)"""
+        session_id = request.session_id
+        if not session_id:
+            session = await self.create_session(_session_title(request.message), request.user_id)
+            session_id = session.session_id
+
+        user_message = await self.create_message(session_id, "user", request.message)
+        memory = await self._memory(session_id, request.message)
+        # 请求携带的上下文与检索到的法规片段作为参考资料，与摘要、要点、最近对话一起按token预算组装
+        facts = await asyncio.to_thread(rag_retriever.facts_for, request.message, request.context)
+        prompt = context_builder.build(
+            request.message, summary=memory.summary, keypoints=memory.keypoints, facts=facts, history=memory.history
+        )
+        cache_key = answer_cache.key_for(request.message, prompt, llm_provider.config.model, request.use_cache)
+        return session_id, user_message, prompt, cache_key
+
+    # -------------------------- 记忆 --------------------------
+
+    async def _memory(self, session_id: str, user_message: str) -> PromptMemory:
+        """
+        把用户消息加入记忆，并返回发送给模型的会话记忆（摘要、要点、最近对话）
+        MemoryService 为同步实现，这里通过 run_sync 在异步连接上执行，查询本身不阻塞事件循环
+        """
+        if not self.memory_enabled:
+            return PromptMemory()
+        try:
+            return await self.db.run_sync(self._add_user_message, session_id, user_message)
+        except Exception:
+            # 记忆不可用时不影响正常回复
+            return PromptMemory()
+
+    @staticmethod
+    def _add_user_message(sync_db, session_id: str, user_message: str):
+        memory_service = MemoryService(sync_db)
+        memory_service.add_message(session_id, "user", user_message)
+        return memory_service.get_prompt_memory(session_id, user_message)
+
+    async def _remember_reply(self, session_id: str, ai_response: str) -> None:
+        """把AI回复加入记忆，摘要交给后台任务按阈值合并（不等待）"""
+        if not self.memory_enabled:
+            return
+        try:
+            await self.db.run_sync(
+                lambda sync_db: MemoryService(sync_db).add_message(session_id, "assistant", ai_response)
+            )
+            summary_worker.notify(session_id)
+        except Exception:
+            pass
+
+    # -------------------------- 发送消息 --------------------------
+
+    async def send_message(self, request: ChatRequest) -> ChatResponse:
+        """发送消息并获取AI回复"""
+        try:
+            session_id, _, prompt, cache_key = await self._prepare(request)
+
+            # 与会话无关的常见问题优先使用缓存的回答
+            ai_response = answer_cache.get(cache_key)
+            if ai_response is None:
+                started = time.perf_counter()
+                response = await volcengine_service.chat_completion(prompt.messages)
+                ai_response = (response["choices"][0]["message"].get("content") or "").strip()
+                answer_cache.put(cache_key, ai_response, time.perf_counter() - started)
+
+            ai_message = await self.create_message(session_id, "assistant", ai_response)
+            await self._remember_reply(session_id, ai_response)
+
+            return ChatResponse(
+                success=True,
+                message=ai_response,
+                session_id=session_id,
+                message_id=ai_message.id,
+                timestamp=ai_message.created_at
+            )
+        except Exception as e:
+            return ChatResponse(
+                success=False,
+                message=f"处理消息失败: {str(e)}",
+                session_id=request.session_id or "",
+                message_id=0,
+                timestamp=datetime.utcnow()
+            )
+
+    @staticmethod
+    async def _deltas(prompt: PromptContext, cached: Optional[str]) -> AsyncGenerator[str, None]:
+        if cached is not None:
+            for delta in answer_cache.replay(cached):
+                yield delta
+            return
+        async for delta in volcengine_service.stream_deltas(prompt.messages):
+            yield delta
+
+    async def send_message_stream(self, request: ChatRequest) -> AsyncGenerator[Dict, None]:
+        """流式发送消息（异步生成器）：模型每返回一段增量文本就产出一段"""
+        try:
+            session_id, user_message, prompt, cache_key = await self._prepare(request)
+            cached = answer_cache.get(cache_key)
+
+            # 命中缓存时按相同格式分段回放
+            started = time.perf_counter()
+            final_text_parts: list[str] = []
+            async for delta in self._deltas(prompt, cached):
+                final_text_parts.append(delta)
+                yield {
+                    "content": delta,
+                    "session_id": session_id,
+                    "message_id": user_message.id
+                }
+
+            # 保存完整的AI回复
+            ai_response = "".join(final_text_parts).strip()
+            if cached is None:
+                answer_cache.put(cache_key, ai_response, time.perf_counter() - started)
+            await self.create_message(session_id, "assistant", ai_response)
+            await self._remember_reply(session_id, ai_response)
+        except Exception as e:
+            yield {
+                "content": f"处理消息失败: {str(e)}",
+                "session_id": request.session_id or "",
+                "message_id": 0
+            }
@@ -0,0 +1,218 @@
+"""
+批量上传服务 - 多文件/zip压缩包批量入库，并行转换与句子提取
+"""
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+from fastapi import HTTPException, UploadFile
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import serializers
+from app.models.db_models import Article, Sentence
+from app.services.file_service import (
+    allowed_file, build_article, extract_sentences_from_docx,
+    prepare_annotated_docx, store_upload_stream
+)
+
+
+@dataclass
+class BulkUploadItem:
+    """批量上传中单个文件的处理状态"""
+    filename: str
+    original_path: Optional[Path] = None
+    annotated_path: Optional[Path] = None
+    sentences: List[str] = field(default_factory=list)
+    article: Optional[Article] = None
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def cleanup_files(self) -> None:
+        """删除已落盘的文件（入库失败时调用，避免残留）"""
+        for path in (self.original_path, self.annotated_path):
+            if path is not None and path.exists():
+                path.unlink()
+
+    def to_result(self) -> dict:
+        return {
+            "filename": self.filename,
+            "success": self.ok and self.article is not None,
+            "sentence_count": len(self.sentences) if self.ok else 0,
+            "data": serializers.article_to_dict(self.article) if self.article is not None else None,
+            "error": self.error,
+        }
+
+
+def _is_zip(upload: UploadFile) -> bool:
+    return (upload.filename or "").lower().endswith(".zip")
+
+
+def iter_upload_sources(files: List[UploadFile], max_file_size: int) -> Iterator[Tuple[str, Optional[BinaryIO], Optional[str]]]:
+    """
+    展开上传来源：普通文件原样产出，zip压缩包逐个产出其中的成员流
+    :return: (文件名, 文件流, 错误信息) —— 出错时文件流为None
+    """
+    for upload in files:
+        if not _is_zip(upload):
+            yield upload.filename, upload.file, None
+            continue
+
+        try:
+            archive = zipfile.ZipFile(upload.file)
+        except zipfile.BadZipFile:
+            yield upload.filename, None, "无效的zip压缩包"
+            continue
+
+        with archive:
+            for info in archive.infolist():
+                if info.is_dir():
+                    continue
+                # 只取成员的文件名部分，忽略压缩包内的目录结构（防止路径穿越）
+                member_name = PurePosixPath(info.filename.replace("\\", "/")).name
+                if not member_name or member_name.startswith("."):
+                    continue
+                if info.file_size > max_file_size:
+                    yield member_name, None, f"文件过大（{info.file_size // 1024}KB）"
+                    continue
+                with archive.open(info) as member_stream:
+                    yield member_name, member_stream, None
+
+
+def stage_uploads(files: List[UploadFile], max_file_size: int) -> List[BulkUploadItem]:
+    """逐个把上传文件（含zip成员）分块写入存储目录，不做转换"""
+    items: List[BulkUploadItem] = []
+    for filename, stream, error in iter_upload_sources(files, max_file_size):
+        if len(items) >= settings.bulk_upload_max_files:
+            for staged in items:
+                staged.cleanup_files()
+            raise HTTPException(
+                status_code=413,
+                detail=f"单次批量上传最多支持{settings.bulk_upload_max_files}个文件"
+            )
+
+        item = BulkUploadItem(filename=filename, error=error)
+        items.append(item)
+        if error is not None:
+            continue
+        if not allowed_file(filename):
+            item.error = f"不支持的文件类型：{filename.rsplit('.', 1)[-1]}"
+            continue
+
+        try:
+            item.original_path = store_upload_stream(stream, filename, max_size=max_file_size)
+        except HTTPException as e:
+            item.error = e.detail
+    return items
+
+
+def _convert_and_extract(item: BulkUploadItem) -> BulkUploadItem:
+    """线程池任务：PDF转docx + 提取句子"""
+    if not item.ok:
+        return item
+    try:
+        item.annotated_path = prepare_annotated_docx(item.original_path)
+        item.sentences = extract_sentences_from_docx(item.annotated_path)
+    except HTTPException as e:
+        item.error = e.detail
+    except Exception as e:
+        item.error = f"文件解析失败：{str(e)}"
+    if not item.ok:
+        item.cleanup_files()
+    return item
+
+
+def extract_concurrently(items: List[BulkUploadItem], max_workers: Optional[int] = None) -> List[BulkUploadItem]:
+    """在线程池中并行完成转换和句子提取（保持输入顺序）"""
+    pending = [item for item in items if item.ok]
+    if not pending:
+        return items
+    workers = max(1, min(max_workers or settings.max_concurrent_uploads, len(pending)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bulk-extract") as executor:
+        list(executor.map(_convert_and_extract, pending))
+    return items
+
+
+def _mark_duplicate_names(db: Session, items: List[BulkUploadItem]) -> None:
+    """文件名在库中唯一：预先查出已存在/批次内重复的文件名，标记为失败"""
+    names = [item.filename for item in items if item.ok]
+    if not names:
+        return
+    existing = {
+        name for (name,) in db.query(Article.name).filter(Article.name.in_(names)).all()
+    }
+    seen = set()
+    for item in items:
+        if not item.ok:
+            continue
+        if item.filename in existing or item.filename in seen:
+            item.error = "同名文档已存在"
+            item.cleanup_files()
+        seen.add(item.filename)
+
+
+def _insert_items(db: Session, items: List[BulkUploadItem]) -> None:
+    """在当前事务中写入一组文档及其句子（句子用单条多值INSERT批量写入）"""
+    for item in items:
+        item.article = build_article(item.filename, item.original_path, item.annotated_path)
+    db.add_all([item.article for item in items])
+    db.flush()  # 获取自增ID
+
+    sentence_rows = [
+        {"content": sentence, "article_id": item.article.id, "has_problem": None, "annotation_id": None}
+        for item in items
+        for sentence in item.sentences
+    ]
+    if sentence_rows:
+        db.execute(insert(Sentence), sentence_rows)
+
+
+def persist_items(db: Session, items: List[BulkUploadItem], batch_size: Optional[int] = None) -> None:
+    """
+    分批事务入库：每批文件一个事务；某批失败时回退为逐个入库，定位出错的文件
+    """
+    _mark_duplicate_names(db, items)
+    ready = [item for item in items if item.ok]
+    batch_size = batch_size or settings.bulk_upload_batch_size
+
+    for start in range(0, len(ready), batch_size):
+        batch = ready[start:start + batch_size]
+        try:
+            _insert_items(db, batch)
+            db.commit()
+            continue
+        except Exception:
+            db.rollback()
+
+        for item in batch:
+            try:
+                _insert_items(db, [item])
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                item.article = None
+                item.error = f"写入数据库失败：{str(e)}"
+                item.cleanup_files()
+
+    for item in ready:
+        if item.article is not None:
+            db.refresh(item.article)
+
+
+def bulk_upload(db: Session, files: List[UploadFile], max_file_size: int) -> List[BulkUploadItem]:
+    """
+    批量上传主流程：
+    1. 逐个分块落盘（zip自动展开）
+    2. 线程池并行转换+提取句子
+    3. 分批事务写入 Article/Sentence
+    """
+    items = stage_uploads(files, max_file_size)
+    extract_concurrently(items)
+    persist_items(db, items)
+    return items
@@ -0,0 +1,157 @@
+"""
+会话导出 - 分批读取消息、边读边写，导出任意长度的会话内存占用恒定
+- 消息按 (created_at, id) 键集分页读取（走 ix_chat_messages_session_id_created_at_id），每批只取导出需要的列
+- 支持 json（单个文档）/ ndjson（每行一条记录）/ txt 三种格式
+- 批量导出：把某个用户的全部会话逐个写入 zip 包，zip 流式生成（不落盘、不在内存中拼出整个压缩包）
+- 响应开始后请求的数据库会话可能已关闭，导出生成器在同一数据库上自行打开会话
+"""
+import json
+import zipfile
+from typing import Iterator, Optional
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.db_models import ChatMessage, ChatSession
+
+EXPORT_FORMATS = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+    "txt": "text/plain; charset=utf-8",
+}
+
+
+def _session_dict(session: ChatSession) -> dict:
+    return {
+        "id": session.session_id,
+        "title": session.title,
+        "created_at": session.created_at.isoformat(),
+        "updated_at": session.updated_at.isoformat(),
+    }
+
+
+def _message_dict(row) -> dict:
+    return {
+        "id": row.id,
+        "role": row.role,
+        "content": row.content,
+        "message_type": row.message_type,
+        "created_at": row.created_at.isoformat(),
+    }
+
+
+def _dumps(data: dict) -> str:
+    return json.dumps(data, ensure_ascii=False)
+
+
+def iter_message_batches(db: Session, session_id: str, batch_size: Optional[int] = None) -> Iterator[list]:
+    """按时间正序分批产出会话消息（只读导出所需的列，不进入会话的对象缓存）"""
+    batch_size = batch_size or settings.chat_export_batch_size
+    columns = (ChatMessage.id, ChatMessage.role, ChatMessage.content, ChatMessage.message_type, ChatMessage.created_at)
+    last = None
+    while True:
+        q = db.query(*columns).filter(ChatMessage.session_id == session_id)
+        if last is not None:
+            q = q.filter(or_(
+                ChatMessage.created_at > last.created_at,
+                and_(ChatMessage.created_at == last.created_at, ChatMessage.id > last.id)
+            ))
+        rows = q.order_by(ChatMessage.created_at, ChatMessage.id).limit(batch_size).all()
+        if not rows:
+            return
+        yield rows
+        if len(rows) < batch_size:
+            return
+        last = rows[-1]
+
+
+def iter_export(db: Session, session: ChatSession, format: str = "json", batch_size: Optional[int] = None) -> Iterator[str]:
+    """按格式逐段产出导出内容（每批消息一段）"""
+    if format not in EXPORT_FORMATS:
+        raise ValueError(f"不支持的导出格式: {format}")
+    batches = iter_message_batches(db, session.session_id, batch_size)
+
+    if format == "json":
+        yield '{"session": ' + _dumps(_session_dict(session)) + ', "messages": ['
+        separator = "\n"
+        for rows in batches:
+            parts = []
+            for row in rows:
+                parts.append(separator + _dumps(_message_dict(row)))
+                separator = ",\n"
+            yield "".join(parts)
+        yield "\n]}\n"
+
+    elif format == "ndjson":
+        yield _dumps({"type": "session", **_session_dict(session)}) + "\n"
+        for rows in batches:
+            yield "".join(_dumps({"type": "message", **_message_dict(row)}) + "\n" for row in rows)
+
+    else:
+        yield f"会话: {session.title}\n创建时间: {session.created_at}\n\n"
+        for rows in batches:
+            parts = []
+            for row in rows:
+                role_name = "用户" if row.role == "user" else "AI助手"
+                parts.append(f"[{role_name}] {row.created_at.strftime('%Y-%m-%d %H:%M:%S')}\n{row.content}\n\n")
+            yield "".join(parts)
+
+
+def stream_conversation(bind, session_id: str, format: str = "json") -> Iterator[bytes]:
+    """单个会话的流式导出（在 bind 上自行打开数据库会话，供 StreamingResponse 使用）"""
+    with Session(bind=bind) as db:
+        session = db.query(ChatSession).filter(ChatSession.session_id == session_id).first()
+        if session is None:
+            return
+        for chunk in iter_export(db, session, format):
+            yield chunk.encode("utf-8")
+
+
+class _ZipSink:
+    """zipfile 的只写输出目标：暂存写入的字节，由生成器随时取走（不可 seek，zipfile 改用数据描述符）"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_user_archive(bind, user_id: str, format: str = "json", batch_size: Optional[int] = None) -> Iterator[bytes]:
+    """把用户的全部（未删除）会话逐个导出并流式打包为 zip，每个会话一个文件"""
+    if format not in EXPORT_FORMATS:
+        raise ValueError(f"不支持的导出格式: {format}")
+    batch_size = batch_size or settings.chat_export_batch_size
+    sink = _ZipSink()
+    with Session(bind=bind) as db, zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        last_id = 0
+        while True:
+            sessions = db.query(ChatSession).filter(
+                ChatSession.user_id == user_id,
+                ChatSession.is_active == True,
+                ChatSession.id > last_id
+            ).order_by(ChatSession.id).limit(batch_size).all()
+            for session in sessions:
+                # 条目大小事先未知，force_zip64 保证超过 4GB 的会话也能正确写入
+                with archive.open(f"conversation_{session.session_id}.{format}", mode="w", force_zip64=True) as entry:
+                    for chunk in iter_export(db, session, format, batch_size):
+                        entry.write(chunk.encode("utf-8"))
+                        data = sink.drain()
+                        if data:
+                            yield data
+            if len(sessions) < batch_size:
+                break
+            last_id = sessions[-1].id
+            db.expunge_all()
+    # 关闭 zip 后写入中央目录
+    yield sink.drain()
@@ -0,0 +1,188 @@
+"""
+聊天消息全文检索 - 消息内容的字符 n-gram 倒排索引（复用 NgramIndex）
+- 消息写入后立即加入索引（create_message 调用 on_insert），查询前再按自增ID追平其他worker写入的消息
+- 每条消息记录所属用户（进程内编码为整数），按用户过滤在内存中完成，不回库扫描其他用户的候选
+- 候选回库精确校验（内容包含、会话未删除），按会话聚合：命中消息数多的在前，同数量按最近命中时间，
+  每个会话附带命中消息的片段；标题包含关键词的会话额外计一次命中（短于 n 个字符的查询只匹配标题）
+- 服务启动时在后台线程构建（warm_in_background），构建完成前的查询直接回库 LIKE 扫描，不在请求内整体构建
+- 内存：索引在每个 worker 进程内各有一份。每条消息约占 4 字节 × 不同 n-gram 数（倒排表）+ 5 字节（状态、所属用户），
+  另有每个不同 n-gram 约 150 字节的字典开销；平均 100 字的消息约 0.4KB，百万条消息每个 worker 约 400MB。
+  消息量超出单进程可承受的范围时，应改用 MySQL 的 ngram 全文索引（FULLTEXT ... WITH PARSER ngram）替代本索引
+"""
+import threading
+from array import array
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import serializers
+from app.models.db_models import ChatMessage, ChatSession
+from app.services.search_service import VERIFY_CHUNK_SIZE, BackgroundBuild, NgramIndex, catch_up
+from app.utils.metrics import metrics
+
+SNIPPET_CONTEXT_CHARS = 30  # 片段中关键词前后保留的字符数
+SNIPPETS_PER_SESSION = 3
+
+
+def make_snippet(content: str, keyword: str, context: int = SNIPPET_CONTEXT_CHARS) -> str:
+    """截取关键词首次出现位置前后的文本，两端被截断时加省略号"""
+    position = content.lower().find(keyword.lower())
+    if position < 0:
+        return content[:context * 2] + ("…" if len(content) > context * 2 else "")
+    start = max(position - context, 0)
+    end = min(position + len(keyword) + context, len(content))
+    return ("…" if start > 0 else "") + content[start:end] + ("…" if end < len(content) else "")
+
+
+class ChatSearchIndex(BackgroundBuild):
+    """进程内聊天消息检索索引（启动时后台构建；未启用后台构建时首次查询时从数据库分批构建）"""
+
+    def __init__(self, n: int = 2, max_candidates: int = 20000):
+        self.messages = NgramIndex(n)
+        self.max_candidates = max_candidates
+        # 消息ID -> 所属用户编码（0 表示匿名会话）
+        self._owners = array("I")
+        self._owner_codes: Dict[Optional[str], int] = {None: 0}
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._watermark = 0
+        self.built = False
+
+    def clear(self) -> None:
+        """清空索引（下次查询时重新从数据库构建）"""
+        with self._sync_lock:
+            self.messages = NgramIndex(self.messages.n)
+            self._owners = array("I")
+            self._owner_codes = {None: 0}
+            self._watermark = 0
+            self.built = False
+
+    def _owner_code(self, user_id: Optional[str], create: bool = False) -> Optional[int]:
+        code = self._owner_codes.get(user_id)
+        if code is None and create:
+            with self._lock:
+                code = self._owner_codes.setdefault(user_id, len(self._owner_codes))
+        return code
+
+    def add(self, message_id: int, content: str, user_id: Optional[str]) -> bool:
+        code = self._owner_code(user_id, create=True)
+        with self._lock:
+            if message_id >= len(self._owners):
+                self._owners.extend([0] * max(message_id + 1 - len(self._owners), len(self._owners) // 2))
+            self._owners[message_id] = code
+        return self.messages.add(message_id, content)
+
+    def sync(self, db: Session) -> int:
+        """把数据库中尚未索引的消息加入索引，返回新增条数"""
+        with self._sync_lock:
+            added, self._watermark = catch_up(
+                db, ChatMessage.id, self._watermark, self.messages.contains,
+                lambda missing: db.query(ChatMessage.id, ChatMessage.content, ChatSession.user_id).join(
+                    ChatSession, ChatMessage.session_id == ChatSession.session_id
+                ).filter(ChatMessage.id.in_(missing)).all(),
+                lambda row: self.add(*row)
+            )
+            self.built = True
+            return added
+
+    def on_insert(self, message_id: int, content: str, user_id: Optional[str]) -> None:
+        """消息写入后调用：索引已构建时直接加入；尚未构建则留给首次查询时整体构建"""
+        if self.built:
+            self.add(message_id, content, user_id)
+
+    def search(self, db: Session, query: str, user_id: Optional[str] = None, limit: int = 20) -> List[dict]:
+        """
+        检索消息内容包含关键词的会话（user_id 为空时不按用户过滤）
+        返回会话信息 + matches（命中消息数）+ snippets（最近命中消息的片段）
+        """
+        keyword = query.strip()
+        if not self.ready(db):
+            candidates = self._db_candidates(db, keyword, user_id)
+        else:
+            candidates = self.messages.search(keyword)
+            if user_id is not None:
+                code = self._owner_code(user_id)
+                owners = self._owners
+                candidates = [d for d in candidates if code is not None and d < len(owners) and owners[d] == code]
+        if len(candidates) > self.max_candidates:
+            # 命中过多时只校验最新的部分，保证查询耗时有上界
+            metrics.counter("chat_search_truncated_total").inc()
+            candidates = candidates[:self.max_candidates]
+        metrics.counter("chat_search_candidates_total").inc(len(candidates))
+
+        hits: Dict[str, dict] = {}
+        for start in range(0, len(candidates), VERIFY_CHUNK_SIZE):
+            chunk = candidates[start:start + VERIFY_CHUNK_SIZE]
+            q = db.query(
+                ChatMessage.id, ChatMessage.session_id, ChatMessage.role, ChatMessage.content, ChatMessage.created_at
+            ).join(
+                ChatSession, ChatMessage.session_id == ChatSession.session_id
+            ).filter(
+                ChatMessage.id.in_(chunk),
+                ChatMessage.content.contains(keyword, autoescape=True),
+                ChatSession.is_active == True
+            )
+            if user_id is not None:
+                q = q.filter(ChatSession.user_id == user_id)
+            for row in q.order_by(ChatMessage.id.desc()).all():
+                entry = hits.setdefault(row.session_id, {"matches": 0, "last_match": row.created_at, "snippets": []})
+                entry["matches"] += 1
+                entry["last_match"] = max(entry["last_match"], row.created_at)
+                if len(entry["snippets"]) < SNIPPETS_PER_SESSION:
+                    entry["snippets"].append({
+                        "message_id": row.id,
+                        "role": row.role,
+                        "snippet": make_snippet(row.content, keyword),
+                        "created_at": row.created_at,
+                    })
+
+        sessions: Dict[str, ChatSession] = {}
+        title_query = db.query(ChatSession).filter(
+            ChatSession.is_active == True,
+            ChatSession.title.contains(keyword, autoescape=True)
+        )
+        if user_id is not None:
+            title_query = title_query.filter(ChatSession.user_id == user_id)
+        for session in title_query.order_by(ChatSession.updated_at.desc()).limit(limit):
+            sessions[session.session_id] = session
+            entry = hits.setdefault(
+                session.session_id, {"matches": 0, "last_match": session.updated_at, "snippets": []}
+            )
+            entry["matches"] += 1
+
+        ranked = sorted(hits.items(), key=lambda item: (item[1]["matches"], item[1]["last_match"]), reverse=True)
+        ranked = ranked[:limit]
+        missing = [session_id for session_id, _ in ranked if session_id not in sessions]
+        if missing:
+            sessions.update(
+                (s.session_id, s) for s in db.query(ChatSession).filter(ChatSession.session_id.in_(missing))
+            )
+        results = []
+        for session_id, entry in ranked:
+            data = serializers.chat_session_to_dict(sessions[session_id])
+            data["matches"] = entry["matches"]
+            data["snippets"] = entry["snippets"]
+            results.append(data)
+        return results
+
+    def _db_candidates(self, db: Session, keyword: str, user_id: Optional[str]) -> List[int]:
+        """索引构建完成前的回退：直接回库扫描内容包含关键词的消息ID（降序，最多 max_candidates 条）"""
+        if not self.messages.grams(keyword):
+            return []
+        q = db.query(ChatMessage.id).join(
+            ChatSession, ChatMessage.session_id == ChatSession.session_id
+        ).filter(
+            ChatMessage.content.contains(keyword, autoescape=True),
+            ChatSession.is_active == True
+        )
+        if user_id is not None:
+            q = q.filter(ChatSession.user_id == user_id)
+        return [message_id for (message_id,) in q.order_by(ChatMessage.id.desc()).limit(self.max_candidates + 1)]
+
+    def stats(self) -> Dict[str, int]:
+        return {**self.messages.stats(), "users": len(self._owner_codes)}
+
+
+# 全局索引实例（服务启动时后台构建）
+chat_search_index = ChatSearchIndex(n=settings.search_ngram_size, max_candidates=settings.chat_search_max_candidates)
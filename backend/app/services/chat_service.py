@@ -2,13 +2,14 @@
 聊天服务层 - 处理聊天相关的业务逻辑
 """
 import os
+import base64
 import json
+import time
 import uuid
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, and_
-import threading
+from sqlalchemy import desc, and_, or_
 
 from app.models.db_models import ChatSession, ChatMessage, ChatAttachment, ChatSettings
 from app.config import settings
@@ -17,7 +18,31 @@ from app.models.schemas import (
     ChatRequest, ChatResponse, FileUploadResponse, FileAnalysisRequest,
     FileAnalysisResponse, ChatSettingsCreate
 )
-from app.services.memory_service import MemoryService
+from app.rag.retriever import rag_retriever
+from app.services.answer_cache import answer_cache
+from app.services.chat_export_service import iter_export
+from app.services.chat_search_service import chat_search_index
+from app.services.context_builder import PromptContext, context_builder
+from app.services.memory_service import MemoryService, PromptMemory
+from app.services.memory_store import memory_store
+from app.services.summary_worker import summary_worker
+from app.services.llm_client import llm_provider
+
+
+def encode_message_cursor(message: ChatMessage) -> str:
+    """把一页中最早一条消息的 (created_at, id) 编码为不透明游标"""
+    payload = json.dumps([message.created_at.isoformat(), message.id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_message_cursor(cursor: str) -> Tuple[datetime, int]:
+    """解析游标，格式错误时抛 ValueError"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, message_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(created_at), int(message_id)
+    except Exception as e:
+        raise ValueError(f"无效的分页游标：{cursor}") from e
 
 
 class ChatService:
@@ -94,6 +119,7 @@ class ChatService:
             session.updated_at = datetime.utcnow()
             
             self.db.commit()
+            memory_store.delete(session_id)
             return True
         except Exception as e:
             self.db.rollback()
@@ -120,32 +146,64 @@ class ChatService:
             
             self.db.add(message)
             
-            # 更新会话的更新时间
+            # 更新会话的更新时间，消息数在数据库端原子+1（并发写入不丢计数）
             session.updated_at = datetime.utcnow()
+            session.message_count = ChatSession.message_count + 1
             
             self.db.commit()
             self.db.refresh(message)
             
+            chat_search_index.on_insert(message.id, message.content, session.user_id)
             return message
         except Exception as e:
             self.db.rollback()
             raise Exception(f"创建消息失败: {str(e)}")
     
     def get_session_messages(self, session_id: str, limit: int = 100) -> List[ChatMessage]:
-        """获取会话的消息列表"""
+        """获取会话最近的 limit 条消息（按时间正序）"""
+        return self.get_message_page(session_id, limit)[0]
+
+    def get_message_page(
+            self,
+            session_id: str,
+            limit: int = 100,
+            before: Optional[str] = None
+    ) -> Tuple[List[ChatMessage], Optional[str]]:
+        """
+        从最新消息往前分页：按 (created_at DESC, id DESC) 取 limit 条，返回时按时间正序排列
+        - 未传 before：最近一页
+        - 传入 before（上一页返回的游标）：该游标之前更早的一页（走 ix_chat_messages_session_id_created_at_id，无 OFFSET）
+        :return: (消息列表, 更早一页的游标；没有更早的消息时为None)
+        """
         session = self.get_session(session_id)
         if not session:
-            return []
-        
-        return self.db.query(ChatMessage).filter(
+            return [], None
+
+        query = self.db.query(ChatMessage).filter(
             ChatMessage.session_id == session_id
-        ).order_by(ChatMessage.created_at).limit(limit).all()
+        ).order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc())
+        if before:
+            created_at, message_id = decode_message_cursor(before)
+            query = query.filter(or_(
+                ChatMessage.created_at < created_at,
+                and_(ChatMessage.created_at == created_at, ChatMessage.id < message_id)
+            ))
+
+        # 多取一条用于判断是否还有更早的消息
+        rows = query.limit(limit + 1).all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_message_cursor(rows[-1])
+        rows.reverse()
+        return rows, next_cursor
     
     def get_message_count(self, session_id: str) -> int:
-        """获取会话的消息数量"""
-        return self.db.query(ChatMessage).filter(
-            ChatMessage.session_id == session_id
-        ).count()
+        """获取会话的消息数量（读取会话上维护的计数列）"""
+        count = self.db.query(ChatSession.message_count).filter(
+            ChatSession.session_id == session_id
+        ).scalar()
+        return count or 0
     
     # -------------------------- 文件上传和管理 --------------------------
     
@@ -275,22 +333,15 @@ class ChatService:
             )
             user_message = self.create_message(user_message_data)
 
-            # 更新记忆：加入用户消息
-            memory_context_text = None
-            if self.memory_service:
-                try:
-                    self.memory_service.add_message(session_id, "user", request.message)
-                    memory_vars = self.memory_service.get_memory_context(session_id)
-                    # 将记忆上下文转为简短文本传入模型
-                    if isinstance(memory_vars, dict) and "chat_history" in memory_vars:
-                        memory_context_text = str(memory_vars["chat_history"])
-                except Exception:
-                    # 记忆不可用时不影响正常回复
-                    memory_context_text = None
-            
-            # 生成AI回复（这里暂时返回模拟回复）
-            combined_context = request.context or memory_context_text
-            ai_response = self._generate_ai_response(request.message, combined_context)
+            # 按token预算组装提示（摘要 + 参考资料 + 最近对话）
+            prompt = self._build_prompt(session_id, request)
+            # 与会话无关的常见问题优先使用缓存的回答
+            cache_key = answer_cache.key_for(request.message, prompt, llm_provider.config.model, request.use_cache)
+            ai_response = answer_cache.get(cache_key)
+            if ai_response is None:
+                started = time.perf_counter()
+                ai_response = self._generate_ai_response(prompt.messages)
+                answer_cache.put(cache_key, ai_response, time.perf_counter() - started)
             
             # 保存AI回复
             ai_message_data = ChatMessageCreate(
@@ -301,11 +352,11 @@ class ChatService:
             )
             ai_message = self.create_message(ai_message_data)
 
-            # 更新记忆：加入AI回复并尝试保存摘要
+            # 更新记忆：加入AI回复，摘要由后台任务按阈值合并（不等待）
             if self.memory_service:
                 try:
                     self.memory_service.add_message(session_id, "assistant", ai_response)
-                    self.memory_service.save_memory(session_id)
+                    summary_worker.notify(session_id)
                 except Exception:
                     pass
             
@@ -326,55 +377,29 @@ class ChatService:
                 timestamp=datetime.utcnow()
             )
     
-    def _generate_ai_response(self, user_message: str, context: Optional[str] = None) -> str:
-        """生成AI回复（调用火山引擎 Ark 实现）"""
-        # 延迟导入，避免在未安装 SDK 时阻断其它功能
-        try:
-            from volcenginesdkarkruntime import Ark  # type: ignore
-        except Exception as import_err:
-            raise Exception(
-                "未安装火山引擎 Ark SDK，请先安装: pip install volcengine-ark-runtime"
-            ) from import_err
-
-        # 读取配置与环境变量
-        api_key = (
-            os.environ.get("ARK_API_KEY")
-            or os.environ.get("VOLC_ARK_API_KEY")
-            or os.environ.get("VOLC_ARK_APIKEY")
-            or os.environ.get("VOLCENGINE_ARK_API_KEY")
-            or getattr(settings, "ai_api_key", "")
-        )
-        if not api_key:
-            raise Exception("未配置 Ark API Key，请设置 ARK_API_KEY 或 VOLC_ARK_API_KEY 环境变量")
-
-        base_url = (
-            os.environ.get("ARK_BASE_URL")
-            or os.environ.get("VOLC_ARK_BASE_URL")
-            or getattr(settings, "ai_api_url", None)
-            or "https://ark.cn-beijing.volces.com/api/v3"
-        )
-
-        model = (
-            os.environ.get("ARK_MODEL")
-            or os.environ.get("VOLC_ARK_MODEL")
-            or getattr(settings, "ai_model", None)
-            or "doubao-seed-1-6-250615"
+    def _build_prompt(self, session_id: str, request: ChatRequest) -> PromptContext:
+        """把用户消息加入记忆，并按token预算组装角色消息（见 context_builder）"""
+        memory = PromptMemory()
+        if self.memory_service:
+            try:
+                self.memory_service.add_message(session_id, "user", request.message)
+                memory = self.memory_service.get_prompt_memory(session_id, request.message)
+            except Exception:
+                # 记忆不可用时不影响正常回复
+                memory = PromptMemory()
+        # 请求携带的上下文与检索到的法规片段作为参考资料
+        facts = rag_retriever.facts_for(request.message, request.context)
+        return context_builder.build(
+            request.message, summary=memory.summary, keypoints=memory.keypoints, facts=facts, history=memory.history
         )
 
-        # 组装消息（文本为主；若未来有图片，可扩展 content 列表）
-        content_items: list[dict] = [{"type": "text", "text": user_message}]
-        if context:
-            content_items.append({"type": "text", "text": f"[上下文]\n{context}"})
-
-        messages = [
-            {
-                "role": "user",
-                "content": content_items,
-            }
-        ]
+    def _generate_ai_response(self, messages: List[Dict[str, str]]) -> str:
+        """生成AI回复（调用火山引擎 Ark 实现）"""
+        # 共享客户端（配置只读取一次，连接池长连接复用）
+        client = llm_provider.ark()
+        model = llm_provider.config.model
 
         try:
-            client = Ark(base_url=base_url, api_key=api_key)
             response = client.chat.completions.create(
                 model=model,
                 messages=messages,
@@ -423,52 +448,10 @@ class ChatService:
     
     # -------------------------- 流式响应 --------------------------
     
-    def _stream_ai_response(self, user_message: str, context: Optional[str] = None):
+    def _stream_ai_response(self, messages: List[Dict[str, str]]):
         """直接从 Ark 使用流式输出，逐段产出文本"""
-        try:
-            from volcenginesdkarkruntime import Ark  # type: ignore
-        except Exception as import_err:
-            raise Exception(
-                "未安装火山引擎 Ark SDK，请先安装: pip install volcengine-ark-runtime"
-            ) from import_err
-
-        api_key = (
-            os.environ.get("ARK_API_KEY")
-            or os.environ.get("VOLC_ARK_API_KEY")
-            or os.environ.get("VOLC_ARK_APIKEY")
-            or os.environ.get("VOLCENGINE_ARK_API_KEY")
-            or getattr(settings, "ai_api_key", "")
-        )
-        if not api_key:
-            raise Exception("未配置 Ark API Key，请设置 ARK_API_KEY 或 VOLC_ARK_API_KEY 环境变量")
-
-        base_url = (
-            os.environ.get("ARK_BASE_URL")
-            or os.environ.get("VOLC_ARK_BASE_URL")
-            or getattr(settings, "ai_api_url", None)
-            or "https://ark.cn-beijing.volces.com/api/v3"
-        )
-
-        model = (
-            os.environ.get("ARK_MODEL")
-            or os.environ.get("VOLC_ARK_MODEL")
-            or getattr(settings, "ai_model", None)
-            or "doubao-seed-1-6-250615"
-        )
-
-        # 组装消息
-        content_items: list[dict] = [{"type": "text", "text": user_message}]
-        if context:
-            content_items.append({"type": "text", "text": f"[上下文]\n{context}"})
-
-        messages = [
-            {
-                "role": "user",
-                "content": content_items,
-            }
-        ]
-
-        client = Ark(base_url=base_url, api_key=api_key)
+        client = llm_provider.ark()
+        model = llm_provider.config.model
 
         # 优先尝试官方流式接口
         try:
@@ -526,7 +509,7 @@ class ChatService:
             return
         except Exception:
             # 回退：如果 SDK/参数不支持流式，就用非流式降级并手动拆分
-            full_text = self._generate_ai_response(user_message, context)
+            full_text = self._generate_ai_response(messages)
             # 以较细粒度切分，尽可能拟真流式
             for token in full_text.split():
                 yield token + " "
@@ -553,23 +536,16 @@ class ChatService:
             )
             user_message = self.create_message(user_message_data)
             
-            # 准备记忆上下文
-            memory_context_text = None
-            if self.memory_service:
-                try:
-                    self.memory_service.add_message(session_id, "user", request.message)
-                    memory_vars = self.memory_service.get_memory_context(session_id)
-                    if isinstance(memory_vars, dict) and "chat_history" in memory_vars:
-                        memory_context_text = str(memory_vars["chat_history"])
-                except Exception:
-                    memory_context_text = None
+            # 按token预算组装提示
+            prompt = self._build_prompt(session_id, request)
+            cache_key = answer_cache.key_for(request.message, prompt, llm_provider.config.model, request.use_cache)
+            cached = answer_cache.get(cache_key)
 
-            # 生成流式AI回复
-            combined_context = request.context or memory_context_text
-
-            # 真正流式产出
+            # 真正流式产出（命中缓存时按相同格式分段回放）
+            started = time.perf_counter()
+            deltas = answer_cache.replay(cached) if cached is not None else self._stream_ai_response(prompt.messages)
             final_text_parts: list[str] = []
-            for delta in self._stream_ai_response(request.message, combined_context):
+            for delta in deltas:
                 final_text_parts.append(delta)
                 yield {
                     "content": delta,
@@ -579,6 +555,8 @@ class ChatService:
             
             # 保存完整的AI回复
             ai_response = "".join(final_text_parts).strip()
+            if cached is None:
+                answer_cache.put(cache_key, ai_response, time.perf_counter() - started)
             ai_message_data = ChatMessageCreate(
                 session_id=session_id,
                 role="assistant",
@@ -587,15 +565,13 @@ class ChatService:
             )
             ai_message = self.create_message(ai_message_data)
 
-            # 更新记忆并保存摘要（异步，不阻塞流关闭）
+            # 更新记忆，摘要由后台任务按阈值合并（不阻塞流关闭）
             if self.memory_service:
-                def _bg_save():
-                    try:
-                        self.memory_service.add_message(session_id, "assistant", ai_response)
-                        self.memory_service.save_memory(session_id)
-                    except Exception:
-                        pass
-                threading.Thread(target=_bg_save, daemon=True).start()
+                try:
+                    self.memory_service.add_message(session_id, "assistant", ai_response)
+                    summary_worker.notify(session_id)
+                except Exception:
+                    pass
             
         except Exception as e:
             yield {
@@ -657,57 +633,16 @@ class ChatService:
     
     # -------------------------- 搜索功能 --------------------------
     
-    def search_conversations(self, query: str, user_id: Optional[str] = None, limit: int = 20) -> List[ChatSession]:
-        """搜索会话"""
-        search_query = self.db.query(ChatSession).filter(
-            and_(
-                ChatSession.is_active == True,
-                ChatSession.title.contains(query)
-            )
-        )
-        
-        if user_id:
-            search_query = search_query.filter(ChatSession.user_id == user_id)
-        
-        return search_query.order_by(desc(ChatSession.updated_at)).limit(limit).all()
+    def search_conversations(self, query: str, user_id: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        按消息内容（及会话标题）搜索会话，命中多的在前
+        返回会话字典，附带 matches（命中数）与 snippets（命中消息片段）
+        """
+        return chat_search_index.search(self.db, query, user_id, limit)
     
     def export_conversation(self, session_id: str, format: str = "json") -> str:
-        """导出会话"""
+        """导出会话（一次性拼成字符串；接口使用 chat_export_service 流式导出）"""
         session = self.get_session(session_id)
         if not session:
             raise Exception("会话不存在")
-        
-        messages = self.get_session_messages(session_id)
-        
-        if format == "json":
-            data = {
-                "session": {
-                    "id": session.session_id,
-                    "title": session.title,
-                    "created_at": session.created_at.isoformat(),
-                    "updated_at": session.updated_at.isoformat()
-                },
-                "messages": [
-                    {
-                        "id": msg.id,
-                        "role": msg.role,
-                        "content": msg.content,
-                        "message_type": msg.message_type,
-                        "created_at": msg.created_at.isoformat()
-                    }
-                    for msg in messages
-                ]
-            }
-            return json.dumps(data, ensure_ascii=False, indent=2)
-        
-        elif format == "txt":
-            lines = [f"会话: {session.title}", f"创建时间: {session.created_at}", ""]
-            for msg in messages:
-                role_name = "用户" if msg.role == "user" else "AI助手"
-                lines.append(f"[{role_name}] {msg.created_at.strftime('%Y-%m-%d %H:%M:%S')}")
-                lines.append(msg.content)
-                lines.append("")
-            return "\n".join(lines)
-        
-        else:
-            raise Exception(f"不支持的导出格式: {format}")
+        return "".join(iter_export(self.db, session, format))
@@ -0,0 +1,228 @@
+"""
+聊天上下文组装 - 按token预算拼装发送给模型的角色消息
+- 用本地分词器（tokenizer/tokenizer.json）计数，中文/英文按真实token计算而不是字符数
+- 预算依次分配给：系统提示、当前用户消息、对话摘要、参考资料，剩余预算从最近的对话往前填充
+- 结果为结构化的 system / user / assistant 消息列表，各部分token数记入指标
+"""
+import logging
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.config import settings
+from app.utils.metrics import metrics
+
+try:
+    from tokenizers import Tokenizer
+except ImportError:  # tokenizers 未安装时按字符估算
+    Tokenizer = None
+
+logger = logging.getLogger(__name__)
+
+# 仓库自带的分词器目录（与审查模型使用同一份词表）
+BUNDLED_TOKENIZER_DIR = Path(__file__).resolve().parents[2] / "tokenizer"
+# 每条角色消息的固定开销（角色标记、分隔符）
+MESSAGE_OVERHEAD_TOKENS = 4
+# 系统消息内各部分之间的分隔符（其token数计入后一部分）
+SECTION_SEPARATOR = "\n\n"
+PROMPT_TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384)
+
+DEFAULT_SYSTEM_PROMPT = "你是一名专业、严谨的法律咨询助手。请结合对话摘要与参考资料回答用户问题，无法确定时如实说明。"
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算token数：中日韩字符按1个token，其余按4个字符1个token"""
+    cjk = sum(1 for ch in text if "\u2e80" <= ch <= "\u9fff" or "\uf900" <= ch <= "\ufaff")
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+class TokenCounter:
+    """本地分词器计数（首次使用时加载，加载失败回退 estimate_tokens）"""
+
+    def __init__(self, tokenizer_dirs: Sequence[Path]):
+        self._dirs = list(tokenizer_dirs)
+        self._tokenizer = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    for directory in self._dirs:
+                        path = Path(directory) / "tokenizer.json"
+                        if Tokenizer is not None and path.exists():
+                            try:
+                                self._tokenizer = Tokenizer.from_file(str(path))
+                                break
+                            except Exception:
+                                logger.exception(f"分词器加载失败：{path}")
+                    self._loaded = True
+        return self._tokenizer
+
+    @property
+    def exact(self) -> bool:
+        """是否使用真实分词器计数"""
+        return self._load() is not None
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        tokenizer = self._load()
+        if tokenizer is None:
+            return estimate_tokens(text)
+        return len(tokenizer.encode(text, add_special_tokens=False).ids)
+
+    def truncate(self, text: str, max_tokens: int, keep: str = "head") -> str:
+        """截断到 max_tokens 以内（keep="tail" 保留末尾）"""
+        if max_tokens <= 0:
+            return ""
+        tokenizer = self._load()
+        if tokenizer is None:
+            # 估算模式：二分查找满足预算的最长前缀/后缀
+            lo, hi = 0, len(text)
+            while lo < hi:
+                mid = (lo + hi + 1) // 2
+                piece = text[:mid] if keep == "head" else text[len(text) - mid:]
+                if estimate_tokens(piece) <= max_tokens:
+                    lo = mid
+                else:
+                    hi = mid - 1
+            return text[:lo] if keep == "head" else text[len(text) - lo:]
+        offsets = tokenizer.encode(text, add_special_tokens=False).offsets
+        if len(offsets) <= max_tokens:
+            return text
+        if keep == "tail":
+            return text[offsets[-max_tokens][0]:]
+        return text[:offsets[max_tokens - 1][1]]
+
+
+def _tokenizer_dirs() -> List[Path]:
+    dirs = []
+    if settings.chat_tokenizer_path:
+        dirs.append(Path(settings.chat_tokenizer_path))
+    dirs.extend([settings.TOKENIZER_PATH, BUNDLED_TOKENIZER_DIR])
+    return dirs
+
+
+token_counter = TokenCounter(_tokenizer_dirs())
+
+
+@dataclass
+class PromptContext:
+    """组装结果：发送给模型的消息与各部分token数"""
+    messages: List[Dict[str, str]]
+    tokens: Dict[str, int] = field(default_factory=dict)
+    turns_included: int = 0
+    turns_dropped: int = 0
+
+    @property
+    def total_tokens(self) -> int:
+        return sum(self.tokens.values())
+
+
+class ContextBuilder:
+    """按预算组装聊天提示"""
+
+    def __init__(
+            self,
+            counter: TokenCounter,
+            max_prompt_tokens: int,
+            max_summary_tokens: int,
+            max_facts_tokens: int,
+            max_keypoints_tokens: int = 300,
+            system_prompt: str = DEFAULT_SYSTEM_PROMPT
+    ):
+        self.counter = counter
+        self.max_prompt_tokens = max_prompt_tokens
+        self.max_summary_tokens = max_summary_tokens
+        self.max_facts_tokens = max_facts_tokens
+        self.max_keypoints_tokens = max_keypoints_tokens
+        self.system_prompt = system_prompt
+
+    def _cost(self, text: str) -> int:
+        return self.counter.count(text) + MESSAGE_OVERHEAD_TOKENS
+
+    def build(
+            self,
+            user_message: str,
+            summary: Optional[str] = None,
+            facts: Optional[str] = None,
+            history: Sequence[Tuple[str, str]] = (),
+            keypoints: Optional[str] = None
+    ) -> PromptContext:
+        """
+        :param summary: 对话摘要（超出 max_summary_tokens 时保留末尾）
+        :param keypoints: 较早对话的抽取要点（单独预算 max_keypoints_tokens，超出时保留末尾，不挤占摘要）
+        :param facts: 参考资料/检索结果（超出 max_facts_tokens 时保留开头）
+        :param history: 按时间顺序的最近对话 [(role, content)]，不含当前用户消息
+        """
+        budget = self.max_prompt_tokens
+        tokens: Dict[str, int] = {}
+
+        tokens["system"] = self._cost(self.system_prompt)
+        # 当前问题必须发送，超长时截断到剩余预算
+        user_text = self.counter.truncate(user_message, budget - tokens["system"] - MESSAGE_OVERHEAD_TOKENS)
+        tokens["user"] = self._cost(user_text)
+        remaining = budget - tokens["system"] - tokens["user"]
+
+        # 摘要、要点与参考资料并入系统消息
+        sections = [self.system_prompt]
+        for name, title, text, limit, keep in (
+                ("summary", "[对话摘要]", summary, self.max_summary_tokens, "tail"),
+                ("keypoints", "[要点]", keypoints, self.max_keypoints_tokens, "tail"),
+                ("facts", "[参考资料]", facts, self.max_facts_tokens, "head"),
+        ):
+            if not text:
+                continue
+            header = f"{SECTION_SEPARATOR}{title}\n"
+            text = self.counter.truncate(text, min(limit, remaining - self.counter.count(header)), keep=keep)
+            while text:
+                # 按拼接后的实际token数计费（分词在边界处可能与分开计数不同），超出时继续截短
+                cost = self.counter.count(header + text)
+                if cost <= remaining:
+                    tokens[name] = cost
+                    remaining -= cost
+                    sections.append(f"{title}\n{text}")
+                    break
+                text = self.counter.truncate(text, self.counter.count(text) - (cost - remaining), keep=keep)
+        system_content = SECTION_SEPARATOR.join(sections)
+
+        # 从最近一轮往前填充，放不下的更早对话整条丢弃
+        turns: List[Dict[str, str]] = []
+        tokens["history"] = 0
+        for role, content in reversed(list(history)):
+            cost = self._cost(content)
+            if cost > remaining:
+                break
+            turns.append({"role": role, "content": content})
+            remaining -= cost
+            tokens["history"] += cost
+        turns.reverse()
+
+        context = PromptContext(
+            messages=[{"role": "system", "content": system_content}, *turns, {"role": "user", "content": user_text}],
+            tokens=tokens,
+            turns_included=len(turns),
+            turns_dropped=len(history) - len(turns),
+        )
+        self._record(context)
+        return context
+
+    @staticmethod
+    def _record(context: PromptContext) -> None:
+        metrics.histogram("chat_prompt_tokens", PROMPT_TOKEN_BUCKETS).observe(context.total_tokens)
+        for section, count in context.tokens.items():
+            metrics.histogram(f"chat_prompt_{section}_tokens", PROMPT_TOKEN_BUCKETS).observe(count)
+        if context.turns_dropped:
+            metrics.counter("chat_context_turns_dropped_total").inc(context.turns_dropped)
+
+
+context_builder = ContextBuilder(
+    token_counter,
+    max_prompt_tokens=settings.chat_prompt_max_tokens,
+    max_summary_tokens=settings.chat_summary_max_tokens,
+    max_facts_tokens=settings.chat_facts_max_tokens,
+    max_keypoints_tokens=settings.chat_keypoints_max_tokens,
+)
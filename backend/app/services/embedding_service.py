@@ -0,0 +1,221 @@
+"""
+句向量服务 - BERT 编码器批量计算句向量，结果按内容哈希持久化缓存
+- 分词使用仓库自带的 tokenizer/tokenizer.json（与审查模型同一份词表）
+- 按长度排序后分批，每批只补齐到本批最长句（动态补齐），CPU 推理不为 padding 付出计算
+- 句向量 = 最后一层隐状态按 attention mask 平均池化，再 L2 归一化（点积即余弦相似度）
+- 缓存键 = sha256(模型版本 + 文本)，存于本地 sqlite 文件；重启后重新向量化语料几乎无开销
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.config import settings
+from app.services.context_builder import BUNDLED_TOKENIZER_DIR
+from app.utils.metrics import metrics
+
+try:
+    from tokenizers import Tokenizer
+except ImportError:  # 未安装 tokenizers 时无法使用 BERT 编码
+    Tokenizer = None
+
+CACHE_LOOKUP_CHUNK = 500  # 查询缓存时每条 SQL 的键数量（低于 sqlite 变量上限）
+ENCODE_BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+
+class EmbeddingCache:
+    """句向量磁盘缓存（sqlite，WAL 模式，多进程可共享同一文件；首次使用时创建）"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+            self._conn = conn
+        return self._conn
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, np.ndarray]:
+        found: Dict[str, np.ndarray] = {}
+        with self._lock:
+            conn = self._connection()
+            for start in range(0, len(keys), CACHE_LOOKUP_CHUNK):
+                chunk = keys[start:start + CACHE_LOOKUP_CHUNK]
+                rows = conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def put_many(self, items: Dict[str, np.ndarray]) -> None:
+        with self._lock:
+            conn = self._connection()
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in items.items()]
+            )
+            conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class BertEncoder:
+    """BERT 系列编码器（首次编码时加载模型，CPU 推理）"""
+
+    def __init__(
+            self,
+            model_dir: Optional[str],
+            tokenizer_dir: Path = BUNDLED_TOKENIZER_DIR,
+            max_length: int = 256,
+            device: str = "cpu",
+            model=None
+    ):
+        """
+        :param model_dir: transformers 格式的模型目录（AutoModel.from_pretrained）
+        :param model: 直接传入已加载的模型（测试/基准使用），此时忽略 model_dir
+        """
+        self.model_dir = model_dir
+        self.tokenizer_dir = Path(tokenizer_dir)
+        self.max_length = max_length
+        self.device = device
+        self._model = model
+        self._tokenizer = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._tokenizer is None:
+            with self._lock:
+                if self._tokenizer is None:
+                    import torch
+                    if self._model is None:
+                        if not self.model_dir:
+                            raise RuntimeError("未配置句向量模型目录（embedding_model_path）")
+                        from transformers import AutoModel
+                        self._model = AutoModel.from_pretrained(self.model_dir)
+                    self._model.to(torch.device(self.device)).eval()
+                    tokenizer = Tokenizer.from_file(str(self.tokenizer_dir / "tokenizer.json"))
+                    tokenizer.enable_truncation(self.max_length)
+                    tokenizer.no_padding()
+                    self._pad_id = tokenizer.token_to_id("[PAD]") or 0
+                    self._tokenizer = tokenizer
+        return self._model, self._tokenizer
+
+    @property
+    def dim(self) -> int:
+        model, _ = self._load()
+        return model.config.hidden_size
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        """编码一批文本（调用方负责按长度分批），返回 L2 归一化的 N×D 向量"""
+        import torch
+
+        model, tokenizer = self._load()
+        encodings = tokenizer.encode_batch(list(texts))
+        width = max(len(e.ids) for e in encodings)
+        input_ids = np.full((len(encodings), width), self._pad_id, dtype=np.int64)
+        attention_mask = np.zeros((len(encodings), width), dtype=np.int64)
+        for row, encoding in enumerate(encodings):
+            input_ids[row, :len(encoding.ids)] = encoding.ids
+            attention_mask[row, :len(encoding.ids)] = 1
+
+        with torch.inference_mode():
+            mask = torch.from_numpy(attention_mask).to(self.device)
+            hidden = model(input_ids=torch.from_numpy(input_ids).to(self.device), attention_mask=mask)[0]
+            weights = mask.unsqueeze(-1).to(hidden.dtype)
+            pooled = (hidden * weights).sum(dim=1) / weights.sum(dim=1).clamp(min=1)
+            pooled = torch.nn.functional.normalize(pooled, dim=-1)
+        return pooled.cpu().numpy().astype(np.float32)
+
+    def token_lengths(self, texts: Sequence[str]) -> List[int]:
+        _, tokenizer = self._load()
+        return [len(e.ids) for e in tokenizer.encode_batch(list(texts))]
+
+
+class EmbeddingService:
+    """
+    批量句向量（先查缓存，未命中的按长度排序分批编码后写回缓存）
+    与 app.rag 的向量化器接口一致（name / dim / embed），可直接用于构建检索索引
+    """
+
+    def __init__(self, encoder, model_version: str, batch_size: int = 32, cache: Optional[EmbeddingCache] = None):
+        self.encoder = encoder
+        self.model_version = model_version
+        self.batch_size = batch_size
+        self.cache = cache
+
+    @property
+    def name(self) -> str:
+        return f"bert-{self.model_version}"
+
+    @property
+    def dim(self) -> int:
+        return self.encoder.dim
+
+    def cache_key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_version}\x00{text}".encode("utf-8")).hexdigest()
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """返回与 texts 逐行对应的 N×D 向量（相同文本只编码一次）"""
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        keys = [self.cache_key(text) for text in texts]
+        unique: Dict[str, str] = dict(zip(keys, texts))
+        vectors = self.cache.get_many(list(unique)) if self.cache is not None else {}
+        metrics.counter("embedding_cache_hits_total").inc(len(vectors))
+
+        missing = [key for key in unique if key not in vectors]
+        if missing:
+            metrics.counter("embedding_cache_misses_total").inc(len(missing))
+            encoded = self._encode([unique[key] for key in missing])
+            fresh = dict(zip(missing, encoded))
+            if self.cache is not None:
+                self.cache.put_many(fresh)
+            vectors.update(fresh)
+        return np.stack([vectors[key] for key in keys])
+
+    def _encode(self, texts: List[str]) -> List[np.ndarray]:
+        # 按token长度排序分批：同一批长度相近，动态补齐的浪费最小
+        lengths = self.encoder.token_lengths(texts)
+        order = sorted(range(len(texts)), key=lengths.__getitem__)
+        result: List[Optional[np.ndarray]] = [None] * len(texts)
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            started = time.perf_counter()
+            encoded = self.encoder.encode([texts[i] for i in batch])
+            metrics.histogram("embedding_encode_seconds", ENCODE_BUCKETS).observe(time.perf_counter() - started)
+            for i, vector in zip(batch, encoded):
+                result[i] = vector
+        metrics.counter("embedding_texts_encoded_total").inc(len(texts))
+        return result
+
+
+def _create_embedding_service() -> EmbeddingService:
+    cache = EmbeddingCache(Path(settings.embedding_cache_path)) if settings.embedding_cache_path else None
+    encoder = BertEncoder(
+        settings.embedding_model_path,
+        max_length=settings.embedding_max_length,
+        device=settings.embedding_device,
+    )
+    return EmbeddingService(encoder, settings.embedding_model_version, settings.embedding_batch_size, cache)
+
+
+embedding_service = _create_embedding_service()
@@ -0,0 +1,105 @@
+"""
+对话历史本地抽取式压缩 - 不调用大模型，毫秒级生成“要点”上下文
+- 分句与文档审查一致（file_service.extract_sentences_with_position）
+- 句子按 字符二元组 TF-IDF 权重、与当前问题的重合度、用户陈述与时间远近 打分
+- 按 token 预算贪心选取高分句，并按原对话顺序输出
+"""
+import math
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from app.services.context_builder import token_counter
+from app.services.file_service import extract_sentences_with_position
+from app.utils.metrics import metrics
+
+ROLE_LABELS = {"user": "用户", "assistant": "助手"}
+# 用户陈述的事实比助手的解释更值得保留
+USER_WEIGHT = 1.3
+# 与当前问题相关的句子加权
+QUERY_WEIGHT = 2.0
+# 时间远近权重：最早的消息为 1 - RECENCY_WEIGHT，最近的为 1
+RECENCY_WEIGHT = 0.3
+# 二元组集合重合度超过该值视为重复句
+DUPLICATE_OVERLAP = 0.8
+MIN_SENTENCE_CHARS = 4
+
+
+def _bigrams(text: str) -> List[str]:
+    chars = [ch for ch in text if not ch.isspace()]
+    return [chars[i] + chars[i + 1] for i in range(len(chars) - 1)]
+
+
+def _split(history: Sequence[Tuple[str, str]]) -> List[Tuple[int, str, str]]:
+    """把对话拆成句子：[(消息序号, 角色, 句子)]"""
+    sentences = []
+    for index, (role, content) in enumerate(history):
+        for sentence in extract_sentences_with_position(content or ""):
+            text = sentence["content"].strip()
+            if len(text) >= MIN_SENTENCE_CHARS:
+                sentences.append((index, role, text))
+    return sentences
+
+
+def rank_sentences(
+        history: Sequence[Tuple[str, str]],
+        query: Optional[str] = None
+) -> List[Tuple[float, int, str, str]]:
+    """给对话中的句子打分，返回 [(分数, 句子在对话中的序号, 角色, 句子)]（按分数降序）"""
+    sentences = _split(history)
+    if not sentences:
+        return []
+
+    grams = [_bigrams(text) for _, _, text in sentences]
+    document_freq: Counter = Counter()
+    for sentence_grams in grams:
+        document_freq.update(set(sentence_grams))
+    total = len(sentences)
+    idf: Dict[str, float] = {g: math.log(1 + total / df) for g, df in document_freq.items()}
+    query_grams: Set[str] = set(_bigrams(query)) if query else set()
+    last_index = max(len(history) - 1, 1)
+
+    ranked = []
+    for position, ((index, role, text), sentence_grams) in enumerate(zip(sentences, grams)):
+        if not sentence_grams:
+            continue
+        counts = Counter(sentence_grams)
+        # 信息量：TF-IDF 加权和，按长度开方归一，避免偏向长句
+        score = sum(tf * idf[g] for g, tf in counts.items()) / math.sqrt(len(sentence_grams))
+        if query_grams:
+            score *= 1 + QUERY_WEIGHT * len(query_grams & counts.keys()) / len(query_grams)
+        if role == "user":
+            score *= USER_WEIGHT
+        score *= 1 - RECENCY_WEIGHT + RECENCY_WEIGHT * index / last_index
+        ranked.append((score, position, role, text))
+    ranked.sort(key=lambda item: item[0], reverse=True)
+    return ranked
+
+
+def compress_history(
+        history: Sequence[Tuple[str, str]],
+        max_tokens: int,
+        query: Optional[str] = None
+) -> str:
+    """
+    把对话压缩为不超过 max_tokens 的要点文本（每行“角色：句子”，按对话顺序）
+    :param query: 当前用户问题，相关句子优先保留
+    """
+    started = time.perf_counter()
+    selected: List[Tuple[int, str]] = []
+    selected_grams: List[Set[str]] = []
+    used = 0
+    for _, position, role, text in rank_sentences(history, query):
+        grams = set(_bigrams(text))
+        if any(len(grams & other) > DUPLICATE_OVERLAP * min(len(grams), len(other)) for other in selected_grams):
+            continue
+        line = f"{ROLE_LABELS.get(role, role)}：{text}"
+        cost = token_counter.count(line)
+        if used + cost > max_tokens:
+            continue
+        selected.append((position, line))
+        selected_grams.append(grams)
+        used += cost
+
+    metrics.histogram("chat_keypoints_seconds").observe(time.perf_counter() - started)
+    return "\n".join(line for _, line in sorted(selected))
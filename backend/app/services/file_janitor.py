@@ -0,0 +1,75 @@
+"""
+文件清理服务 - 后台线程删除已下线文档的原始文件/批注文件
+删除接口只负责数据库记录，文件删除不占用请求时间；删除失败（如Windows下文件被占用）按间隔重试。
+"""
+import logging
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Optional, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class FileJanitor:
+    """单个后台线程消费待删除路径队列（首次提交任务时启动）"""
+
+    def __init__(self, max_retries: int = 3, retry_delay: float = 5.0):
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self._queue: "queue.Queue[Tuple[Path, int]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.removed = 0
+        self.failed = 0
+
+    def schedule(self, paths: Iterable[str]) -> None:
+        """提交待删除文件（空路径忽略）"""
+        for path in paths:
+            if path:
+                self._queue.put((Path(path), 0))
+        self._ensure_worker()
+
+    def _ensure_worker(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="file-janitor", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            path, attempt = self._queue.get()
+            try:
+                path.unlink(missing_ok=True)
+                self.removed += 1
+            except OSError as e:
+                if attempt + 1 < self.max_retries:
+                    logger.warning(f"文件删除失败，{self.retry_delay} 秒后重试（第{attempt + 1}次）：{path}，{str(e)}")
+                    # 重试入队后才标记本次完成，等待重试期间join不会提前返回
+                    threading.Timer(self.retry_delay, self._requeue, args=(path, attempt + 1)).start()
+                    continue
+                self.failed += 1
+                logger.exception(f"文件删除失败（已重试{self.max_retries}次）：{path}")
+            self._queue.task_done()
+
+    def _requeue(self, path: Path, attempt: int) -> None:
+        self._queue.put((path, attempt))
+        self._queue.task_done()
+
+    def join(self, timeout: float = 10.0) -> bool:
+        """等待当前队列清空（测试/停机时使用），超时返回False"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self._queue.unfinished_tasks == 0:
+                return True
+            time.sleep(0.01)
+        return False
+
+
+file_janitor = FileJanitor(
+    max_retries=settings.file_cleanup_max_retries,
+    retry_delay=settings.file_cleanup_retry_delay
+)
@@ -2,6 +2,8 @@ from pathlib import Path
 from datetime import datetime
 from uuid import uuid4  # 新增：用于生成唯一文件名（解决重名和路径攻击）
 import re  # 新增：用于完善句子分割（匹配多种句末标点）
+import shutil
+from typing import BinaryIO, Optional
 from fastapi import UploadFile, HTTPException
 from docx import Document
 from pdf2docx import Converter
@@ -10,6 +12,8 @@ from app.config import settings
 from app.models import db_models, schemas
 from app.utils.helpers import clean_text
 
+COPY_CHUNK_SIZE = 1024 * 1024  # 分块写入大小：1MB
+
 
 def allowed_file(filename: str) -> bool:
     """检查文件是否为允许的类型（docx/pdf）"""
@@ -23,13 +27,26 @@ def save_uploaded_file(file: UploadFile) -> tuple[db_models.Article, Path, Path]
     :param file: 上传的文件（FastAPI的UploadFile对象）
     :return: (Article数据库模型, 原始文件路径, 批注文件路径)
     """
+    original_path = store_upload_stream(file.file, file.filename)
+    annotated_path = prepare_annotated_docx(original_path)
+    article = build_article(file.filename, original_path, annotated_path)
+    return article, original_path, annotated_path
+
+
+def store_upload_stream(stream: BinaryIO, filename: str, max_size: Optional[int] = None) -> Path:
+    """
+    将上传文件流分块写入存储目录（不整体读入内存）
+    :param stream: 可读的二进制文件流（UploadFile.file / zip成员流）
+    :param filename: 原始文件名（用于校验类型和生成扩展名）
+    :param max_size: 单文件大小上限（字节），超出则删除已写入部分并报错
+    :return: 原始文件存储路径
+    """
     # 1. 验证文件类型
-    if not allowed_file(file.filename):
-        raise HTTPException(status_code=400, detail=f"不支持的文件类型：{file.filename.split('.')[-1]}，仅支持docx/pdf")
+    if not allowed_file(filename):
+        raise HTTPException(status_code=400, detail=f"不支持的文件类型：{filename.split('.')[-1]}，仅支持docx/pdf")
 
     # 2. 定义文件路径（核心修改：用UUID生成唯一文件名，避免重名和路径攻击）
-    original_filename = file.filename  # 保留原始文件名（给用户看）
-    file_ext = original_filename.rsplit('.', 1)[1].lower()  # 提取文件扩展名（docx/pdf）
+    file_ext = filename.rsplit('.', 1)[1].lower()  # 提取文件扩展名（docx/pdf）
     unique_filename = f"{uuid4()}.{file_ext}"  # 生成唯一文件名（如：a1b2c3-d4e5f6.docx）
     original_path = settings.UPLOADS_DIR / unique_filename  # 原始文件存储路径（唯一文件名）
 
@@ -37,9 +54,33 @@ def save_uploaded_file(file: UploadFile) -> tuple[db_models.Article, Path, Path]
     if original_path.exists():
         raise HTTPException(status_code=400, detail=f"文件已上传，请重新上传")
 
-    # 4. 保存原始文件（二进制写入）
+    # 4. 分块保存原始文件（二进制写入，边读边写）
+    written = 0
     with open(original_path, "wb") as f:
-        f.write(file.file.read())
+        while True:
+            chunk = stream.read(COPY_CHUNK_SIZE)
+            if not chunk:
+                break
+            written += len(chunk)
+            if max_size is not None and written > max_size:
+                f.close()
+                original_path.unlink()
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"文件过大（{filename}），最大支持{max_size // 1024}KB"
+                )
+            f.write(chunk)
+
+    return original_path
+
+
+def prepare_annotated_docx(original_path: Path) -> Path:
+    """
+    生成批注文件（docx）：PDF转换为docx，docx直接复制
+    :param original_path: 原始文件路径
+    :return: 批注文件路径
+    """
+    file_ext = original_path.suffix.lstrip('.').lower()
 
     # 5. 生成批注文件路径 + 处理文件转换（核心修改：完善PDF转docx逻辑）
     annotated_filename = f"annotated_{uuid4()}.docx"  # 批注文件也用唯一文件名
@@ -60,11 +101,14 @@ def save_uploaded_file(file: UploadFile) -> tuple[db_models.Article, Path, Path]
             raise HTTPException(status_code=500, detail=f"PDF转Word失败：{str(e)}，请尝试直接上传docx文件")
     else:
         # 5.2 DOCX文件：直接复制原始文件作为批注文件（保持原有逻辑）
-        with open(original_path, "rb") as f1, open(annotated_path, "wb") as f2:
-            f2.write(f1.read())
+        shutil.copyfile(original_path, annotated_path)
+
+    return annotated_path
 
-    # 6. 创建Article数据库记录（注意：name存原始文件名，path存唯一路径）
-    article = db_models.Article(
+
+def build_article(original_filename: str, original_path: Path, annotated_path: Path) -> db_models.Article:
+    """创建Article数据库记录（注意：name存原始文件名，path存唯一路径）"""
+    return db_models.Article(
         name=original_filename,  # 前端展示用：用户上传的原始文件名
         original_path=str(original_path),  # 后端存储用：唯一文件名路径
         annotated_path=str(annotated_path),
@@ -73,8 +117,6 @@ def save_uploaded_file(file: UploadFile) -> tuple[db_models.Article, Path, Path]
         review_progress=0
     )
 
-    return article, original_path, annotated_path
-
 
 def extract_sentences_from_docx(docx_path: Path) -> list[str]:
     """
@@ -0,0 +1,217 @@
+"""
+大模型客户端 - 进程内共享的 Ark SDK 客户端与 httpx 连接池
+配置（API Key/地址/模型）只在首次使用时从环境变量与 settings 读取一次；
+同步/异步 httpx 客户端保持长连接，避免每条消息都重新建立 TCP/TLS 连接。
+异步客户端的连接绑定在创建它的事件循环上，因此按事件循环各建一个。
+"""
+import asyncio
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import httpx
+
+from app.config import settings
+from app.utils.metrics import metrics
+
+DEFAULT_BASE_URL = "https://ark.cn-beijing.volces.com/api/v3"
+DEFAULT_MODEL = "doubao-seed-1-6-250615"
+
+_requests_total = metrics.counter("llm_http_requests_total")
+_connections_opened = metrics.counter("llm_http_connections_opened_total")
+_tls_handshakes = metrics.counter("llm_http_tls_handshakes_total")
+
+
+def _first_env(*names: str) -> Optional[str]:
+    for name in names:
+        value = os.environ.get(name)
+        if value:
+            return value
+    return None
+
+
+@dataclass(frozen=True)
+class LLMConfig:
+    api_key: str
+    base_url: str
+    model: str
+
+    @classmethod
+    def from_env(cls) -> "LLMConfig":
+        """环境变量优先，其次 settings（与原各处读取顺序一致）"""
+        return cls(
+            api_key=(
+                _first_env("ARK_API_KEY", "VOLC_ARK_API_KEY", "VOLC_ARK_APIKEY", "VOLCENGINE_ARK_API_KEY")
+                or getattr(settings, "ai_api_key", "")
+            ),
+            base_url=(
+                _first_env("ARK_BASE_URL", "VOLC_ARK_BASE_URL")
+                or getattr(settings, "ai_api_url", None)
+                or DEFAULT_BASE_URL
+            ),
+            model=(
+                _first_env("ARK_MODEL", "VOLC_ARK_MODEL")
+                or getattr(settings, "ai_model", None)
+                or DEFAULT_MODEL
+            ),
+        )
+
+
+# -------------------------- 连接复用指标（httpcore trace 回调）--------------------------
+
+def _on_trace(event_name: str, info: dict) -> None:
+    if event_name == "connection.connect_tcp.complete":
+        _connections_opened.inc()
+    elif event_name == "connection.start_tls.complete":
+        _tls_handshakes.inc()
+
+
+async def _on_trace_async(event_name: str, info: dict) -> None:
+    _on_trace(event_name, info)
+
+
+def _on_request(request: httpx.Request) -> None:
+    _requests_total.inc()
+    request.extensions["trace"] = _on_trace
+
+
+async def _on_request_async(request: httpx.Request) -> None:
+    _requests_total.inc()
+    request.extensions["trace"] = _on_trace_async
+
+
+def _reuse_ratio() -> Optional[float]:
+    """复用已有连接的请求占比（1 - 新建连接数/请求数）"""
+    if not _requests_total.value:
+        return None
+    return round(max(0.0, 1 - _connections_opened.value / _requests_total.value), 4)
+
+
+metrics.gauge("llm_http_connection_reuse_ratio", _reuse_ratio)
+
+
+class LLMClientProvider:
+    """
+    进程内唯一的大模型客户端提供者（聊天、流式输出、记忆摘要、VolcengineService 共用）：
+    - http_client / async_http_client：带连接上限与 keep-alive 的 httpx 客户端
+      （异步客户端每个事件循环一个，所在事件循环关闭后丢弃）
+    - ark() / async_ark()：绑定上述连接池的 Ark SDK 客户端
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._config: Optional[LLMConfig] = None
+        self._http_client: Optional[httpx.Client] = None
+        self._async_http_clients: Dict[asyncio.AbstractEventLoop, httpx.AsyncClient] = {}
+        self._ark = None
+        self._async_arks: Dict[asyncio.AbstractEventLoop, object] = {}
+
+    @property
+    def config(self) -> LLMConfig:
+        if self._config is None:
+            self._config = LLMConfig.from_env()
+        return self._config
+
+    def require_api_key(self) -> LLMConfig:
+        config = self.config
+        if not config.api_key:
+            raise Exception("未配置 Ark API Key，请设置 ARK_API_KEY 或 VOLC_ARK_API_KEY 环境变量")
+        return config
+
+    @staticmethod
+    def _limits() -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=settings.llm_max_connections,
+            max_keepalive_connections=settings.llm_max_keepalive_connections,
+            keepalive_expiry=settings.llm_keepalive_expiry,
+        )
+
+    @staticmethod
+    def _timeout() -> httpx.Timeout:
+        return httpx.Timeout(settings.ai_processing_timeout, connect=settings.llm_connect_timeout)
+
+    @property
+    def http_client(self) -> httpx.Client:
+        if self._http_client is None:
+            with self._lock:
+                if self._http_client is None:
+                    self._http_client = httpx.Client(
+                        limits=self._limits(), timeout=self._timeout(), event_hooks={"request": [_on_request]}
+                    )
+        return self._http_client
+
+    def _create_async_http_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            limits=self._limits(), timeout=self._timeout(), event_hooks={"request": [_on_request_async]}
+        )
+
+    @property
+    def async_http_client(self) -> httpx.AsyncClient:
+        """当前事件循环的异步客户端（只能在事件循环内访问）"""
+        loop = asyncio.get_running_loop()
+        client = self._async_http_clients.get(loop)
+        if client is None:
+            with self._lock:
+                # 丢弃已关闭事件循环的客户端（其连接无法再使用）
+                for closed in [l for l in self._async_http_clients if l.is_closed()]:
+                    self._async_http_clients.pop(closed)
+                    self._async_arks.pop(closed, None)
+                client = self._async_http_clients.get(loop)
+                if client is None:
+                    client = self._async_http_clients[loop] = self._create_async_http_client()
+        return client
+
+    @staticmethod
+    def _sdk():
+        # 延迟导入，避免在未安装 SDK 时阻断其它功能
+        try:
+            import volcenginesdkarkruntime  # type: ignore
+        except Exception as import_err:
+            raise Exception(
+                "未安装火山引擎 Ark SDK，请先安装: pip install volcengine-ark-runtime"
+            ) from import_err
+        return volcenginesdkarkruntime
+
+    def ark(self):
+        """同步 Ark 客户端（共享 http_client 连接池）"""
+        if self._ark is None:
+            config = self.require_api_key()
+            self._ark = self._sdk().Ark(
+                base_url=config.base_url, api_key=config.api_key,
+                http_client=self.http_client, max_retries=settings.llm_max_retries
+            )
+        return self._ark
+
+    def async_ark(self):
+        """异步 Ark 客户端（共享当前事件循环的 async_http_client 连接池）"""
+        http_client = self.async_http_client
+        loop = asyncio.get_running_loop()
+        if loop not in self._async_arks:
+            config = self.require_api_key()
+            self._async_arks[loop] = self._sdk().AsyncArk(
+                base_url=config.base_url, api_key=config.api_key,
+                http_client=http_client, max_retries=settings.llm_max_retries
+            )
+        return self._async_arks[loop]
+
+    def reset(self) -> None:
+        """丢弃配置与客户端（配置变更或测试时使用；异步客户端由事件循环关闭前调用 aclose）"""
+        with self._lock:
+            if self._http_client is not None:
+                self._http_client.close()
+            self._config = None
+            self._http_client = None
+            self._async_http_clients.clear()
+            self._ark = None
+            self._async_arks.clear()
+
+    async def aclose(self) -> None:
+        """应用关闭时（在应用的事件循环内）释放连接池"""
+        client = self._async_http_clients.get(asyncio.get_running_loop())
+        if client is not None:
+            await client.aclose()
+        self.reset()
+
+
+llm_provider = LLMClientProvider()
@@ -1,28 +1,52 @@
 """
 会话记忆服务（无 LangChain 依赖）
 """
-import os
+from dataclasses import dataclass, field
 from typing import List, Optional, Dict, Any, Tuple
 from sqlalchemy.orm import Session
 
-from app.models.db_models import ChatSession, ChatMessage
+from sqlalchemy import or_
+
 from app.config import settings
+from app.models.db_models import ChatSession, ChatMessage, ChatSettings
+from app.services.context_builder import token_counter
+from app.services.extractive_compressor import compress_history
+from app.services.llm_client import llm_provider
+from app.services.memory_store import memory_store
+
+# 记忆中保留的最近消息条数
+MAX_HISTORY = 50
+# 单次摘要最多读取的未摘要消息条数（积压更多时分多次完成）
+SUMMARY_BATCH_MESSAGES = 50
+# 摘要提示中对话部分的token上限
+SUMMARY_INPUT_TOKENS = 1500
+
+# 会话记忆方式：本地抽取要点（毫秒级，LLM仅定期合并）/ LLM摘要
+MEMORY_MODE_EXTRACTIVE = "extractive"
+MEMORY_MODE_LLM = "llm"
+MEMORY_MODES = (MEMORY_MODE_EXTRACTIVE, MEMORY_MODE_LLM)
+# ChatSettings 设置键：memory_mode（用户/全局）、memory_mode:<session_id>（单个会话）
+MEMORY_MODE_KEY = "memory_mode"
+
+
+@dataclass
+class PromptMemory:
+    """发送给模型的会话记忆：摘要、较早对话的要点（extractive 模式）、按时间顺序的最近对话"""
+    summary: Optional[str] = None
+    keypoints: Optional[str] = None
+    history: List[Tuple[str, str]] = field(default_factory=list)
 
 
 class VolcengineLLMWrapper:
-    """火山引擎 LLM 包装器，用于生成摘要"""
+    """火山引擎 LLM 包装器，用于生成摘要（使用进程内共享的 Ark 客户端）"""
     
-    def __init__(self, api_key: str, base_url: str, model: str):
-        self.api_key = api_key
-        self.base_url = base_url
+    def __init__(self, model: str):
         self.model = model
     
     def __call__(self, prompt: str) -> str:
         """调用火山引擎 API 生成摘要"""
         try:
-            from volcenginesdkarkruntime import Ark
-            
-            client = Ark(base_url=self.base_url, api_key=self.api_key)
+            client = llm_provider.ark()
             response = client.chat.completions.create(
                 model=self.model,
                 messages=[
@@ -78,80 +102,55 @@ class VolcengineLLMWrapper:
 class MemoryService:
     """会话记忆管理服务"""
     
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, store=None):
         self.db = db
-        # 内存缓存：session_id -> {"history": List[Tuple[str, str]], "summary": Optional[str]}
-        self._memory_cache: Dict[str, Dict[str, Any]] = {}
+        # 会话记忆缓存（进程内共享，见 memory_store）：
+        # session_id -> {"history": List[Tuple[str, str]], "summary": Optional[str]}
+        self.store = store or memory_store
         
-        # 读取配置
-        api_key = (
-            os.environ.get("ARK_API_KEY")
-            or os.environ.get("VOLC_ARK_API_KEY")
-            or os.environ.get("VOLC_ARK_APIKEY")
-            or os.environ.get("VOLCENGINE_ARK_API_KEY")
-            or getattr(settings, "ai_api_key", "")
-        )
-        
-        base_url = (
-            os.environ.get("ARK_BASE_URL")
-            or os.environ.get("VOLC_ARK_BASE_URL")
-            or getattr(settings, "ai_api_url", None)
-            or "https://ark.cn-beijing.volces.com/api/v3"
-        )
-        
-        model = (
-            os.environ.get("ARK_MODEL")
-            or os.environ.get("VOLC_ARK_MODEL")
-            or getattr(settings, "ai_model", None)
-            or "doubao-seed-1-6-250615"
-        )
-        
-        if not api_key:
+        # 读取配置（进程内只读取一次）
+        config = llm_provider.config
+        if not config.api_key:
             raise Exception("未配置 Ark API Key，无法使用记忆功能")
         
         # 创建 LLM 包装器
-        self.llm = VolcengineLLMWrapper(api_key, base_url, model)
+        self.llm = VolcengineLLMWrapper(config.model)
     
-    def _format_messages_for_prompt(self, messages: List[Tuple[str, str]], max_chars: int = 2000) -> str:
-        """将消息列表格式化为用于摘要的文本，限制长度"""
+    def _format_messages_for_prompt(
+            self, messages: List[Tuple[str, str]], max_tokens: int = SUMMARY_INPUT_TOKENS
+    ) -> str:
+        """将消息列表格式化为用于摘要的文本，按token数限制长度"""
         lines: List[str] = []
-        length = 0
+        used = 0
         for role, content in messages:
             line = f"{role}: {content}"
-            if length + len(line) > max_chars:
+            cost = token_counter.count(line)
+            if used + cost > max_tokens:
+                if not lines:
+                    # 第一条就超长时截断保留，避免摘要输入为空
+                    lines.append(token_counter.truncate(line, max_tokens))
                 break
             lines.append(line)
-            length += len(line)
+            used += cost
         return "\n".join(lines)
 
-    def _summarize(self, prior_summary: Optional[str], recent_messages: List[Tuple[str, str]]) -> str:
-        """调用 LLM 生成或更新摘要"""
+    def _summary_prompt(self, prior_summary: Optional[str], recent_messages: List[Tuple[str, str]]) -> str:
         messages_text = self._format_messages_for_prompt(recent_messages)
         if prior_summary:
-            prompt = (
+            return (
                 "下面是之前对话的摘要与最近的几条对话，请更新摘要，保持精简且保留关键信息：\n\n"
                 f"[之前的摘要]\n{prior_summary}\n\n"
                 f"[最近对话]\n{messages_text}\n\n"
                 "请输出更新后的摘要："
             )
-        else:
-            prompt = (
-                "请对下面的对话内容进行简洁摘要，保留关键信息与结论：\n\n"
-                f"[对话]\n{messages_text}\n\n"
-                "请输出摘要："
-            )
-        try:
-            return self.llm(prompt)
-        except Exception:
-            # 出现问题时返回之前的摘要或空字符串，避免打断主流程
-            return prior_summary or ""
+        return (
+            "请对下面的对话内容进行简洁摘要，保留关键信息与结论：\n\n"
+            f"[对话]\n{messages_text}\n\n"
+            "请输出摘要："
+        )
 
-    def get_or_create_memory(self, session_id: str) -> Dict[str, Any]:
-        """获取或创建会话记忆结构"""
-        if session_id in self._memory_cache:
-            return self._memory_cache[session_id]
-        
-        # 从数据库加载会话
+    def _load_memory(self, session_id: str) -> Dict[str, Any]:
+        """从数据库加载会话摘要与最近消息"""
         session = self.db.query(ChatSession).filter(
             ChatSession.session_id == session_id,
             ChatSession.is_active == True
@@ -160,85 +159,140 @@ class MemoryService:
         if not session:
             raise Exception(f"会话不存在: {session_id}")
         
-        # 加载最近的消息（用于上下文与后续摘要）
+        # 加载最近的消息（用于上下文、要点抽取与后续摘要）
         messages = self.db.query(ChatMessage).filter(
             ChatMessage.session_id == session_id
-        ).order_by(ChatMessage.created_at.desc()).limit(10).all()
+        ).order_by(ChatMessage.created_at.desc()).limit(MAX_HISTORY).all()
 
         history: List[Tuple[str, str]] = []
         for msg in reversed(messages):
             if msg.role in ("user", "assistant"):
                 history.append((msg.role, msg.content))
 
-        memory_struct = {
+        return {
             "history": history,                 # List[Tuple[role, content]]
             "summary": session.memory_summary,  # Optional[str]
+            "user_id": session.user_id,         # 用于读取用户级记忆设置
         }
-        self._memory_cache[session_id] = memory_struct
+
+    def get_or_create_memory(self, session_id: str) -> Dict[str, Any]:
+        """获取会话记忆结构（缓存未命中时从数据库加载并写入缓存）"""
+        memory_struct = self.store.get(session_id)
+        if memory_struct is None:
+            memory_struct = self._load_memory(session_id)
+            self.store.set(session_id, memory_struct)
         return memory_struct
     
-    def save_memory(self, session_id: str) -> bool:
-        """保存会话记忆到数据库"""
-        try:
-            if session_id not in self._memory_cache:
-                return False
-            
-            memory_struct = self._memory_cache[session_id]
-
-            # 取最近若干条用于摘要的消息
-            recent_messages: List[Tuple[str, str]] = memory_struct.get("history", [])[-10:]
-            prior_summary: Optional[str] = memory_struct.get("summary")
+    def summarize_pending(self, session_id: str, min_turns: int = 0, min_tokens: int = 0) -> bool:
+        """
+        把上次摘要之后的新消息合并进摘要（由后台 summary_worker 调用，不在请求路径上执行）
+        新消息条数达到 min_turns 或估算token数达到 min_tokens 时才调用 LLM；
+        摘要与版本号一起写回，版本号不匹配（其他进程已先更新）时放弃本次结果
+        :return: 是否写入了新摘要
+        """
+        session = self.db.query(
+            ChatSession.memory_summary, ChatSession.memory_summary_version, ChatSession.memory_summarized_message_id
+        ).filter(ChatSession.session_id == session_id).first()
+        if session is None:
+            return False
 
-            # 生成并更新摘要
-            summary = self._summarize(prior_summary, recent_messages)
-            memory_struct["summary"] = summary
-            
-            # 更新数据库
-            session = self.db.query(ChatSession).filter(
-                ChatSession.session_id == session_id
-            ).first()
-            
-            if session:
-                session.memory_summary = summary
-                self.db.commit()
-                return True
-            
+        pending = self.db.query(ChatMessage.id, ChatMessage.role, ChatMessage.content).filter(
+            ChatMessage.session_id == session_id,
+            ChatMessage.id > (session.memory_summarized_message_id or 0),
+            ChatMessage.role.in_(("user", "assistant"))
+        ).order_by(ChatMessage.id).limit(SUMMARY_BATCH_MESSAGES).all()
+        if not pending:
             return False
+        tokens = sum(token_counter.count(m.content) for m in pending)
+        if len(pending) < min_turns and tokens < min_tokens:
+            return False
+
+        # 只取放得进摘要提示的前若干条，其余留给下一次
+        batch, used = [], 0
+        for message in pending:
+            used += token_counter.count(f"{message.role}: {message.content}")
+            if batch and used > SUMMARY_INPUT_TOKENS:
+                break
+            batch.append(message)
+
+        version = session.memory_summary_version or 0
+        summary = self.llm(self._summary_prompt(session.memory_summary, [(m.role, m.content) for m in batch]))
+        try:
+            updated = self.db.query(ChatSession).filter(
+                ChatSession.session_id == session_id,
+                ChatSession.memory_summary_version == version
+            ).update({
+                ChatSession.memory_summary: summary,
+                ChatSession.memory_summary_version: version + 1,
+                ChatSession.memory_summarized_message_id: batch[-1].id,
+                # 生成摘要不算会话活动，保持会话列表排序不变
+                ChatSession.updated_at: ChatSession.updated_at,
+            }, synchronize_session=False)
+            self.db.commit()
         except Exception as e:
             self.db.rollback()
             raise Exception(f"保存记忆失败: {str(e)}")
+
+        if updated:
+            self.store.set_summary(session_id, summary)
+        return bool(updated)
+
+    def save_memory(self, session_id: str) -> bool:
+        """立即把所有未摘要的消息合并进摘要并保存到数据库"""
+        return self.summarize_pending(session_id)
     
     def add_message(self, session_id: str, role: str, content: str) -> None:
-        """添加消息到记忆"""
-        memory_struct = self.get_or_create_memory(session_id)
-        history: List[Tuple[str, str]] = memory_struct.get("history", [])
-        history.append((role, content))
-        # 限制历史长度，避免占用过多内存
-        if len(history) > 50:
-            del history[0 : len(history) - 50]
-        memory_struct["history"] = history
+        """
+        添加消息到记忆（调用方需先把消息写入数据库）
+        缓存未命中时从数据库加载的最近消息已包含这条消息，不再重复追加
+        """
+        # 原子追加（并发请求不会互相覆盖），限制历史长度避免占用过多内存
+        if not self.store.append_history(session_id, (role, content), MAX_HISTORY):
+            self.store.set(session_id, self._load_memory(session_id))
     
-    def get_memory_context(self, session_id: str) -> Dict[str, Any]:
-        """获取记忆上下文（用于生成提示）"""
-        try:
-            memory_struct = self.get_or_create_memory(session_id)
-            # 返回给上游的上下文统一为 dict，包含：
-            # - chat_history: 供模型参考的简短文本（包含摘要+最近对话）
-            summary = memory_struct.get("summary")
-            recent = memory_struct.get("history", [])[-6:]
-            history_text = self._format_messages_for_prompt(recent, max_chars=1200)
-            if summary:
-                combined = f"摘要：{summary}\n\n最近对话：\n{history_text}"
-            else:
-                combined = history_text
-            return {"chat_history": combined}
-        except Exception:
-            return {}
+    def memory_mode(self, session_id: str, user_id: Optional[str] = None) -> str:
+        """
+        会话记忆方式，优先级：会话设置 memory_mode:<session_id> > 用户设置 memory_mode > 全局设置 > 配置默认值
+        设置值可以是 "extractive"/"llm"，或 {"mode": "..."}
+        """
+        keys = [f"{MEMORY_MODE_KEY}:{session_id}", MEMORY_MODE_KEY]
+        owner = ChatSettings.user_id.is_(None)
+        if user_id:
+            owner = or_(owner, ChatSettings.user_id == user_id)
+        rows = self.db.query(
+            ChatSettings.user_id, ChatSettings.settings_key, ChatSettings.settings_value
+        ).filter(ChatSettings.settings_key.in_(keys), owner).all()
+
+        candidates = []
+        for row in rows:
+            value = row.settings_value.get("mode") if isinstance(row.settings_value, dict) else row.settings_value
+            if value in MEMORY_MODES:
+                candidates.append((row.settings_key != keys[0], row.user_id is None, value))
+        return min(candidates)[2] if candidates else settings.chat_memory_mode
+
+    def get_prompt_memory(self, session_id: str, current_message: Optional[str] = None) -> PromptMemory:
+        """
+        返回会话记忆，由 context_builder 按各部分的token预算取用
+        extractive 模式下，较早的对话压缩为要点，只原样返回最近 chat_keypoints_recent_turns 条（不重复发送）
+        :param current_message: 本轮用户消息（已加入记忆时从对话中排除，避免重复发送）
+        """
+        memory_struct = self.get_or_create_memory(session_id)
+        history = [tuple(m) for m in memory_struct.get("history", [])]
+        if current_message is not None and history and history[-1] == ("user", current_message):
+            history = history[:-1]
+
+        memory = PromptMemory(summary=memory_struct.get("summary"), history=history)
+        if self.memory_mode(session_id, memory_struct.get("user_id")) == MEMORY_MODE_EXTRACTIVE:
+            split = max(len(history) - settings.chat_keypoints_recent_turns, 0)
+            memory.keypoints = compress_history(
+                history[:split], settings.chat_keypoints_max_tokens, query=current_message
+            ) or None
+            memory.history = history[split:]
+        return memory
     
     def clear_memory(self, session_id: str) -> None:
         """清除会话记忆"""
-        if session_id in self._memory_cache:
-            del self._memory_cache[session_id]
+        self.store.delete(session_id)
         
         # 清除数据库中的记忆摘要
         session = self.db.query(ChatSession).filter(
@@ -247,5 +301,7 @@ class MemoryService:
         
         if session:
             session.memory_summary = None
+            session.memory_summary_version = (session.memory_summary_version or 0) + 1
+            session.memory_summarized_message_id = None
             self.db.commit()
 
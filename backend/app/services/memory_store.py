@@ -0,0 +1,230 @@
+"""
+会话记忆存储 - 进程内共享的 LRU + TTL 缓存（可选 Redis 共享后端）
+缓存内容：session_id -> {"history": [[role, content], ...], "summary": Optional[str]}
+- local：进程内缓存，按条目数/字节数上限与 TTL 淘汰，跨请求复用；
+  只在单个 worker 内有效（多 worker 部署时各进程的记忆互不可见，请使用 redis）
+- redis：多个 worker 共享同一份历史与摘要（需安装 redis 包）；
+  历史存为列表（RPUSH + LTRIM 原子追加），摘要等其余字段存为 JSON
+追加消息、更新摘要均为原子操作，并发请求不会互相覆盖
+"""
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from app.config import settings
+from app.utils.cache import TTLCache
+from app.utils.metrics import metrics
+
+try:
+    import redis
+except ImportError:  # redis 为可选依赖，未安装时只能使用进程内缓存
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY_PREFIX = "fair:chat_memory:"
+REDIS_HISTORY_SUFFIX = ":history"
+# 进程内缓存按会话分段加锁（固定数量，不随会话数增长）
+LOCAL_LOCK_STRIPES = 64
+
+
+def memory_size(memory: Dict[str, Any]) -> int:
+    """估算一条会话记忆的大小（按UTF-8字节数）"""
+    size = len((memory.get("summary") or "").encode("utf-8"))
+    for role, content in memory.get("history", []):
+        size += len(role) + len(content.encode("utf-8"))
+    return size
+
+
+class LocalMemoryStore:
+    """进程内会话记忆缓存（LRU + TTL + 字节上限），线程安全；仅限单 worker 部署"""
+
+    backend = "local"
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl: float):
+        self._cache = TTLCache(max_entries=max_entries, ttl=ttl, max_bytes=max_bytes, sizeof=memory_size)
+        self._locks = [threading.Lock() for _ in range(LOCAL_LOCK_STRIPES)]
+        metrics.gauge("chat_memory_cache_entries", lambda: len(self._cache))
+        metrics.gauge("chat_memory_cache_bytes", lambda: self._cache.total_bytes)
+        metrics.gauge("chat_memory_cache_evictions", lambda: self._cache.evictions)
+
+    def _lock(self, session_id: str) -> threading.Lock:
+        return self._locks[hash(session_id) % LOCAL_LOCK_STRIPES]
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        return self._cache.get(session_id)
+
+    def set(self, session_id: str, memory: Dict[str, Any]) -> None:
+        with self._lock(session_id):
+            self._cache.set(session_id, memory)
+
+    def append_history(self, session_id: str, entry: Tuple[str, str], max_len: int) -> bool:
+        """在会话锁内追加一条历史（保留最近 max_len 条）；未缓存时返回False"""
+        with self._lock(session_id):
+            memory = self._cache.get(session_id)
+            if memory is None:
+                return False
+            # 构造新的历史列表（缓存中的记忆可能被其他请求同时读取）
+            history = list(memory.get("history", [])) + [entry]
+            self._cache.set(session_id, {**memory, "history": history[-max_len:]})
+            return True
+
+    def set_summary(self, session_id: str, summary: Optional[str]) -> bool:
+        with self._lock(session_id):
+            memory = self._cache.get(session_id)
+            if memory is None:
+                return False
+            self._cache.set(session_id, {**memory, "summary": summary})
+            return True
+
+    def delete(self, session_id: str) -> None:
+        with self._lock(session_id):
+            self._cache.delete(session_id)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+
+class RedisMemoryStore:
+    """
+    Redis 会话记忆缓存：多个 worker 共享，过期由 Redis TTL 负责
+    每个会话两个键：<prefix><session_id>（摘要等字段的JSON）与 <prefix><session_id>:history（历史列表）
+    """
+
+    backend = "redis"
+
+    def __init__(self, client, ttl: float):
+        self._client = client
+        self.ttl = int(ttl)
+
+    @staticmethod
+    def _keys(session_id: str) -> Tuple[str, str]:
+        key = REDIS_KEY_PREFIX + session_id
+        return key, key + REDIS_HISTORY_SUFFIX
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        key, history_key = self._keys(session_id)
+        pipe = self._client.pipeline()
+        pipe.get(key)
+        pipe.lrange(history_key, 0, -1)
+        raw, history = pipe.execute()
+        if not raw:
+            return None
+        return {**json.loads(raw), "history": [json.loads(item) for item in history]}
+
+    def set(self, session_id: str, memory: Dict[str, Any]) -> None:
+        key, history_key = self._keys(session_id)
+        fields = {k: v for k, v in memory.items() if k != "history"}
+        history = [json.dumps(list(entry), ensure_ascii=False) for entry in memory.get("history", [])]
+        pipe = self._client.pipeline()  # MULTI/EXEC：其他 worker 不会读到写了一半的记忆
+        pipe.set(key, json.dumps(fields, ensure_ascii=False), ex=self.ttl)
+        pipe.delete(history_key)
+        if history:
+            pipe.rpush(history_key, *history)
+            pipe.expire(history_key, self.ttl)
+        pipe.execute()
+
+    def append_history(self, session_id: str, entry: Tuple[str, str], max_len: int) -> bool:
+        """RPUSH + LTRIM 原子追加一条历史；未缓存时返回False"""
+        key, history_key = self._keys(session_id)
+        pipe = self._client.pipeline()
+        pipe.rpush(history_key, json.dumps(list(entry), ensure_ascii=False))
+        pipe.ltrim(history_key, -max_len, -1)
+        pipe.expire(history_key, self.ttl)
+        pipe.expire(key, self.ttl)
+        if pipe.execute()[-1]:
+            return True
+        # 记忆已过期：丢弃刚写入的孤立历史，由调用方从数据库重新加载
+        self._client.delete(history_key)
+        return False
+
+    def set_summary(self, session_id: str, summary: Optional[str]) -> bool:
+        """只改写字段JSON，不影响并发追加的历史"""
+        key, _ = self._keys(session_id)
+        raw = self._client.get(key)
+        if not raw:
+            return False
+        fields = {**json.loads(raw), "summary": summary}
+        self._client.set(key, json.dumps(fields, ensure_ascii=False), ex=self.ttl)
+        return True
+
+    def delete(self, session_id: str) -> None:
+        self._client.delete(*self._keys(session_id))
+
+    def clear(self) -> None:
+        for key in self._client.scan_iter(REDIS_KEY_PREFIX + "*"):
+            self._client.delete(key)
+
+
+class MemoryStore:
+    """
+    会话记忆存储入口：统计命中率，后端出错时按未命中处理（回退到数据库加载）
+    存入的记忆视为只读，修改时请构造新的 dict 再 set()
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._hits = metrics.counter("chat_memory_cache_hits_total")
+        self._misses = metrics.counter("chat_memory_cache_misses_total")
+        self._errors = metrics.counter("chat_memory_cache_errors_total")
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            memory = self.backend.get(session_id)
+        except Exception:
+            self._errors.inc()
+            memory = None
+        (self._hits if memory is not None else self._misses).inc()
+        return memory
+
+    def set(self, session_id: str, memory: Dict[str, Any]) -> None:
+        try:
+            self.backend.set(session_id, memory)
+        except Exception:
+            self._errors.inc()
+
+    def append_history(self, session_id: str, entry: Tuple[str, str], max_len: int) -> bool:
+        """原子追加一条历史；未缓存（或后端出错）时返回False"""
+        try:
+            return self.backend.append_history(session_id, entry, max_len)
+        except Exception:
+            self._errors.inc()
+            return False
+
+    def set_summary(self, session_id: str, summary: Optional[str]) -> None:
+        try:
+            self.backend.set_summary(session_id, summary)
+        except Exception:
+            self._errors.inc()
+
+    def delete(self, session_id: str) -> None:
+        try:
+            self.backend.delete(session_id)
+        except Exception:
+            self._errors.inc()
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+
+def create_memory_store() -> MemoryStore:
+    """按 chat_memory_backend 配置创建存储（redis 不可用时回退进程内缓存）"""
+    if settings.chat_memory_backend == "redis":
+        if redis is None:
+            logger.warning("未安装 redis，会话记忆改用进程内缓存")
+        else:
+            client = redis.Redis.from_url(settings.redis_url)
+            return MemoryStore(RedisMemoryStore(client, settings.chat_memory_cache_ttl))
+    if int(os.environ.get("WEB_CONCURRENCY", "1") or 1) > 1:
+        logger.warning("进程内会话记忆只在单个 worker 内有效，多 worker 部署请设置 chat_memory_backend=redis")
+    return MemoryStore(LocalMemoryStore(
+        max_entries=settings.chat_memory_cache_max_entries,
+        max_bytes=settings.chat_memory_cache_max_bytes,
+        ttl=settings.chat_memory_cache_ttl,
+    ))
+
+
+# 全局会话记忆存储（同一进程内所有请求共享）
+memory_store = create_memory_store()
@@ -0,0 +1,319 @@
+"""
+近似重复条款检测 - 句子字符 shingle 的 MinHash 签名 + LSH 分桶
+- 轻微改写（增删几个字、换个地名）的同一条款精确哈希无法命中，按 Jaccard 相似度判断
+- 签名按 band 切段分桶，查询只比较同桶的候选，代价与语料规模无关（亚线性）
+- 与检索索引相同：进程内索引，按句子自增ID追平数据库，上传后增量更新，删除文档时剔除
+- 先例查询：某文档的句子在更早的已审查文档中出现过的近似重复，以及当时被标注的违规类型
+"""
+import threading
+import zlib
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.db_models import Annotation, Article, Sentence
+from app.services.search_service import VERIFY_CHUNK_SIZE, catch_up, normalize_text
+from app.utils.metrics import metrics
+
+# 哈希函数 (a*x + b) mod P，P 取 2^31-1：x、a 都小于 2^31，乘积不会溢出 uint64
+MERSENNE_PRIME = (1 << 31) - 1
+
+
+class MinHasher:
+    """字符 k-shingle 集合的 MinHash 签名（num_perm 个 uint32）"""
+
+    def __init__(self, num_perm: int, shingle_size: int, seed: int = 1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, MERSENNE_PRIME, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, MERSENNE_PRIME, num_perm, dtype=np.uint64)
+
+    def shingles(self, text: str) -> Set[str]:
+        text = normalize_text(text)
+        k = self.shingle_size
+        if len(text) <= k:
+            return {text} if text else set()
+        return {text[i:i + k] for i in range(len(text) - k + 1)}
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        shingles = self.shingles(text)
+        if not shingles:
+            return None
+        x = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+        x %= MERSENNE_PRIME
+        hashed = (np.outer(x, self._a) + self._b) % MERSENNE_PRIME
+        return hashed.min(axis=0).astype(np.uint32)
+
+
+class MinHashLSH:
+    """
+    LSH 索引：签名切成 bands 段，每段 rows 个值作为桶键
+    相似度为 s 的两句至少落入同一桶的概率为 1-(1-s^rows)^bands
+    """
+
+    def __init__(self, hasher: MinHasher, bands: int, threshold: float):
+        if hasher.num_perm % bands:
+            raise ValueError("num_perm 必须能被 bands 整除")
+        self.hasher = hasher
+        self.bands = bands
+        self.rows = hasher.num_perm // bands
+        self.threshold = threshold
+        self._buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(bands)]
+        self._signatures: Dict[int, np.ndarray] = {}
+        self._lock = threading.RLock()
+        self.deleted_count = 0
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def contains(self, doc_id: int) -> bool:
+        return doc_id in self._signatures
+
+    def add(self, doc_id: int, signature: np.ndarray) -> None:
+        with self._lock:
+            if doc_id in self._signatures:
+                return
+            self._signatures[doc_id] = signature
+            for buckets, key in zip(self._buckets, self._band_keys(signature)):
+                buckets.setdefault(key, []).append(doc_id)
+
+    def discard(self, doc_ids: Iterable[int]) -> None:
+        """删除签名（桶中残留ID查询时跳过），删除比例过高时重建分桶"""
+        with self._lock:
+            for doc_id in doc_ids:
+                if self._signatures.pop(doc_id, None) is not None:
+                    self.deleted_count += 1
+            if self.deleted_count > max(1000, len(self._signatures) // 5):
+                self._buckets = [
+                    {key: kept for key, ids in buckets.items() if (kept := [d for d in ids if d in self._signatures])}
+                    for buckets in self._buckets
+                ]
+                self.deleted_count = 0
+
+    def signature_of(self, doc_id: int) -> Optional[np.ndarray]:
+        return self._signatures.get(doc_id)
+
+    def query(self, signature: np.ndarray, exclude: Optional[int] = None) -> List[Tuple[int, float]]:
+        """同桶候选中估计相似度（签名相同位置的比例）不低于阈值的 [(ID, 相似度)]，相似度降序"""
+        with self._lock:
+            candidates: Set[int] = set()
+            for buckets, key in zip(self._buckets, self._band_keys(signature)):
+                candidates.update(buckets.get(key, ()))
+            candidates.discard(exclude)
+            ids = [d for d in candidates if d in self._signatures]
+            if not ids:
+                return []
+            others = np.stack([self._signatures[d] for d in ids])
+        metrics.counter("near_dup_candidates_total").inc(len(ids))
+        similarity = (others == signature).mean(axis=1)
+        matches = [(doc_id, float(s)) for doc_id, s in zip(ids, similarity) if s >= self.threshold]
+        matches.sort(key=lambda item: item[1], reverse=True)
+        return matches
+
+    def clusters(self) -> List[List[int]]:
+        """
+        把近似重复的句子合并成簇（并查集）：同桶且与桶内首个句子相似度达到阈值的合并
+        返回至少包含两个句子的簇，每簇ID升序
+        """
+        parent: Dict[int, int] = {}
+
+        def find(x: int) -> int:
+            while parent.get(x, x) != x:
+                parent[x] = parent.get(parent[x], parent[x])
+                x = parent[x]
+            return x
+
+        with self._lock:
+            for buckets in self._buckets:
+                for ids in buckets.values():
+                    ids = [d for d in ids if d in self._signatures]
+                    if len(ids) < 2:
+                        continue
+                    head = self._signatures[ids[0]]
+                    others = np.stack([self._signatures[d] for d in ids[1:]])
+                    for doc_id, s in zip(ids[1:], (others == head).mean(axis=1)):
+                        if s >= self.threshold:
+                            a, b = find(ids[0]), find(doc_id)
+                            if a != b:
+                                parent[max(a, b)] = min(a, b)
+        groups: Dict[int, List[int]] = defaultdict(list)
+        for doc_id in parent:
+            groups[find(doc_id)].append(doc_id)
+        return [sorted(set(members) | {root}) for root, members in groups.items() if len(set(members) | {root}) > 1]
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+
+class NearDuplicateIndex:
+    """句子近似重复索引（首次查询时从数据库分批构建，之后按ID增量追平）"""
+
+    def __init__(self, num_perm: int, bands: int, shingle_size: int, threshold: float, min_chars: int):
+        self.hasher = MinHasher(num_perm, shingle_size)
+        self.lsh = MinHashLSH(self.hasher, bands, threshold)
+        self.min_chars = min_chars
+        # 按句子ID记录是否已处理（含过短未入索引的句子），追平时不再重复读取
+        self._seen = bytearray()
+        self._watermark = 0
+        self._sync_lock = threading.Lock()
+        self.built = False
+        metrics.gauge("near_dup_indexed_sentences", lambda: len(self.lsh))
+
+    def _seen_before(self, sentence_id: int) -> bool:
+        return sentence_id < len(self._seen) and self._seen[sentence_id] != 0
+
+    def add(self, sentence_id: int, content: str) -> bool:
+        """索引一个句子（过短的句子不参与，避免“第一条”之类的模板句互相匹配）"""
+        if sentence_id >= len(self._seen):
+            self._seen.extend(bytes(max(sentence_id + 1 - len(self._seen), len(self._seen) // 2)))
+        self._seen[sentence_id] = 1
+        if len(normalize_text(content)) < self.min_chars:
+            return False
+        signature = self.hasher.signature(content)
+        if signature is None:
+            return False
+        self.lsh.add(sentence_id, signature)
+        return True
+
+    def sync(self, db: Session) -> int:
+        """把数据库中尚未索引的句子加入索引，返回新增条数"""
+        with self._sync_lock:
+            added, self._watermark = catch_up(
+                db, Sentence.id, self._watermark, self._seen_before,
+                lambda missing: db.query(Sentence.id, Sentence.content).filter(Sentence.id.in_(missing)).all(),
+                lambda row: self.add(*row)
+            )
+            self.built = True
+            return added
+
+    def on_ingest(self, db: Session) -> None:
+        """上传写入后调用：索引已构建时增量追平；尚未构建则留给首次查询时整体构建"""
+        if self.built:
+            self.sync(db)
+
+    def forget(self, sentence_ids: Iterable[int]) -> None:
+        """文档删除后从索引中剔除"""
+        self.lsh.discard(sentence_ids)
+
+    def similar(self, db: Session, text: str) -> List[Tuple[int, float]]:
+        """与任意文本近似重复的已索引句子 [(句子ID, 相似度)]"""
+        self.sync(db)
+        signature = self.hasher.signature(text)
+        return self.lsh.query(signature) if signature is not None else []
+
+    def precedents(self, db: Session, article_id: int) -> List[dict]:
+        """
+        文档中每个句子在更早的已审查文档里的近似重复及当时的标注：
+        [{sentence_id, content, similar_sentences, earlier_articles, labels: [{annotation_id, annotation_content, articles, sentences}]}]
+        """
+        self.sync(db)
+        sentences = db.query(Sentence.id, Sentence.content).filter(
+            Sentence.article_id == article_id
+        ).order_by(Sentence.id).all()
+
+        matches: Dict[int, List[int]] = {}
+        for sentence_id, content in sentences:
+            signature = self.lsh.signature_of(sentence_id)
+            if signature is None:
+                signature = self.hasher.signature(content) if len(normalize_text(content)) >= self.min_chars else None
+            if signature is not None:
+                found = [d for d, _ in self.lsh.query(signature, exclude=sentence_id)]
+                if found:
+                    matches[sentence_id] = found
+
+        # 一次性取回所有候选句子的所属文档与标注（只统计更早的、已审查完成的文档）
+        candidate_ids = sorted({d for ids in matches.values() for d in ids})
+        earlier: Dict[int, tuple] = {}
+        for start in range(0, len(candidate_ids), VERIFY_CHUNK_SIZE):
+            chunk = candidate_ids[start:start + VERIFY_CHUNK_SIZE]
+            rows = db.query(
+                Sentence.id, Sentence.article_id, Sentence.has_problem, Sentence.annotation_id, Annotation.content
+            ).join(
+                Article, Sentence.article_id == Article.id
+            ).outerjoin(
+                Annotation, Sentence.annotation_id == Annotation.id
+            ).filter(
+                Sentence.id.in_(chunk),
+                Sentence.article_id < article_id,
+                Article.status == "已审查"
+            ).all()
+            for row in rows:
+                earlier[row[0]] = row[1:]
+
+        contents = dict(sentences)
+        results = []
+        for sentence_id, found in matches.items():
+            rows = [earlier[d] for d in found if d in earlier]
+            if not rows:
+                continue
+            labels: Dict[Optional[int], dict] = {}
+            label_articles: Dict[Optional[int], Set[int]] = defaultdict(set)
+            for other_article, has_problem, annotation_id, annotation_content in rows:
+                if not has_problem:
+                    continue
+                entry = labels.setdefault(annotation_id, {
+                    "annotation_id": annotation_id,
+                    "annotation_content": annotation_content or "未定义违规描述",
+                    "sentences": 0,
+                })
+                entry["sentences"] += 1
+                label_articles[annotation_id].add(other_article)
+            for annotation_id, entry in labels.items():
+                entry["articles"] = len(label_articles[annotation_id])
+            results.append({
+                "sentence_id": sentence_id,
+                "content": contents[sentence_id],
+                "similar_sentences": len(rows),
+                "earlier_articles": len({row[0] for row in rows}),
+                "labels": sorted(labels.values(), key=lambda e: e["articles"], reverse=True),
+            })
+        return results
+
+    def clusters(self, db: Session, min_articles: int = 2, limit: int = 50) -> List[dict]:
+        """跨文档的近似重复条款簇（按涉及文档数降序），每簇给出示例句子与违规标注分布"""
+        self.sync(db)
+        groups = self.lsh.clusters()
+        members = sorted({d for group in groups for d in group})
+        rows: Dict[int, tuple] = {}
+        for start in range(0, len(members), VERIFY_CHUNK_SIZE):
+            chunk = members[start:start + VERIFY_CHUNK_SIZE]
+            for row in db.query(
+                    Sentence.id, Sentence.article_id, Sentence.content, Sentence.has_problem, Sentence.annotation_id
+            ).filter(Sentence.id.in_(chunk)).all():
+                rows[row[0]] = row[1:]
+
+        results = []
+        for group in groups:
+            found = [rows[d] for d in group if d in rows]
+            articles = {article for article, _, _, _ in found}
+            if len(articles) < min_articles:
+                continue
+            labels: Dict[int, int] = defaultdict(int)
+            for _, _, has_problem, annotation_id in found:
+                if has_problem and annotation_id is not None:
+                    labels[annotation_id] += 1
+            results.append({
+                "sentence_ids": [d for d in group if d in rows],
+                "sample": found[0][1],
+                "articles": len(articles),
+                "labels": dict(sorted(labels.items())),
+            })
+        results.sort(key=lambda c: c["articles"], reverse=True)
+        return results[:limit]
+
+    def stats(self) -> Dict[str, int]:
+        return {"sentences": len(self.lsh), "bands": self.lsh.bands, "rows": self.lsh.rows}
+
+
+# 全局索引实例（首次查询时从数据库分批构建）
+near_duplicate_index = NearDuplicateIndex(
+    num_perm=settings.near_dup_num_perm,
+    bands=settings.near_dup_bands,
+    shingle_size=settings.near_dup_shingle_size,
+    threshold=settings.near_dup_threshold,
+    min_chars=settings.near_dup_min_chars,
+)
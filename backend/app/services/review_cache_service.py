@@ -0,0 +1,128 @@
+"""
+已审查文档响应缓存 - 强ETag + 预压缩响应体
+审查完成后“审查详情/全文内容”的响应在重新审查前保持不变：
+- ETag 由 (文档ID, 审查完成时间, 模型版本, 响应格式版本) 计算，If-None-Match 命中直接返回304
+- 首次请求时把序列化后的JSON与 gzip/brotli 压缩版本写入 article_response_cache，之后直接返回字节
+"""
+import gzip
+import hashlib
+import logging
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import Request, Response
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import SessionLocal
+from app.models.db_models import Article, ArticleResponseCache
+from app.utils.json_response import dumps
+
+try:
+    import brotli
+except ImportError:  # brotli 为可选依赖，未安装时只提供 gzip
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+REVIEWED_STATUS = "已审查"
+# 响应结构变化时递增，使已缓存的响应体与客户端ETag一并失效
+RESPONSE_FORMAT_VERSION = 1
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 9
+# 304/200 都返回：客户端每次需携带ETag重新验证（重新审查后内容会变化）
+CACHE_CONTROL = "private, no-cache"
+
+# 写缓存使用的会话工厂（主库）
+session_factory = SessionLocal
+
+
+def compute_etag(article: Article, kind: str) -> str:
+    """强ETag：同一文档、同一次审查、同一模型版本的响应字节完全一致"""
+    stats = article.review_stats
+    model_version = (stats.model_version if stats is not None else None) or settings.review_model_version
+    review_time = article.review_time.isoformat() if article.review_time else ""
+    raw = f"{kind}:{article.id}:{review_time}:{model_version}:{RESPONSE_FORMAT_VERSION}"
+    return '"' + hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """解析 If-None-Match（支持多个值与 *，按弱比较忽略 W/ 前缀）"""
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    return "*" in candidates or any(value.removeprefix("W/") == etag for value in candidates)
+
+
+def _accepted_encodings(request: Request) -> set:
+    accepted = set()
+    for part in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = part.strip().partition(";")
+        if name and params.replace(" ", "") not in ("q=0", "q=0.0"):
+            accepted.add(name.lower())
+    return accepted
+
+
+def _response(request: Request, entry: ArticleResponseCache, etag: str) -> Response:
+    """按客户端 Accept-Encoding 返回预压缩的响应体"""
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL, "Vary": "Accept-Encoding"}
+    accepted = _accepted_encodings(request)
+    body = entry.body
+    if entry.body_br is not None and "br" in accepted:
+        body = entry.body_br
+        headers["Content-Encoding"] = "br"
+    elif "gzip" in accepted:
+        body = entry.body_gzip
+        headers["Content-Encoding"] = "gzip"
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def build_entry(article_id: int, kind: str, etag: str, payload: Dict[str, Any]) -> ArticleResponseCache:
+    body = dumps(payload)
+    return ArticleResponseCache(
+        article_id=article_id,
+        kind=kind,
+        etag=etag,
+        body=body,
+        body_gzip=gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0),
+        body_br=brotli.compress(body, quality=BROTLI_QUALITY) if brotli is not None else None,
+    )
+
+
+def _store(entry: ArticleResponseCache) -> None:
+    """写入缓存（使用主库会话：读请求可能运行在只读副本上）；失败不影响本次响应"""
+    db = session_factory()
+    try:
+        db.merge(entry)
+        db.commit()
+    except IntegrityError:
+        db.rollback()  # 并发请求已写入（或文档刚被删除）
+    except Exception:
+        db.rollback()
+        logger.exception(f"响应缓存写入失败（文档ID {entry.article_id}）")
+    finally:
+        db.close()
+
+
+def serve_reviewed(
+        request: Request,
+        db: Session,
+        article: Article,
+        kind: str,
+        build_payload: Callable[[], Dict[str, Any]]
+) -> Response:
+    """
+    已审查文档的缓存响应：
+    1. If-None-Match 与当前ETag一致 → 304（不查询句子、不解析docx）
+    2. 缓存表中有同ETag的响应体 → 直接返回（按 Accept-Encoding 选择压缩版本）
+    3. 否则调用 build_payload() 生成响应，写入缓存后返回
+    """
+    etag = compute_etag(article, kind)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+    entry = db.get(ArticleResponseCache, (article.id, kind))
+    if entry is None or entry.etag != etag:
+        entry = build_entry(article.id, kind, etag, build_payload())
+        _store(entry)
+    return _response(request, entry, etag)
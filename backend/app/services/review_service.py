@@ -1,7 +1,10 @@
 from sqlalchemy.orm import Session
 from datetime import datetime
-from app.models import db_models  # 统一导入数据库模型
+from collections import Counter
+import time
+from app.models import db_models, SessionLocal  # 统一导入数据库模型
 from app.utils.helpers import calculate_risk_level
+from app.services import analytics_service
 from app.config import settings
 import torch
 from transformers import BertTokenizer
@@ -53,6 +56,7 @@ def start_review_task(article_id: int, db: Session):
     4. 计算风险等级并标记审查完成
     """
     global model, tokenizer, device
+    review_started = time.perf_counter()
     try:
         # 1. 验证模型是否已加载
         if model is None or tokenizer is None:
@@ -62,6 +66,8 @@ def start_review_task(article_id: int, db: Session):
         article = db.query(db_models.Article).filter(db_models.Article.id == article_id).first()
         if not article:
             raise Exception(f"文档ID {article_id} 不存在")
+        # 重新审查时需先从统计汇总表中扣除上一次的结果
+        previous_contribution = analytics_service.review_contribution(article)
 
         sentences = db.query(db_models.Sentence).filter(db_models.Sentence.article_id == article_id).all()
         if not sentences:
@@ -70,11 +76,15 @@ def start_review_task(article_id: int, db: Session):
             article.review_progress = 100
             article.risk_level = "无风险"
             article.review_time = datetime.utcnow()
+            stats = save_review_stats(db, article_id, 0, 0, 0, Counter(), review_started)
+            analytics_service.apply_review_to_rollups(db, article, stats, previous_contribution)
             db.commit()
             return
 
         total_sentences = len(sentences)
         violation_count = 0  # 违规句子数量
+        reviewed_count = 0  # 成功审查的句子数量
+        label_counts = Counter()  # 违规标签分布（1~54）
 
         # -------------------------- 关键：拆分步骤计算进度 --------------------------
         steps_per_sentence = 4  # 每句拆4步：分词→预测→关联标注→提交
@@ -130,6 +140,8 @@ def start_review_task(article_id: int, db: Session):
                         sentence.annotation_id = annotation.id
                         sentence.has_problem = True
                         violation_count += 1
+                        # 标签分布只统计关联到标注的句子（与按句子表回填的口径一致）
+                        label_counts[predicted_label] += 1
                         print(f"句子ID {sentence.id} 关联违规类型：{annotation.content}")
                     else:
                         print(f"警告：Annotation表缺少id={predicted_label}的记录")
@@ -157,6 +169,7 @@ def start_review_task(article_id: int, db: Session):
                 progress = min(int((current_step / total_steps) * 100), 99)
                 article.review_progress = progress
                 db.commit()
+                reviewed_count += 1
 
             except Exception as e:
                 # 单个句子处理失败：跳过该句，但推进对应步骤的进度（避免卡住）
@@ -173,14 +186,58 @@ def start_review_task(article_id: int, db: Session):
         article.status = "已审查"
         article.review_progress = 100  # 最终确保100%
         article.review_time = datetime.utcnow()
+        stats = save_review_stats(
+            db, article_id, total_sentences, reviewed_count, violation_count, label_counts, review_started
+        )
+        analytics_service.apply_review_to_rollups(db, article, stats, previous_contribution)
         db.commit()
         print(f"文档ID {article_id} 审查完成，风险等级：{article.risk_level}")
 
     except Exception as e:
         # 审查失败：重置进度和状态
+        db.rollback()
         article = db.query(db_models.Article).filter(db_models.Article.id == article_id).first()
         if article:
+            # 重新审查失败：上一次的结果不再计入（rebuild_rollups 只统计已审查文档），从汇总表中扣除
+            analytics_service.remove_review_from_rollups(db, article)
+            article.review_time = None
             article.status = "待审查"
             article.review_progress = 0
             db.commit()
         print(f"文档ID {article_id} 审查失败：{str(e)}")
+
+
+def save_review_stats(
+        db: Session,
+        article_id: int,
+        total_sentences: int,
+        reviewed_sentences: int,
+        violation_count: int,
+        label_counts: Counter,
+        review_started: float
+) -> db_models.ArticleReviewStats:
+    """写入（或覆盖）文档审查统计，随审查完成状态一起提交"""
+    stats = db_models.ArticleReviewStats(
+        article_id=article_id,
+        total_sentences=total_sentences,
+        reviewed_sentences=reviewed_sentences,
+        violation_count=violation_count,
+        label_histogram={str(label): count for label, count in sorted(label_counts.items())},
+        review_duration_ms=int((time.perf_counter() - review_started) * 1000),
+        model_version=settings.review_model_version,
+        created_at=datetime.utcnow()
+    )
+    return db.merge(stats)
+
+
+def run_review_tasks(article_ids: list[int]):
+    """
+    批量审查（后台运行）：逐个文档执行审查任务
+    每个文档使用独立的数据库会话，避免依赖请求结束后已关闭的会话
+    """
+    for article_id in article_ids:
+        db = SessionLocal()
+        try:
+            start_review_task(article_id, db)
+        finally:
+            db.close()
@@ -0,0 +1,431 @@
+"""
+全文检索服务 - 句子内容/文档名称的字符 n-gram 倒排索引
+中文没有天然分词边界，按字符 n-gram 建索引：查询词的所有 n-gram 倒排表求交集得到候选，
+再回数据库按主键精确校验（内容包含、是否违规、标注类型），保证结果准确。
+句子的是否违规/标注类型按句子ID记录在索引中，过滤条件在回库前就与候选求交，
+“提到X的违规句子”即使X很常见也只需一次回库校验。
+"""
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.db_models import Article, Sentence, Annotation
+
+logger = logging.getLogger(__name__)
+
+SYNC_CHUNK_SIZE = 5000  # 追平索引时每批读取的行数
+SYNC_OVERLAP = 1000  # 追平时回看的ID窗口（覆盖并发事务晚提交的小ID）
+VERIFY_CHUNK_SIZE = 500  # 回库校验时每批候选ID数量
+# 刷新句子标签时回看的审查完成时间窗口：review_time 在提交前取值，晚提交的审查可能带着更早的时间
+REVIEW_OVERLAP = timedelta(minutes=5)
+
+_INDEXED = 1
+_DELETED = 2
+
+# 句子是否违规的编码（0 表示尚未审查）
+_NO_PROBLEM = 1
+_HAS_PROBLEM = 2
+
+
+def normalize_text(text: str) -> str:
+    """统一大小写并去掉空白，保证索引与查询切分一致"""
+    return "".join((text or "").lower().split())
+
+
+def catch_up(
+        db: Session,
+        id_col,
+        watermark: int,
+        is_indexed: Callable[[int], bool],
+        load_rows: Callable[[List[int]], Iterable[Any]],
+        add_row: Callable[[Any], bool]
+) -> Tuple[int, int]:
+    """
+    按自增ID把进程内索引追平数据库（检索/近似重复/聊天检索索引共用）
+    先只按主键扫描ID（覆盖索引，代价很低），仅对 is_indexed 为假的ID用 load_rows 读取整行，再逐行交给 add_row
+    从 watermark - SYNC_OVERLAP 开始扫描，覆盖并发事务晚提交的小ID
+    :return: (add_row 返回真的行数, 新的水位)
+    """
+    added = 0
+    last_id = max(watermark - SYNC_OVERLAP, 0)
+    while True:
+        ids = [row_id for (row_id,) in db.query(id_col).filter(id_col > last_id).order_by(id_col).limit(SYNC_CHUNK_SIZE)]
+        missing = [row_id for row_id in ids if not is_indexed(row_id)]
+        if missing:
+            for row in load_rows(missing):
+                if add_row(row):
+                    added += 1
+        if ids:
+            last_id = ids[-1]
+        if len(ids) < SYNC_CHUNK_SIZE:
+            break
+    return added, max(watermark, last_id)
+
+
+class NgramIndex:
+    """
+    字符 n-gram 倒排索引
+    - postings：gram -> array('I')，按文档ID升序（追加为主，乱序时延迟排序）
+    - _state：bytearray，按文档ID记录 已索引/已删除，避免重复索引
+    """
+
+    def __init__(self, n: int = 2):
+        self.n = n
+        self._postings: Dict[str, array] = {}
+        self._unsorted: Set[str] = set()
+        self._state = bytearray()
+        self._lock = threading.RLock()
+        self.doc_count = 0
+        self.deleted_count = 0
+
+    def grams(self, text: str) -> Set[str]:
+        text = normalize_text(text)
+        if len(text) < self.n:
+            return set()
+        return {text[i:i + self.n] for i in range(len(text) - self.n + 1)}
+
+    def _ensure_state(self, doc_id: int) -> None:
+        if doc_id >= len(self._state):
+            self._state.extend(bytes(max(doc_id + 1 - len(self._state), len(self._state) // 2)))
+
+    def contains(self, doc_id: int) -> bool:
+        return doc_id < len(self._state) and self._state[doc_id] != 0
+
+    def add(self, doc_id: int, text: str) -> bool:
+        """索引一个文档，已索引（或已删除）的ID返回False"""
+        with self._lock:
+            self._ensure_state(doc_id)
+            if self._state[doc_id]:
+                return False
+            self._state[doc_id] = _INDEXED
+            self.doc_count += 1
+            for gram in self.grams(text):
+                postings = self._postings.get(gram)
+                if postings is None:
+                    self._postings[gram] = array("I", (doc_id,))
+                    continue
+                if postings[-1] > doc_id:
+                    self._unsorted.add(gram)
+                postings.append(doc_id)
+        return True
+
+    def discard(self, doc_ids: Iterable[int]) -> None:
+        """标记文档已删除（查询时跳过），删除比例过高时压缩倒排表"""
+        with self._lock:
+            for doc_id in doc_ids:
+                if doc_id < len(self._state) and self._state[doc_id] == _INDEXED:
+                    self._state[doc_id] = _DELETED
+                    self.deleted_count += 1
+            if self.deleted_count > max(1000, self.doc_count // 5):
+                self._compact()
+
+    def _compact(self) -> None:
+        state = self._state
+        for gram in list(self._postings):
+            kept = array("I", (d for d in self._postings[gram] if state[d] == _INDEXED))
+            if kept:
+                self._postings[gram] = kept
+            else:
+                del self._postings[gram]
+                self._unsorted.discard(gram)
+        self.doc_count -= self.deleted_count
+        self.deleted_count = 0
+
+    def _sorted_postings(self, gram: str) -> array:
+        postings = self._postings.get(gram)
+        if postings is None:
+            return array("I")
+        if gram in self._unsorted:
+            postings = array("I", sorted(set(postings)))
+            self._postings[gram] = postings
+            self._unsorted.discard(gram)
+        return postings
+
+    def search(self, query: str) -> List[int]:
+        """返回包含查询词全部 n-gram 的候选文档ID（降序：新文档在前）"""
+        grams = self.grams(query)
+        if not grams:
+            return []
+        with self._lock:
+            lists = sorted((self._sorted_postings(g) for g in grams), key=len)
+            if not lists[0]:
+                return []
+            candidates = [d for d in lists[0] if self._state[d] == _INDEXED]
+            for postings in lists[1:]:
+                size = len(postings)
+                kept = []
+                for doc_id in candidates:
+                    pos = bisect_left(postings, doc_id)
+                    if pos < size and postings[pos] == doc_id:
+                        kept.append(doc_id)
+                candidates = kept
+                if not candidates:
+                    break
+        candidates.reverse()
+        return candidates
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "documents": self.doc_count - self.deleted_count,
+            "grams": len(self._postings),
+            "postings": sum(len(p) for p in self._postings.values()),
+        }
+
+
+class BackgroundBuild(ABC):
+    """
+    进程内索引的后台构建：服务启动时由 warm_in_background 在后台线程整体构建，
+    构建完成前 ready() 返回False，调用方直接回库查询，首个用户请求不承担整体构建
+    （未启用后台构建时，仍在首次查询时构建）
+    """
+    built = False
+    _warming = False
+
+    @abstractmethod
+    def sync(self, db: Session) -> int:
+        """把数据库中尚未索引的行加入索引，返回新增条数"""
+
+    def warm_in_background(self, session_factory, name: str) -> threading.Thread:
+        self._warming = True
+
+        def run():
+            db = session_factory()
+            started = time.perf_counter()
+            try:
+                added = self.sync(db)
+                logger.info(f"{name} 索引构建完成：{added} 条，耗时 {time.perf_counter() - started:.1f} 秒")
+            except Exception:
+                logger.exception(f"{name} 索引构建失败")
+            finally:
+                db.close()
+                self._warming = False
+
+        thread = threading.Thread(target=run, name=f"{name}-index-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def ready(self, db: Session) -> bool:
+        """索引可用时追平新写入的行并返回True；后台构建尚未完成时返回False"""
+        if self._warming and not self.built:
+            return False
+        self.sync(db)
+        return True
+
+
+class SearchIndex(BackgroundBuild):
+    """
+    进程内检索索引（句子内容 + 文档名称）
+    每次查询前按自增ID追平数据库中新写入的行，因此其他worker上传的文档也能检索到；
+    上传接口写入后主动调用 sync()，使本进程索引即时更新。
+    句子标签（是否违规、标注类型）随句子一起读入；审查完成后按 Article.review_time 前移重新读取该文档的标签，
+    其他worker完成的审查同样在下一次查询前生效（审查进行中的中间结果不会提前反映到过滤中）。
+    """
+
+    def __init__(self, n: int = 2):
+        self.sentences = NgramIndex(n)
+        self.articles = NgramIndex(n)
+        self._watermarks = {"sentences": 0, "articles": 0}
+        self._sync_lock = threading.Lock()
+        # 句子ID -> 是否违规编码 / 标注ID（0 表示无）
+        self._problem = bytearray()
+        self._annotation = array("I")
+        self._reviewed_until = None  # 已读取标签的最晚审查完成时间
+        # 回看窗口内已读取标签的文档 -> 读取时的审查完成时间（窗口内同一次审查只读取一次）
+        self._recent_reviews: Dict[int, datetime] = {}
+        self.built = False
+
+    def _set_labels(self, sentence_id: int, has_problem: Optional[bool], annotation_id: Optional[int]) -> None:
+        if sentence_id >= len(self._problem):
+            grow = max(sentence_id + 1 - len(self._problem), len(self._problem) // 2)
+            self._problem.extend(bytes(grow))
+            self._annotation.extend([0] * grow)
+        self._problem[sentence_id] = 0 if has_problem is None else (_HAS_PROBLEM if has_problem else _NO_PROBLEM)
+        self._annotation[sentence_id] = annotation_id or 0
+
+    def _add_sentence(self, row) -> bool:
+        sentence_id, content, has_problem, annotation_id = row
+        self._set_labels(sentence_id, has_problem, annotation_id)
+        return self.sentences.add(sentence_id, content)
+
+    def _refresh_labels(self, db: Session) -> None:
+        """
+        重新读取新完成审查的文档的句子标签（走 ix_articles_review_time 与 ix_sentences_article_id_has_problem）
+        从水位回看 REVIEW_OVERLAP 扫描，按 (文档ID, 审查完成时间) 判断是否已读取过，覆盖晚提交的较早审查时间
+        """
+        q = db.query(Article.id, Article.review_time)
+        if self._reviewed_until is None:
+            q = q.filter(Article.review_time.isnot(None))
+        else:
+            q = q.filter(Article.review_time >= self._reviewed_until - REVIEW_OVERLAP)
+        reviewed = [(article_id, review_time) for article_id, review_time in q
+                    if self._recent_reviews.get(article_id) != review_time]
+        if not reviewed:
+            return
+        article_ids = [article_id for article_id, _ in reviewed]
+        for start in range(0, len(article_ids), VERIFY_CHUNK_SIZE):
+            chunk = article_ids[start:start + VERIFY_CHUNK_SIZE]
+            for sentence_id, has_problem, annotation_id in db.query(
+                    Sentence.id, Sentence.has_problem, Sentence.annotation_id
+            ).filter(Sentence.article_id.in_(chunk)):
+                self._set_labels(sentence_id, has_problem, annotation_id)
+        latest = max(review_time for _, review_time in reviewed)
+        if self._reviewed_until is None or latest > self._reviewed_until:
+            self._reviewed_until = latest
+        self._recent_reviews.update(reviewed)
+        horizon = self._reviewed_until - REVIEW_OVERLAP
+        self._recent_reviews = {a: t for a, t in self._recent_reviews.items() if t >= horizon}
+
+    def _filter_labels(self, candidates: List[int], has_problem: Optional[bool], annotation_id: Optional[int]) -> List[int]:
+        """按索引中的句子标签过滤候选（回库前求交，回库时仍按数据库中的值再校验一次）"""
+        if has_problem is not None:
+            want = _HAS_PROBLEM if has_problem else _NO_PROBLEM
+            problem = self._problem
+            candidates = [d for d in candidates if d < len(problem) and problem[d] == want]
+        if annotation_id is not None:
+            annotations = self._annotation
+            candidates = [d for d in candidates if d < len(annotations) and annotations[d] == annotation_id]
+        return candidates
+
+    def _catch_up(self, db: Session, key: str, id_col, text_col, index: NgramIndex) -> int:
+        added, self._watermarks[key] = catch_up(
+            db, id_col, self._watermarks[key], index.contains,
+            lambda missing: db.query(id_col, text_col).filter(id_col.in_(missing)).all(),
+            lambda row: index.add(*row)
+        )
+        return added
+
+    def sync(self, db: Session) -> int:
+        """把数据库中尚未索引的句子/文档名加入索引，并刷新新完成审查的句子标签，返回新增条数"""
+        with self._sync_lock:
+            if self.built:
+                self._refresh_labels(db)
+            else:
+                # 首次构建：新读入的句子自带当前标签，只需记下此刻为止的审查完成时间
+                self._reviewed_until = db.query(func.max(Article.review_time)).scalar()
+            added, self._watermarks["sentences"] = catch_up(
+                db, Sentence.id, self._watermarks["sentences"], self.sentences.contains,
+                lambda missing: db.query(
+                    Sentence.id, Sentence.content, Sentence.has_problem, Sentence.annotation_id
+                ).filter(Sentence.id.in_(missing)).all(),
+                self._add_sentence
+            )
+            added += self._catch_up(db, "articles", Article.id, Article.name, self.articles)
+            self.built = True
+            return added
+
+    def on_ingest(self, db: Session) -> None:
+        """上传写入后调用：索引已构建时增量追平；尚未构建则留给首次查询时整体构建"""
+        if self.built:
+            self.sync(db)
+
+    def forget_articles(self, article_ids: Iterable[int], sentence_ids: Iterable[int]) -> None:
+        """文档删除后从索引中剔除"""
+        self.articles.discard(article_ids)
+        self.sentences.discard(sentence_ids)
+
+    @staticmethod
+    def _sentence_query(
+            db: Session,
+            keyword: str,
+            has_problem: Optional[bool],
+            annotation_id: Optional[int],
+            article_id: Optional[int]
+    ):
+        q = db.query(
+            Sentence.id,
+            Sentence.content,
+            Sentence.article_id,
+            Sentence.has_problem,
+            Sentence.annotation_id,
+            Article.name.label("article_name"),
+            Annotation.content.label("annotation_content")
+        ).join(
+            Article, Sentence.article_id == Article.id
+        ).outerjoin(
+            Annotation, Sentence.annotation_id == Annotation.id
+        ).filter(
+            Sentence.content.contains(keyword, autoescape=True)
+        )
+        if has_problem is not None:
+            q = q.filter(Sentence.has_problem == has_problem)
+        if annotation_id is not None:
+            q = q.filter(Sentence.annotation_id == annotation_id)
+        if article_id is not None:
+            q = q.filter(Sentence.article_id == article_id)
+        return q.order_by(Sentence.id.desc())
+
+    @staticmethod
+    def _sentence_dict(row) -> dict:
+        return {
+            "id": row.id,
+            "content": row.content,
+            "article_id": row.article_id,
+            "article_name": row.article_name,
+            "has_problem": row.has_problem,
+            "annotation_id": row.annotation_id,
+            "annotation_content": row.annotation_content,
+        }
+
+    def search_sentences(
+            self,
+            db: Session,
+            query: str,
+            has_problem: Optional[bool] = None,
+            annotation_id: Optional[int] = None,
+            article_id: Optional[int] = None,
+            limit: int = 50
+    ) -> List[dict]:
+        """检索包含关键词的句子（可按是否违规/标注类型/所属文档过滤），新句子在前"""
+        keyword = query.strip()
+        if not self.ready(db):
+            # 索引仍在后台构建：直接回库查询（结果一致，只是较慢）
+            rows = self._sentence_query(db, keyword, has_problem, annotation_id, article_id).limit(limit).all()
+            return [self._sentence_dict(row) for row in rows]
+
+        results: List[dict] = []
+        candidates = self._filter_labels(self.sentences.search(keyword), has_problem, annotation_id)
+        for start in range(0, len(candidates), VERIFY_CHUNK_SIZE):
+            chunk = candidates[start:start + VERIFY_CHUNK_SIZE]
+            q = self._sentence_query(db, keyword, has_problem, annotation_id, article_id)
+            for row in q.filter(Sentence.id.in_(chunk)).all():
+                results.append(self._sentence_dict(row))
+                if len(results) >= limit:
+                    return results
+        return results
+
+    def search_articles(self, db: Session, query: str, limit: int = 20) -> List[Article]:
+        """按文件名检索文档，新文档在前"""
+        keyword = query.strip()
+        if not self.ready(db):
+            return db.query(Article).filter(
+                Article.name.contains(keyword, autoescape=True)
+            ).order_by(Article.id.desc()).limit(limit).all()
+
+        results: List[Article] = []
+        candidates = self.articles.search(keyword)
+        for start in range(0, len(candidates), VERIFY_CHUNK_SIZE):
+            chunk = candidates[start:start + VERIFY_CHUNK_SIZE]
+            rows = db.query(Article).filter(
+                Article.id.in_(chunk),
+                Article.name.contains(keyword, autoescape=True)
+            ).order_by(Article.id.desc()).all()
+            results.extend(rows[:limit - len(results)])
+            if len(results) >= limit:
+                break
+        return results
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {"sentences": self.sentences.stats(), "articles": self.articles.stats()}
+
+
+# 全局索引实例（服务启动时在后台构建，见 app.main）
+search_index = SearchIndex(n=settings.search_ngram_size)
@@ -0,0 +1,112 @@
+"""
+会话摘要后台任务 - 回复返回后再异步合并摘要，用户不等待摘要生成
+- 每条AI回复后 notify(session_id)；同一会话已在队列中时合并为一次
+- 未摘要的新消息达到条数或token阈值才调用 LLM（见 MemoryService.summarize_pending）；
+  extractive 模式的会话平时使用本地要点，只在积累到 consolidate_turns 条时做一次LLM合并
+- 队列有界，队列满时丢弃本次通知（下一轮对话会再次触发）
+"""
+import logging
+import queue
+import threading
+import time
+from typing import Optional, Set
+
+from app.config import settings
+from app.models import SessionLocal
+from app.services.memory_service import MEMORY_MODE_EXTRACTIVE, MemoryService
+from app.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class SummaryWorker:
+    """单个后台线程消费待摘要会话队列（首次提交任务时启动）"""
+
+    def __init__(
+            self,
+            max_queue: int,
+            min_turns: int,
+            min_tokens: int,
+            consolidate_turns: int,
+            session_factory=None
+    ):
+        self.min_turns = min_turns
+        self.min_tokens = min_tokens
+        self.consolidate_turns = consolidate_turns
+        self._session_factory = session_factory or SessionLocal
+        self._queue: "queue.Queue[str]" = queue.Queue(maxsize=max_queue)
+        self._pending: Set[str] = set()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        metrics.gauge("chat_summary_queue_depth", self._queue.qsize)
+
+    def notify(self, session_id: str) -> bool:
+        """会话有新回复：排队检查是否需要更新摘要（不阻塞），返回是否新入队"""
+        with self._lock:
+            if session_id in self._pending:
+                metrics.counter("chat_summary_coalesced_total").inc()
+                return False
+            try:
+                self._queue.put_nowait(session_id)
+            except queue.Full:
+                metrics.counter("chat_summary_dropped_total").inc()
+                return False
+            self._pending.add(session_id)
+        metrics.counter("chat_summary_enqueued_total").inc()
+        self._ensure_worker()
+        return True
+
+    def _ensure_worker(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="chat-summary", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            session_id = self._queue.get()
+            # 开始处理后再到来的通知重新入队（处理期间可能又有新消息）
+            with self._lock:
+                self._pending.discard(session_id)
+            try:
+                self._summarize(session_id)
+            except Exception:
+                metrics.counter("chat_summary_failed_total").inc()
+                logger.exception(f"会话摘要更新失败：{session_id}")
+            finally:
+                self._queue.task_done()
+
+    def _summarize(self, session_id: str) -> None:
+        db = self._session_factory()
+        try:
+            started = time.perf_counter()
+            service = MemoryService(db)
+            user_id = service.get_or_create_memory(session_id).get("user_id")
+            if service.memory_mode(session_id, user_id) == MEMORY_MODE_EXTRACTIVE:
+                min_turns, min_tokens = self.consolidate_turns, float("inf")
+            else:
+                min_turns, min_tokens = self.min_turns, self.min_tokens
+            if service.summarize_pending(session_id, min_turns, min_tokens):
+                metrics.counter("chat_summary_completed_total").inc()
+                metrics.histogram("chat_summary_seconds").observe(time.perf_counter() - started)
+            else:
+                metrics.counter("chat_summary_skipped_total").inc()
+        finally:
+            db.close()
+
+    def join(self, timeout: float = 10.0) -> bool:
+        """等待当前队列清空（测试/停机时使用），超时返回False"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self._queue.unfinished_tasks == 0:
+                return True
+            time.sleep(0.01)
+        return False
+
+
+summary_worker = SummaryWorker(
+    max_queue=settings.chat_summary_queue_size,
+    min_turns=settings.chat_summary_min_turns,
+    min_tokens=settings.chat_summary_min_tokens,
+    consolidate_turns=settings.chat_summary_consolidate_turns
+)
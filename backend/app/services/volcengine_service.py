@@ -5,6 +5,7 @@ import httpx
 import json
 from typing import Dict, Any, Optional, AsyncGenerator
 from app.config import settings
+from app.services.llm_client import llm_provider
 import logging
 
 logger = logging.getLogger(__name__)
@@ -13,12 +14,41 @@ class VolcengineService:
     """火山引擎AI服务"""
     
     def __init__(self):
-        self.api_key = settings.ai_api_key
-        self.api_url = settings.ai_api_url
-        self.model = settings.ai_model
         self.max_tokens = settings.ai_max_tokens
         self.timeout = settings.ai_processing_timeout
+
+    # 地址/密钥/模型与聊天服务共用同一份配置
+    @property
+    def api_key(self) -> str:
+        return llm_provider.config.api_key
+
+    @property
+    def api_url(self) -> str:
+        return llm_provider.config.base_url
+
+    @property
+    def model(self) -> str:
+        return llm_provider.config.model
     
+    def _request_args(self, messages: list, temperature: float, stream: bool) -> Dict[str, Any]:
+        """请求地址、请求头与请求体"""
+        if not self.api_key:
+            raise ValueError("火山引擎API密钥未配置")
+        return {
+            "url": f"{self.api_url}/chat/completions",
+            "headers": {
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json"
+            },
+            "json": {
+                "model": self.model,
+                "messages": messages,
+                "temperature": temperature,
+                "max_tokens": self.max_tokens,
+                "stream": stream
+            },
+        }
+
     async def chat_completion(
         self, 
         messages: list, 
@@ -31,40 +61,23 @@ class VolcengineService:
         Args:
             messages: 消息列表
             temperature: 温度参数
-            stream: 是否流式返回
+            stream: 是否流式返回（需要逐段读取时请使用 stream_deltas）
             
         Returns:
             API响应结果
         """
-        if not self.api_key:
-            raise ValueError("火山引擎API密钥未配置")
-        
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-        
-        payload = {
-            "model": self.model,
-            "messages": messages,
-            "temperature": temperature,
-            "max_tokens": self.max_tokens,
-            "stream": stream
-        }
+        request_args = self._request_args(messages, temperature, stream)
         
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(
-                    f"{self.api_url}/chat/completions",
-                    headers=headers,
-                    json=payload
-                )
-                response.raise_for_status()
-                
-                if stream:
-                    return response
-                else:
-                    return response.json()
+            # 共享连接池（长连接复用，避免每次请求重新握手）
+            client = llm_provider.async_http_client
+            response = await client.post(**request_args)
+            response.raise_for_status()
+            
+            if stream:
+                return response
+            else:
+                return response.json()
                     
         except httpx.HTTPStatusError as e:
             logger.error(f"火山引擎API HTTP错误: {e.response.status_code} - {e.response.text}")
@@ -75,39 +88,68 @@ class VolcengineService:
         except Exception as e:
             logger.error(f"火山引擎API未知错误: {str(e)}")
             raise Exception(f"API调用失败: {str(e)}")
-    
-    async def chat_completion_stream(
-        self, 
-        messages: list, 
+
+    async def stream_deltas(
+        self,
+        messages: list,
         temperature: float = 0.7
     ) -> AsyncGenerator[str, None]:
         """
-        流式调用火山引擎聊天完成API
+        流式调用火山引擎聊天完成API，边接收边产出增量文本（出错时抛出异常）
         
         Args:
             messages: 消息列表
             temperature: 温度参数
             
         Yields:
-            流式响应数据
+            增量文本
         """
+        request_args = self._request_args(messages, temperature, stream=True)
+        client = llm_provider.async_http_client
         try:
-            response = await self.chat_completion(messages, temperature, stream=True)
-            
-            async for line in response.aiter_lines():
-                if line.startswith("data: "):
+            async with client.stream("POST", **request_args) as response:
+                if response.is_error:
+                    await response.aread()
+                    logger.error(f"火山引擎API HTTP错误: {response.status_code} - {response.text}")
+                    raise Exception(f"API请求失败: {response.status_code}")
+
+                async for line in response.aiter_lines():
+                    if not line.startswith("data: "):
+                        continue
                     data = line[6:]  # 移除 "data: " 前缀
                     if data.strip() == "[DONE]":
                         break
                     try:
                         chunk = json.loads(data)
-                        if "choices" in chunk and len(chunk["choices"]) > 0:
-                            delta = chunk["choices"][0].get("delta", {})
-                            if "content" in delta:
-                                yield delta["content"]
                     except json.JSONDecodeError:
                         continue
-                        
+                    choices = chunk.get("choices") or []
+                    if choices:
+                        content = (choices[0].get("delta") or {}).get("content")
+                        if content:
+                            yield content
+        except httpx.RequestError as e:
+            logger.error(f"火山引擎API请求错误: {str(e)}")
+            raise Exception(f"网络请求失败: {str(e)}")
+    
+    async def chat_completion_stream(
+        self, 
+        messages: list, 
+        temperature: float = 0.7
+    ) -> AsyncGenerator[str, None]:
+        """
+        流式调用火山引擎聊天完成API（出错时产出错误文本，不抛出异常）
+        
+        Args:
+            messages: 消息列表
+            temperature: 温度参数
+            
+        Yields:
+            流式响应数据
+        """
+        try:
+            async for delta in self.stream_deltas(messages, temperature):
+                yield delta
         except Exception as e:
             logger.error(f"火山引擎流式API错误: {str(e)}")
             yield f"错误: {str(e)}"
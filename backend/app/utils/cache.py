@@ -0,0 +1,83 @@
+"""
+进程内缓存工具
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """
+    线程安全的 LRU + TTL 缓存
+    - 超过 max_entries（或配置了 max_bytes 时总大小超过 max_bytes）时淘汰最久未使用的条目
+    - get() 不返回过期条目；get_with_age() 可读取过期条目（用于“先返回旧值、后台刷新”）
+    :param sizeof: 计算单个值大小（字节）的函数，配合 max_bytes 使用
+    """
+
+    def __init__(
+            self,
+            max_entries: int = 1000,
+            ttl: float = 3600,
+            max_bytes: Optional[int] = None,
+            sizeof: Optional[Callable[[Any], int]] = None
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof or (lambda value: 0)
+        self._data: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._sizes: Dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.total_bytes = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """读取未过期的缓存值（命中时刷新LRU顺序）"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or time.monotonic() - entry[1] > self.ttl:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def get_with_age(self, key: Hashable) -> Optional[Tuple[Any, float]]:
+        """读取缓存值及其已存在的秒数（不判断过期）"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            self._data.move_to_end(key)
+            return entry[0], time.monotonic() - entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        size = self._sizeof(value)
+        with self._lock:
+            self.total_bytes += size - self._sizes.get(key, 0)
+            self._sizes[key] = size
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries or (
+                    self.max_bytes is not None and self.total_bytes > self.max_bytes and len(self._data) > 1
+            ):
+                oldest, _ = self._data.popitem(last=False)
+                self.total_bytes -= self._sizes.pop(oldest, 0)
+                self.evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+            self.total_bytes -= self._sizes.pop(key, 0)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self.total_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
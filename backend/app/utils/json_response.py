@@ -0,0 +1,58 @@
+"""
+JSON序列化工具 - orjson 优先，未安装时回退标准库 json
+orjson 原生支持 datetime/date/UUID/dataclass，序列化大列表（如全文句子）比标准库快一个数量级。
+"""
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from pathlib import PurePath
+from typing import Any
+from uuid import UUID
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    """orjson/json 均不直接支持的类型"""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (PurePath, UUID)):
+        return str(obj)
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if isinstance(obj, bytes):
+        return obj.decode("utf-8", errors="replace")
+    if isinstance(obj, (datetime, date)):  # 仅标准库回退路径会走到这里
+        return obj.isoformat()
+    raise TypeError(f"无法序列化为JSON的类型：{type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """序列化为UTF-8 JSON字节（不转义中文，无多余空白）"""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        content, default=_default, ensure_ascii=False, separators=(",", ":"), allow_nan=False
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    全局默认响应类（main.py 中设置为 default_response_class）
+    注意：接口返回 dict 时 FastAPI 仍会先执行 jsonable_encoder；
+    大响应请直接 return FastJSONResponse(content=...)，跳过该步骤。
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,100 @@
+"""
+进程内指标注册表（计数器 / 仪表 / 直方图），由 /metrics 端点统一导出
+"""
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0)
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+    def snapshot(self) -> float:
+        return self.value
+
+
+class Histogram:
+    """累计分桶直方图（桶上界单位与观测值一致，通常为秒）"""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counts: List[int] = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self._counts[bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.sum += value
+            self.max = max(self.max, value)
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            cumulative, running = {}, 0
+            for bound, count in zip(self.buckets, self._counts):
+                running += count
+                cumulative[str(bound)] = running
+            cumulative["+Inf"] = self.count
+            return {
+                "count": self.count,
+                "sum": round(self.sum, 6),
+                "avg": round(self.sum / self.count, 6) if self.count else 0,
+                "max": round(self.max, 6),
+                "buckets": cumulative,
+            }
+
+
+class MetricsRegistry:
+    """
+    指标注册表：
+    - counter()/histogram() 同名返回同一实例，可在模块导入时创建
+    - gauge() 注册读取函数，导出时实时取值（如连接池当前借出数）
+    """
+
+    def __init__(self):
+        self._counters: Dict[str, Counter] = {}
+        self._histograms: Dict[str, Histogram] = {}
+        self._gauges: Dict[str, Callable[[], float]] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str) -> Counter:
+        with self._lock:
+            return self._counters.setdefault(name, Counter())
+
+    def histogram(self, name: str, buckets: Optional[Sequence[float]] = None) -> Histogram:
+        with self._lock:
+            if name not in self._histograms:
+                self._histograms[name] = Histogram(buckets or DEFAULT_BUCKETS)
+            return self._histograms[name]
+
+    def gauge(self, name: str, func: Callable[[], float]) -> None:
+        with self._lock:
+            self._gauges[name] = func
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = dict(self._histograms)
+            gauges = dict(self._gauges)
+        result: Dict[str, object] = {name: c.snapshot() for name, c in counters.items()}
+        result.update({name: h.snapshot() for name, h in histograms.items()})
+        for name, func in gauges.items():
+            try:
+                result[name] = func()
+            except Exception:
+                result[name] = None
+        return dict(sorted(result.items()))
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,94 @@
+"""
+句向量吞吐基准：固定补齐到 max_length（审查服务的写法）对比 按长度排序 + 动态补齐，
+以及磁盘缓存冷/热两种情况下重新向量化整个语料的耗时。
+
+运行（在 backend 目录）：python -m benchmarks.bench_embedding [--model 模型目录] [--texts 2000]
+未指定 --model 时使用随机初始化的小型 BERT（只比较补齐与缓存带来的差异，不代表真实模型的绝对速度）。
+"""
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import torch
+
+from app.services.embedding_service import BertEncoder, EmbeddingCache, EmbeddingService
+
+CLAUSES = [
+    "经营者不得滥用行政权力排除、限制竞争",
+    "对外地商品、服务实行歧视性价格",
+    "设置不合理或者歧视性的准入和退出条件",
+    "限定经营、购买、使用特定经营者提供的商品和服务",
+    "违法给予特定经营者优惠政策",
+    "排斥或者限制外地经营者参加本地招标投标活动",
+]
+
+
+def make_texts(n: int, seed: int = 0) -> list:
+    """长度分布偏斜的条款文本（大部分是短句，少量长段落）"""
+    rng = random.Random(seed)
+    texts = []
+    for i in range(n):
+        parts = rng.choices(CLAUSES, k=1 if rng.random() < 0.7 else rng.randint(3, 12))
+        texts.append(f"第{i}条 " + "，".join(parts) + "。")
+    return texts
+
+
+def tiny_bert():
+    from transformers import BertConfig, BertModel
+    config = BertConfig(vocab_size=21128, hidden_size=256, num_hidden_layers=4, num_attention_heads=4,
+                        intermediate_size=1024, max_position_embeddings=512)
+    return BertModel(config)
+
+
+def fixed_padding_seconds(encoder: BertEncoder, texts: list, batch_size: int) -> float:
+    """每批都补齐到 max_length、不按长度排序"""
+    model, tokenizer = encoder._load()
+    started = time.perf_counter()
+    for start in range(0, len(texts), batch_size):
+        encodings = tokenizer.encode_batch(texts[start:start + batch_size])
+        ids = np.zeros((len(encodings), encoder.max_length), dtype=np.int64)
+        mask = np.zeros_like(ids)
+        for row, e in enumerate(encodings):
+            ids[row, :len(e.ids)] = e.ids
+            mask[row, :len(e.ids)] = 1
+        with torch.inference_mode():
+            model(input_ids=torch.from_numpy(ids), attention_mask=torch.from_numpy(mask))
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default=None, help="transformers 格式的模型目录")
+    parser.add_argument("--texts", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--max-length", type=int, default=256)
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    model = None if args.model else tiny_bert()
+    encoder = BertEncoder(args.model, max_length=args.max_length, model=model)
+    texts = make_texts(args.texts)
+
+    fixed = fixed_padding_seconds(encoder, texts, args.batch_size)
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = EmbeddingCache(Path(tmp) / "cache.sqlite3")
+        service = EmbeddingService(encoder, "bench", args.batch_size, cache)
+        started = time.perf_counter()
+        service.embed(texts)
+        cold = time.perf_counter() - started
+        started = time.perf_counter()
+        service.embed(texts)
+        warm = time.perf_counter() - started
+        cache.close()
+
+    print(f"{args.texts} 条文本，batch_size={args.batch_size}，max_length={args.max_length}")
+    print(f"固定补齐：{fixed:.2f}s（{args.texts / fixed:.0f} 条/秒）")
+    print(f"动态补齐 + 缓存冷启动：{cold:.2f}s（{args.texts / cold:.0f} 条/秒）")
+    print(f"缓存命中（重启后重新向量化）：{warm:.3f}s（{args.texts / warm:.0f} 条/秒）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+响应序列化基准：原写法（Pydantic from_orm().dict() + jsonable_encoder + 标准库json）
+对比直接 row→dict + FastJSONResponse（orjson）。
+
+运行（在 backend 目录）：python -m benchmarks.bench_json [--sentences 5000] [--articles 100]
+不需要数据库：使用未持久化的ORM对象与内存中的句子字典。
+"""
+import argparse
+import json
+import timeit
+from datetime import datetime, timedelta
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.models import schemas, serializers
+from app.models.db_models import Article, ArticleReviewStats
+from app.utils.json_response import FastJSONResponse, orjson
+
+
+def full_content_payload(n: int) -> dict:
+    sentences = [
+        {
+            "content": f"第{i}条：经营者不得滥用行政权力排除、限制竞争，设置地方保护条款{i}。",
+            "paragraph_index": i // 8,
+            "start_pos": i * 40,
+            "end_pos": i * 40 + 38,
+            "id": i + 1,
+            "has_problem": i % 7 == 0,
+            "annotation_id": 7 if i % 7 == 0 else None,
+            "annotation_content": "设置地方保护" if i % 7 == 0 else "未标注",
+        }
+        for i in range(n)
+    ]
+    return {
+        "success": True,
+        "msg": "完整文档内容获取成功",
+        "data": {
+            "article_id": 1,
+            "article_name": "示例文件.docx",
+            "full_content": "\n".join(s["content"] for s in sentences),
+            "sentences": sentences,
+        },
+    }
+
+
+def articles(n: int) -> list:
+    base = datetime(2025, 1, 1)
+    result = []
+    for i in range(n):
+        article = Article(
+            id=i + 1, name=f"文档{i}.docx", original_path="o", annotated_path="a", status="已审查",
+            review_progress=100, risk_level="低风险", upload_time=base + timedelta(minutes=i), review_time=base
+        )
+        article.review_stats = ArticleReviewStats(
+            article_id=i + 1, total_sentences=200, reviewed_sentences=200, violation_count=3,
+            label_histogram={"7": 2, "9": 1}, review_duration_ms=1500
+        )
+        result.append(article)
+    return result
+
+
+def list_payload(rows: list, direct: bool) -> dict:
+    items = (
+        serializers.articles_to_dicts(rows) if direct
+        else [schemas.ArticleResponseSchema.from_orm(a).dict() for a in rows]
+    )
+    return {"success": True, "msg": "文档列表查询成功", "data": {"list": items, "pagination": {"total": len(rows)}}}
+
+
+def bench(label: str, func, number: int) -> float:
+    seconds = min(timeit.repeat(func, number=number, repeat=5)) / number
+    print(f"  {label:<48}{seconds * 1000:>10.3f} ms")
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sentences", type=int, default=5000)
+    parser.add_argument("--articles", type=int, default=100)
+    args = parser.parse_args()
+    print(f"orjson: {'已安装 ' + orjson.__version__ if orjson else '未安装（使用标准库回退）'}")
+
+    payload = full_content_payload(args.sentences)
+    print(f"\n全文内容（{args.sentences} 个句子，{len(json.dumps(payload, ensure_ascii=False)) // 1024} KB）")
+    old = bench("jsonable_encoder + JSONResponse", lambda: JSONResponse(jsonable_encoder(payload)), 5)
+    new = bench("FastJSONResponse", lambda: FastJSONResponse(payload), 5)
+    print(f"  加速 {old / new:.1f}x")
+
+    rows = articles(args.articles)
+    print(f"\n文档列表（{args.articles} 条）")
+    old = bench(
+        "from_orm().dict() + jsonable_encoder + JSONResponse",
+        lambda: JSONResponse(jsonable_encoder(list_payload(rows, direct=False))), 20
+    )
+    new = bench("row→dict + FastJSONResponse", lambda: FastJSONResponse(list_payload(rows, direct=True)), 20)
+    print(f"  加速 {old / new:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,14 +3,23 @@
 """
 import pytest
 import asyncio
+import torch
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
 from app.main import app
-from app.models.db_models import Base
-from app.config import get_settings
+from app.models.db_models import Base, ChatMessage, ChatSession
+from app.config import get_settings, settings
+from app.models.engine_factory import create_async_db_engine
+from app.services import review_service
+from app.services.answer_cache import answer_cache
+from app.services.chat_search_service import chat_search_index
+from app.services.llm_client import LLMConfig, llm_provider
 
 # 测试数据库URL
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
@@ -31,6 +40,20 @@ def event_loop():
     yield loop
     loop.close()
 
+@pytest.fixture(autouse=True)
+def clear_answer_cache():
+    """回答缓存/聊天检索索引是进程级单例，避免用例之间互相影响（每个用例重建数据库，ID会重复）"""
+    answer_cache.clear()
+    chat_search_index.clear()
+    yield
+    answer_cache.clear()
+    chat_search_index.clear()
+
+@pytest.fixture(autouse=True)
+def no_index_warmup(monkeypatch):
+    """TestClient 启动应用时不在后台构建全局检索索引（后台线程会与用例争用同一个单例）"""
+    monkeypatch.setattr(settings, "search_warm_on_startup", False)
+
 @pytest.fixture(scope="function")
 def db_session():
     """创建测试数据库会话"""
@@ -42,6 +65,102 @@ def db_session():
         session.close()
         Base.metadata.drop_all(bind=engine)
 
+@pytest.fixture
+def async_session_factory(tmp_path):
+    """独立文件数据库上的异步会话工厂（异步聊天链路使用）"""
+    url = f"sqlite:///{tmp_path / 'chat.db'}"
+    sync_engine = create_engine(url)
+    Base.metadata.create_all(bind=sync_engine)
+    async_engine = create_async_db_engine(url, name="test_async")
+    yield async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    asyncio.run(async_engine.dispose())
+    sync_engine.dispose()
+
+@pytest.fixture
+def configure_llm(monkeypatch):
+    """设置大模型接口配置；api_key 为空视为未配置（聊天记忆随之关闭）"""
+    def configure(api_key: str = "k"):
+        monkeypatch.setattr(llm_provider, "_config", LLMConfig(api_key=api_key, base_url="http://llm.test", model="m"))
+    return configure
+
+@pytest.fixture
+def llm_configured(configure_llm):
+    """已配置大模型接口（启用会话记忆/摘要）"""
+    configure_llm()
+
+class QueryRecorder:
+    """记录测试数据库上执行的SQL语句（用于查询计划/查询次数断言）"""
+
+    def __init__(self, bind):
+        self.bind = bind
+        self.statements = []
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append((statement, parameters))
+
+    @contextmanager
+    def record(self):
+        self.statements = []
+        event.listen(self.bind, "before_cursor_execute", self._on_execute)
+        try:
+            yield self
+        finally:
+            event.remove(self.bind, "before_cursor_execute", self._on_execute)
+
+    @property
+    def selects(self):
+        return [(s, p) for s, p in self.statements if s.lstrip().upper().startswith("SELECT")]
+
+@pytest.fixture
+def query_recorder():
+    """SQL 记录器"""
+    return QueryRecorder(engine)
+
+# 审查测试用的句子内容 → 模型输出标签（0=无问题）
+REVIEW_LABELS = {"合规一": 0, "地方保护一": 7, "地方保护二": 7, "限定交易": 9, "合规二": 0}
+
+
+class FakeTokenizer:
+    """按句子内容直接给出标签的分词器（输出只有一个token，即标签本身）"""
+
+    def __call__(self, text, **kwargs):
+        return {
+            "input_ids": torch.tensor([[REVIEW_LABELS[text]]]),
+            "attention_mask": torch.ones(1, 1, dtype=torch.long),
+        }
+
+
+class FakeModel:
+    def __call__(self, input_ids, attention_mask):
+        return input_ids[0][0]
+
+
+@pytest.fixture
+def fake_model(monkeypatch):
+    """替换审查模型：句子内容 → 固定标签，返回该映射"""
+    monkeypatch.setattr(review_service, "model", FakeModel())
+    monkeypatch.setattr(review_service, "tokenizer", FakeTokenizer())
+    monkeypatch.setattr(review_service, "device", torch.device("cpu"))
+    return REVIEW_LABELS
+
+@pytest.fixture
+def make_chat_session(db_session):
+    """创建带 count 条消息的会话（用户/助手交替，内容为 消息0..消息{count-1}），返回会话"""
+    def make(title, user_id=None, count=250, is_active=True):
+        session = ChatSession(title=title, user_id=user_id, is_active=is_active)
+        db_session.add(session)
+        db_session.flush()
+        base = datetime(2025, 1, 1)
+        # 每两条消息共用一个时间戳，验证 (created_at, id) 键集分页不丢不重
+        db_session.add_all([
+            ChatMessage(session_id=session.session_id, role="user" if k % 2 == 0 else "assistant",
+                        content=f"消息{k}", created_at=base + timedelta(seconds=k // 2))
+            for k in range(count)
+        ])
+        db_session.commit()
+        return session
+    return make
+
 @pytest.fixture(scope="function")
 def client(db_session):
     """创建测试客户端"""
@@ -0,0 +1,126 @@
+"""
+统计汇总表测试
+"""
+from datetime import date, datetime
+
+import pytest
+
+from app.models.db_models import Annotation, Article, LabelWeeklyRollup, ReviewMonthlyRollup, Sentence
+from app.services import analytics_service, review_service
+from app.services.article_delete_service import delete_articles
+
+
+def _snapshot(db):
+    db.expire_all()
+    weekly = {
+        (r.week_start, r.annotation_id): (r.violation_count, r.article_count)
+        for r in db.query(LabelWeeklyRollup) if r.article_count
+    }
+    monthly = {
+        (r.month_start, r.risk_level): (r.article_count, r.sentence_count, r.violation_count, r.timed_article_count)
+        for r in db.query(ReviewMonthlyRollup) if r.article_count
+    }
+    return weekly, monthly
+
+
+@pytest.fixture
+def reviewed(db_session, fake_model):
+    db_session.add_all([Annotation(id=7, content="设置地方保护"), Annotation(id=9, content="限定交易")])
+    for contents in (list(fake_model), ["合规一", "限定交易"], []):
+        article = Article(name=f"{len(contents)}.docx", original_path="o", annotated_path="a", status="审查中")
+        db_session.add(article)
+        db_session.flush()
+        db_session.add_all([Sentence(content=c, article_id=article.id) for c in contents])
+        db_session.commit()
+        review_service.start_review_task(article.id, db_session)
+    return db_session
+
+
+class TestAnalytics:
+    """汇总表增量更新与回填"""
+
+    def test_incremental_matches_rebuild(self, reviewed):
+        # 重新审查不重复计数
+        first = reviewed.query(Article).order_by(Article.id).first()
+        review_service.start_review_task(first.id, reviewed)
+
+        weekly, monthly = _snapshot(reviewed)
+        week = analytics_service.week_start(datetime.utcnow())
+        assert weekly == {(week, 7): (2, 1), (week, 9): (2, 2)}
+        assert sum(v[0] for v in monthly.values()) == 3
+        assert sum(v[1] for v in monthly.values()) == 7
+
+        result = analytics_service.rebuild_rollups(reviewed, chunk_size=2)
+        assert result["articles"] == 3
+        assert _snapshot(reviewed) == (weekly, monthly)
+
+    def test_delete_removes_from_rollups(self, reviewed):
+        # 上传 → 审查 → 删除后，增量汇总与重建结果一致（含缺少物化统计的历史文档）
+        legacy = Article(
+            name="旧.docx", original_path="o", annotated_path="a",
+            status="已审查", risk_level="高风险", review_time=datetime(2024, 3, 14)
+        )
+        reviewed.add(legacy)
+        reviewed.flush()
+        reviewed.add(Sentence(content="a", article_id=legacy.id, has_problem=True, annotation_id=7))
+        reviewed.commit()
+        legacy_id = legacy.id
+        analytics_service.rebuild_rollups(reviewed)
+
+        first, second = [a.id for a in reviewed.query(Article.id).order_by(Article.id).limit(2)]
+        delete_articles(reviewed, [first, legacy_id])
+        after_delete = _snapshot(reviewed)
+        assert sum(v[0] for v in after_delete[1].values()) == 2
+
+        analytics_service.rebuild_rollups(reviewed)
+        assert _snapshot(reviewed) == after_delete
+
+        delete_articles(reviewed, [second])
+        after_delete = _snapshot(reviewed)
+        analytics_service.rebuild_rollups(reviewed)
+        assert _snapshot(reviewed) == after_delete
+
+    def test_failed_rereview_removes_previous_review(self, reviewed, monkeypatch):
+        # 重新审查失败后文档回到待审查，增量汇总与重建结果一致；之后再次审查成功只计入一次
+        first_id = reviewed.query(Article.id).order_by(Article.id).first()[0]
+        model = review_service.model
+        monkeypatch.setattr(review_service, "model", None)
+        review_service.start_review_task(first_id, reviewed)
+
+        article = reviewed.get(Article, first_id)
+        assert (article.status, article.review_time) == ("待审查", None)
+        after_failure = _snapshot(reviewed)
+        assert sum(v[0] for v in after_failure[1].values()) == 2
+        analytics_service.rebuild_rollups(reviewed)
+        assert _snapshot(reviewed) == after_failure
+
+        monkeypatch.setattr(review_service, "model", model)
+        review_service.start_review_task(first_id, reviewed)
+        after_review = _snapshot(reviewed)
+        assert sum(v[0] for v in after_review[1].values()) == 3
+        analytics_service.rebuild_rollups(reviewed)
+        assert _snapshot(reviewed) == after_review
+
+    def test_backfill_without_materialized_stats(self, db_session):
+        """历史文档缺少审查统计时从句子表聚合"""
+        article = Article(
+            name="旧.docx", original_path="o", annotated_path="a",
+            status="已审查", risk_level="高风险", review_time=datetime(2024, 3, 14)
+        )
+        db_session.add(article)
+        db_session.flush()
+        db_session.add_all([
+            Sentence(content="a", article_id=article.id, has_problem=True, annotation_id=7),
+            Sentence(content="b", article_id=article.id, has_problem=False),
+        ])
+        db_session.commit()
+
+        analytics_service.rebuild_rollups(db_session)
+
+        assert analytics_service.label_weekly_trend(db_session) == [{
+            "week_start": "2024-03-11", "annotation_id": 7, "violation_count": 1, "article_count": 1
+        }]
+        assert analytics_service.risk_monthly_distribution(db_session, start=date(2024, 3, 20)) == [{
+            "month_start": "2024-03-01", "total": 1, "risk_levels": {"高风险": 1}
+        }]
+        assert analytics_service.review_time_monthly(db_session)[0]["avg_review_ms"] is None
@@ -0,0 +1,79 @@
+"""
+常见问题回答缓存测试
+"""
+import asyncio
+
+import pytest
+
+from app.models.schemas import ChatRequest
+from app.services.answer_cache import AnswerCache, answer_cache, normalize_question
+from app.services.async_chat_service import AsyncChatService
+from app.services.context_builder import context_builder
+from app.services.volcengine_service import volcengine_service
+
+ANSWER = "根据《劳动合同法》第四十七条，经济补偿按劳动者在本单位工作的年限，每满一年支付一个月工资。"
+
+
+@pytest.fixture
+def llm_calls(configure_llm, monkeypatch):
+    # 不配置API Key：关闭记忆，提示中不含会话上下文
+    configure_llm("")
+    calls = []
+
+    async def stream_deltas(messages, temperature=0.7):
+        calls.append(messages)
+        for start in range(0, len(ANSWER), 10):
+            yield ANSWER[start:start + 10]
+
+    monkeypatch.setattr(volcengine_service, "stream_deltas", stream_deltas)
+    return calls
+
+
+def collect(factory, request):
+    async def _run():
+        async with factory() as db:
+            return [chunk async for chunk in AsyncChatService(db).send_message_stream(request)]
+    return asyncio.run(_run())
+
+
+class TestAnswerCache:
+    """规范化问题命中缓存，会话相关提问与显式关闭时跳过"""
+
+    def test_normalize_question(self):
+        assert normalize_question("  经济补偿 怎么算？") == normalize_question("经济补偿怎么算?")
+        assert normalize_question("ＡＢＣ！") == "abc"
+
+    def test_key_bypass_and_metrics(self):
+        cache = AnswerCache(max_entries=10, ttl=60)
+        builder = context_builder
+        prompt = builder.build("经济补偿怎么算？")
+        key = cache.key_for("经济补偿怎么算？", prompt, "m")
+        assert key == cache.key_for("经济补偿 怎么算?", prompt, "m")
+        assert key != cache.key_for("经济补偿怎么算？", prompt, "other-model")
+        assert key != cache.key_for("经济补偿怎么算？", builder.build("经济补偿怎么算？", facts="参考资料"), "m")
+
+        assert cache.key_for("经济补偿怎么算？", prompt, "m", use_cache=False) is None
+        in_session = builder.build("那怎么算？", history=[("user", "我被辞退了"), ("assistant", "请说明情况")])
+        assert cache.key_for("那怎么算？", in_session, "m") is None
+        with_summary = builder.build("那怎么算？", summary="用户被辞退")
+        assert cache.key_for("那怎么算？", with_summary, "m") is None
+
+        assert cache.get(key) is None
+        cache.put(key, ANSWER, generation_seconds=2.5)
+        saved = cache._saved.value
+        assert cache.get(key) == ANSWER
+        assert cache._saved.value == saved + 2.5
+        assert "".join(cache.replay(ANSWER)) == ANSWER
+
+    def test_stream_replays_cached_answer(self, async_session_factory, llm_calls):
+        first = collect(async_session_factory, ChatRequest(message="经济补偿怎么算？"))
+        second = collect(async_session_factory, ChatRequest(message="经济补偿 怎么算?"))
+
+        assert len(llm_calls) == 1
+        assert "".join(c["content"] for c in second) == ANSWER
+        assert set(second[0]) == set(first[0]) == {"content", "session_id", "message_id"}
+        assert second[0]["session_id"] != first[0]["session_id"]
+        assert answer_cache.hit_ratio() is not None
+
+        collect(async_session_factory, ChatRequest(message="经济补偿怎么算？", use_cache=False))
+        assert len(llm_calls) == 2
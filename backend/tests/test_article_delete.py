@@ -0,0 +1,59 @@
+"""
+文档删除测试
+"""
+import pytest
+
+from app.models.db_models import Article, ArticleReviewStats, Sentence
+from app.services import article_delete_service
+from app.services.article_delete_service import delete_articles
+from app.services.file_janitor import FileJanitor, file_janitor
+from app.services.search_service import SearchIndex
+
+
+@pytest.fixture
+def articles(db_session, tmp_path):
+    created = []
+    for i in range(3):
+        original, annotated = tmp_path / f"{i}.docx", tmp_path / f"{i}_a.docx"
+        original.write_bytes(b"o")
+        annotated.write_bytes(b"a")
+        article = Article(name=f"删除{i}.docx", original_path=str(original), annotated_path=str(annotated))
+        db_session.add(article)
+        db_session.flush()
+        db_session.add_all([Sentence(content=f"第{i}篇句子{j}", article_id=article.id) for j in range(25)])
+        db_session.add(ArticleReviewStats(article_id=article.id, total_sentences=25))
+        created.append(article)
+    db_session.commit()
+    return created
+
+
+class TestArticleDelete:
+    """集合式删除"""
+
+    def test_chunked_delete_and_file_cleanup(self, db_session, articles, tmp_path, monkeypatch):
+        keep = articles[2]
+        search_index = SearchIndex(n=2)
+        monkeypatch.setattr(article_delete_service, "search_index", search_index)
+        search_index.sync(db_session)
+        ids = [articles[0].id, articles[1].id, 99999]
+
+        deleted, missing = delete_articles(db_session, ids, chunk_size=10)
+
+        assert deleted == ids[:2] and missing == [99999]
+        assert db_session.query(Article.id).all() == [(keep.id,)]
+        assert db_session.query(Sentence).count() == 25
+        assert db_session.query(ArticleReviewStats).count() == 1
+        assert file_janitor.join()
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["2.docx", "2_a.docx"]
+        assert [r["article_id"] for r in search_index.search_sentences(db_session, "篇句子")] == [keep.id] * 25
+
+    def test_nothing_to_delete(self, db_session):
+        assert delete_articles(db_session, [1, 2]) == ([], [1, 2])
+
+    def test_janitor_logs_retries_and_final_failure(self, tmp_path, caplog):
+        janitor = FileJanitor(max_retries=2, retry_delay=0.01)
+        janitor.schedule([str(tmp_path)])  # 目录无法 unlink，每次都失败
+        assert janitor.join()
+        records = [r for r in caplog.records if r.name == "app.services.file_janitor"]
+        assert [r.levelname for r in records] == ["WARNING", "ERROR"]
+        assert records[-1].exc_info is not None and janitor.failed == 1
@@ -0,0 +1,84 @@
+"""
+文档列表游标分页与总数缓存测试
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.db_models import Article
+from app.services.article_list_service import ArticleCountCache, decode_cursor, fetch_article_page
+
+
+@pytest.fixture
+def articles(db_session):
+    base = datetime(2025, 1, 1)
+    rows = []
+    for i in range(23):
+        # 每3篇共用同一上传时间，验证 (upload_time, id) 组合游标不会漏/重
+        rows.append(Article(
+            name=f"doc_{i}.docx", original_path="o", annotated_path="a",
+            upload_time=base + timedelta(minutes=i // 3)
+        ))
+    db_session.add_all(rows)
+    db_session.commit()
+    return rows
+
+
+class TestKeysetPagination:
+    """游标分页测试"""
+
+    def test_walks_all_pages_in_order(self, db_session, articles):
+        seen = []
+        cursor = None
+        while True:
+            page, cursor = fetch_article_page(db_session, page_size=5, cursor=cursor)
+            seen.extend(page)
+            if cursor is None:
+                break
+
+        expected = sorted(articles, key=lambda a: (a.upload_time, a.id), reverse=True)
+        assert [a.id for a in seen] == [a.id for a in expected]
+
+    def test_cursor_matches_offset_page(self, db_session, articles):
+        first, cursor = fetch_article_page(db_session, page_size=7)
+        by_cursor, _ = fetch_article_page(db_session, page_size=7, cursor=cursor)
+        by_offset, _ = fetch_article_page(db_session, page_size=7, page=2)
+        assert [a.id for a in by_cursor] == [a.id for a in by_offset]
+
+    def test_keyword_and_last_page(self, db_session, articles):
+        page, cursor = fetch_article_page(db_session, page_size=10, keyword="doc_1")
+        # doc_1, doc_10 ~ doc_19
+        assert len(page) == 10
+        page, cursor = fetch_article_page(db_session, page_size=10, keyword="doc_1", cursor=cursor)
+        assert len(page) == 1 and cursor is None
+
+    def test_invalid_cursor(self):
+        with pytest.raises(ValueError):
+            decode_cursor("not-a-cursor")
+
+
+class TestArticleCountCache:
+    """总数缓存测试"""
+
+    def test_returns_cached_total_until_refreshed(self, db_session, articles):
+        cache = ArticleCountCache(ttl=60, session_factory=lambda: db_session)
+        assert cache.get(db_session) == 23
+
+        db_session.add(Article(name="new.docx", original_path="o", annotated_path="a"))
+        db_session.commit()
+        cache._refresh_async = lambda keyword: None  # 不启动后台线程，手动刷新
+        cache.invalidate()
+        assert cache.get(db_session) == 23
+
+        cache._refresh(None)
+        assert cache.get(db_session) == 24
+
+    def test_refresh_failure_is_logged(self, db_session, articles, caplog):
+        cache = ArticleCountCache(ttl=60, session_factory=lambda: db_session)
+        assert cache.get(db_session) == 23
+
+        cache._count = lambda db, keyword: 1 / 0
+        cache._refresh(None)
+        record = next(r for r in caplog.records if r.name == "app.services.article_list_service")
+        assert record.levelname == "ERROR" and record.exc_info[0] is ZeroDivisionError
+        assert cache.get(db_session) == 23
@@ -0,0 +1,139 @@
+"""
+异步聊天链路测试
+"""
+import asyncio
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from app.api.endpoints import chat
+from app.main import app
+from app.models.db_models import ChatMessage, ChatSession
+from app.models.engine_factory import LazyAsyncSessionFactory, to_async_url
+from app.models.schemas import ChatRequest
+from app.services.async_chat_service import AsyncChatService
+from app.services.llm_client import llm_provider
+from app.services.volcengine_service import volcengine_service
+
+
+@pytest.fixture
+def llm_config(configure_llm):
+    # 不配置API Key：关闭记忆（避免后台线程访问真实数据库）
+    configure_llm("")
+
+
+def fake_stream(tokens, delay=0.01):
+    async def stream_deltas(messages, temperature=0.7):
+        for token in tokens:
+            await asyncio.sleep(delay)
+            yield token
+    return stream_deltas
+
+
+def messages_in(factory):
+    async def _load():
+        async with factory() as db:
+            rows = (await db.execute(
+                ChatMessage.__table__.select().order_by(ChatMessage.id)
+            )).all()
+            return [(r.role, r.content) for r in rows]
+    return asyncio.run(_load())
+
+
+class TestAsyncChat:
+    """流式回复边生成边产出，事件循环不被阻塞"""
+
+    def test_to_async_url(self):
+        assert to_async_url("mysql+pymysql://u:p@h:3306/db?charset=utf8mb4") == \
+            "mysql+aiomysql://u:p@h:3306/db?charset=utf8mb4"
+        assert to_async_url("sqlite:///./fair.db") == "sqlite+aiosqlite:///./fair.db"
+
+    def test_async_engine_created_on_first_use(self):
+        factory = LazyAsyncSessionFactory("oracle://u:p@h/db")  # 无异步驱动：创建时不报错
+        with pytest.raises(ValueError):
+            factory()
+
+    def test_stream_saves_messages_without_blocking_loop(self, async_session_factory, llm_config, monkeypatch):
+        monkeypatch.setattr(volcengine_service, "stream_deltas", fake_stream(["你", "好", "！"]))
+
+        async def scenario():
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.001)
+                    ticks += 1
+
+            task = asyncio.create_task(ticker())
+            chunks = []
+            async with async_session_factory() as db:
+                async for chunk in AsyncChatService(db).send_message_stream(ChatRequest(message="hi")):
+                    chunks.append(chunk)
+            task.cancel()
+            return chunks, ticks
+
+        chunks, ticks = asyncio.run(scenario())
+        assert [c["content"] for c in chunks] == ["你", "好", "！"]
+        assert len({c["session_id"] for c in chunks}) == 1
+        # 等待模型输出期间其他协程仍在运行
+        assert ticks > 5
+        assert messages_in(async_session_factory) == [("user", "hi"), ("assistant", "你好！")]
+
+    def test_send_message(self, async_session_factory, llm_config, monkeypatch):
+        async def completion(messages, temperature=0.7, stream=False):
+            assert messages[0]["role"] == "system"
+            assert messages[-1] == {"role": "user", "content": "hello"}
+            return {"choices": [{"message": {"role": "assistant", "content": " world "}}]}
+
+        monkeypatch.setattr(volcengine_service, "chat_completion", completion)
+
+        async def scenario():
+            async with async_session_factory() as db:
+                response = await AsyncChatService(db).send_message(ChatRequest(message="hello"))
+                count = (await db.execute(select(ChatSession.message_count))).scalar_one()
+                return response, count
+
+        response, message_count = asyncio.run(scenario())
+        assert response.success and response.message == "world"
+        assert message_count == 2
+        assert messages_in(async_session_factory) == [("user", "hello"), ("assistant", "world")]
+
+    def test_sse_endpoint(self, async_session_factory, llm_config, monkeypatch):
+        monkeypatch.setattr(volcengine_service, "stream_deltas", fake_stream(["a", "b"], delay=0))
+        monkeypatch.setattr(chat, "AsyncSessionLocal", async_session_factory)
+
+        with TestClient(app) as client:
+            response = client.post("/api/chat/stream", json={"message": "hi"})
+
+        frames = [f for f in response.text.split("\n\n") if f]
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert frames[-1] == "data: [DONE]"
+        assert '"content": "a"' in frames[0] and '"content": "b"' in frames[1]
+
+    def test_stream_deltas_parses_sse(self, llm_configured, monkeypatch):
+        body = (
+            'data: {"choices":[{"delta":{"content":"你"}}]}\n\n'
+            'data: {"choices":[{"delta":{}}]}\n\n'
+            'data: {"choices":[{"delta":{"content":"好"}}]}\n\n'
+            'data: [DONE]\n\n'
+        )
+
+        def handler(request):
+            assert request.url.path == "/chat/completions"
+            return httpx.Response(200, text=body, headers={"content-type": "text/event-stream"})
+
+        monkeypatch.setattr(
+            llm_provider, "_create_async_http_client",
+            lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        )
+
+        async def collect():
+            try:
+                return [d async for d in volcengine_service.stream_deltas([{"role": "user", "content": "x"}])]
+            finally:
+                await llm_provider.aclose()
+
+        assert asyncio.run(collect()) == ["你", "好"]
@@ -0,0 +1,89 @@
+"""
+批量上传服务测试
+"""
+import io
+import json
+import zipfile
+
+import pytest
+from docx import Document
+from fastapi import BackgroundTasks, UploadFile
+
+from app.api.endpoints.files import upload_files_batch
+from app.config import settings
+from app.models.db_models import Article, Sentence
+from app.services.bulk_upload_service import bulk_upload
+
+
+def _docx_bytes(*paragraphs: str) -> bytes:
+    doc = Document()
+    for text in paragraphs:
+        doc.add_paragraph(text)
+    buf = io.BytesIO()
+    doc.save(buf)
+    return buf.getvalue()
+
+
+def _upload(name: str, data: bytes) -> UploadFile:
+    return UploadFile(file=io.BytesIO(data), filename=name)
+
+
+@pytest.fixture
+def upload_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "upload_dir", str(tmp_path))
+    return tmp_path
+
+
+class TestBulkUpload:
+    """批量上传测试"""
+
+    def test_multiple_files_and_zip(self, db_session, upload_dir):
+        """多文件与zip成员一起入库，句子批量写入"""
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, "w") as zf:
+            zf.writestr("nested/b.docx", _docx_bytes("第一句。第二句！"))
+            zf.writestr("c.docx", _docx_bytes("第三句。"))
+        files = [
+            _upload("a.docx", _docx_bytes("甲条款。乙条款？")),
+            _upload("batch.zip", archive.getvalue()),
+        ]
+
+        items = bulk_upload(db_session, files, max_file_size=1024 * 1024)
+
+        assert [item.filename for item in items] == ["a.docx", "b.docx", "c.docx"]
+        assert all(item.article is not None for item in items)
+        assert db_session.query(Article).count() == 3
+        assert db_session.query(Sentence).count() == 5
+        b_article = next(item.article for item in items if item.filename == "b.docx")
+        contents = [s.content for s in db_session.query(Sentence).filter(Sentence.article_id == b_article.id)]
+        assert contents == ["第一句", "第二句"]
+
+    def test_per_file_errors_do_not_abort_batch(self, db_session, upload_dir):
+        """类型错误、重名、超大文件逐个报告，其余文件正常入库"""
+        db_session.add(Article(name="dup.docx", original_path="x", annotated_path="y"))
+        db_session.commit()
+        files = [
+            _upload("ok.docx", _docx_bytes("正常。")),
+            _upload("dup.docx", _docx_bytes("重名。")),
+            _upload("bad.exe", b"MZ"),
+            _upload("big.docx", b"0" * (200 * 1024)),
+        ]
+
+        items = bulk_upload(db_session, files, max_file_size=100 * 1024)
+        results = {item.filename: item.to_result() for item in items}
+
+        assert results["ok.docx"]["success"] is True
+        assert results["dup.docx"]["error"] == "同名文档已存在"
+        assert "不支持的文件类型" in results["bad.exe"]["error"]
+        assert "文件过大" in results["big.docx"]["error"]
+        # 失败文件不在存储目录残留
+        assert len(list(upload_dir.iterdir())) == 2
+
+    def test_endpoint_response(self, db_session, upload_dir):
+        """接口与其他文档接口一样用 FastJSONResponse 序列化结果"""
+        files = [_upload("a.docx", _docx_bytes("第一句。")), _upload("bad.exe", b"MZ")]
+        response = upload_files_batch(BackgroundTasks(), files=files, enqueue_review=False, db=db_session)
+        assert response.media_type == "application/json"
+        body = json.loads(response.body)
+        assert (body["data"]["succeeded"], body["data"]["failed"]) == (1, 1)
+        assert body["data"]["results"][0]["data"]["name"] == "a.docx"
@@ -0,0 +1,86 @@
+"""
+会话流式导出测试
+"""
+import io
+import json
+import zipfile
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.endpoints.chat import export_conversation, export_user_conversations
+from app.config import settings
+from app.services.chat_export_service import iter_export, stream_conversation, stream_user_archive
+from app.services.chat_service import ChatService
+
+
+@pytest.fixture
+def small_batches(monkeypatch):
+    monkeypatch.setattr(settings, "chat_export_batch_size", 100)
+
+
+class TestChatExport:
+    """分批读取、逐段写出，不限消息条数"""
+
+    def test_json_has_every_message_in_order(self, db_session, make_chat_session, small_batches, query_recorder):
+        session = make_chat_session("长会话", "u1", 250)
+        db_session.refresh(session)
+        with query_recorder.record():
+            chunks = list(iter_export(db_session, session, "json"))
+        data = json.loads("".join(chunks))
+        assert data["session"]["title"] == "长会话"
+        assert [m["content"] for m in data["messages"]] == [f"消息{k}" for k in range(250)]
+        # 3 批消息 = 3 条查询，分 3 段写出（另有开头与结尾）
+        assert len(query_recorder.selects) == 3
+        assert len(chunks) == 5
+
+    def test_ndjson_and_txt(self, db_session, make_chat_session, small_batches):
+        session = make_chat_session("会话", "u1", 120)
+        lines = "".join(iter_export(db_session, session, "ndjson")).splitlines()
+        records = [json.loads(line) for line in lines]
+        assert records[0]["type"] == "session" and records[0]["id"] == session.session_id
+        assert [r["content"] for r in records[1:]] == [f"消息{k}" for k in range(120)]
+
+        text = "".join(iter_export(db_session, session, "txt"))
+        assert text.startswith("会话: 会话\n") and "[用户] 2025-01-01 00:00:00\n消息0\n" in text
+        assert "消息119" in text
+
+        with pytest.raises(ValueError):
+            list(iter_export(db_session, session, "pdf"))
+
+    def test_service_export_not_capped(self, db_session, make_chat_session, small_batches):
+        session = make_chat_session("会话", None, 150)
+        data = json.loads(ChatService(db_session).export_conversation(session.session_id))
+        assert len(data["messages"]) == 150
+
+    def test_stream_conversation_uses_own_session(self, db_session, make_chat_session):
+        session = make_chat_session("会话", "u1", 3)
+        body = b"".join(stream_conversation(db_session.get_bind(), session.session_id, "ndjson"))
+        assert len(body.decode("utf-8").splitlines()) == 4
+
+    def test_user_archive(self, db_session, make_chat_session, small_batches):
+        first = make_chat_session("一", "u1", 130)
+        second = make_chat_session("二", "u1", 2)
+        make_chat_session("已删除", "u1", 2, is_active=False)
+        make_chat_session("别人的", "u2", 2)
+
+        body = b"".join(stream_user_archive(db_session.get_bind(), "u1", "json", batch_size=1))
+        with zipfile.ZipFile(io.BytesIO(body)) as archive:
+            assert archive.namelist() == [
+                f"conversation_{first.session_id}.json", f"conversation_{second.session_id}.json"
+            ]
+            data = json.loads(archive.read(f"conversation_{first.session_id}.json"))
+            # 条目按 ZIP64 写出，单个会话超过 4GB 也不会失败
+            assert all(info.extract_version >= zipfile.ZIP64_VERSION for info in archive.infolist())
+        assert len(data["messages"]) == 130
+
+    def test_endpoints(self, db_session, make_chat_session):
+        session = make_chat_session("会话", "u1", 2)
+        response = export_conversation(session.session_id, format="txt", db=db_session)
+        assert response.media_type.startswith("text/plain")
+        assert response.headers["content-disposition"].endswith(f"conversation_{session.session_id}.txt")
+        with pytest.raises(HTTPException):
+            export_conversation("missing", format="json", db=db_session)
+
+        response = export_user_conversations(user_id="u1", format="ndjson", db=db_session)
+        assert response.media_type == "application/zip"
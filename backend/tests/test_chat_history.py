@@ -0,0 +1,81 @@
+"""
+会话消息游标分页测试
+"""
+import asyncio
+import json
+
+import pytest
+from fastapi import HTTPException, Response
+from fastapi.middleware.cors import CORSMiddleware
+
+from app.api.endpoints.chat import get_conversation_messages, get_conversations
+from app.main import app
+from app.models.schemas import ChatMessageCreate, ChatSessionCreate
+from app.services.chat_service import ChatService
+
+
+@pytest.fixture
+def long_session(make_chat_session):
+    return make_chat_session("长会话").session_id
+
+
+class TestChatHistoryPaging:
+    """从最新消息往前翻页"""
+
+    def test_latest_first_then_older_pages(self, db_session, long_session):
+        service = ChatService(db_session)
+        messages, cursor = service.get_message_page(long_session, limit=100)
+        assert [m.content for m in messages] == [f"消息{k}" for k in range(150, 250)]
+
+        seen = [m.content for m in messages]
+        while cursor:
+            messages, cursor = service.get_message_page(long_session, limit=100, before=cursor)
+            seen = [m.content for m in messages] + seen
+        assert seen == [f"消息{k}" for k in range(250)]
+
+        assert [m.content for m in service.get_session_messages(long_session, limit=2)] == ["消息248", "消息249"]
+        assert service.get_message_page("missing") == ([], None)
+
+    def test_endpoint_next_cursor_header(self, db_session, long_session):
+        response = Response()
+        first = get_conversation_messages(long_session, response, limit=200, before=None, db=db_session)
+        assert first[0].content == "消息50"
+        cursor = response.headers["X-Next-Cursor"]
+
+        response = Response()
+        older = get_conversation_messages(long_session, response, limit=200, before=cursor, db=db_session)
+        assert [m.content for m in older] == [f"消息{k}" for k in range(50)]
+        assert "X-Next-Cursor" not in response.headers
+
+        with pytest.raises(HTTPException):
+            get_conversation_messages(long_session, Response(), limit=10, before="bad", db=db_session)
+
+    def test_cursor_header_exposed_to_cors(self):
+        # 跨域请求时浏览器只允许前端读取显式暴露的响应头
+        cors = next(m for m in app.user_middleware if m.cls is CORSMiddleware)
+        assert "X-Next-Cursor" in cors.kwargs["expose_headers"]
+
+
+class TestMessageCount:
+    """会话列表的消息数来自计数列，查询次数与会话数无关"""
+
+    def _list_selects(self, db, query_recorder, limit):
+        with query_recorder.record():
+            response = asyncio.run(get_conversations(user_id="u1", limit=limit, db=db))
+        return response, len(query_recorder.selects)
+
+    def test_counter_maintained_and_listing_constant(self, db_session, query_recorder):
+        service = ChatService(db_session)
+        sessions = [service.create_session(ChatSessionCreate(title=f"会话{i}"), "u1").session_id for i in range(12)]
+        for i, session_id in enumerate(sessions):
+            for k in range(i % 3 + 1):
+                service.create_message(ChatMessageCreate(session_id=session_id, role="user", content=f"消息{k}"))
+
+        assert service.get_message_count(sessions[2]) == 3
+        db_session.expire_all()
+        response, few = self._list_selects(db_session, query_recorder, limit=2)
+        db_session.expire_all()
+        response, many = self._list_selects(db_session, query_recorder, limit=12)
+        assert few == many == 1
+        counts = {item["session_id"]: item["message_count"] for item in json.loads(response.body)}
+        assert counts == {session_id: i % 3 + 1 for i, session_id in enumerate(sessions)}
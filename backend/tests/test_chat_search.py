@@ -0,0 +1,99 @@
+"""
+聊天消息全文检索测试
+"""
+import json
+
+import pytest
+
+from app.api.endpoints.chat import search_conversations
+from app.models.db_models import ChatMessage, ChatSession
+from app.models.schemas import ChatMessageCreate
+from app.services.chat_search_service import chat_search_index, make_snippet
+from app.services.chat_service import ChatService
+
+
+@pytest.fixture
+def sessions(db_session):
+    rent = ChatSession(title="租房纠纷", user_id="u1")
+    labor = ChatSession(title="劳动合同", user_id="u1")
+    other = ChatSession(title="别人的会话", user_id="u2")
+    db_session.add_all([rent, labor, other])
+    db_session.flush()
+    db_session.add_all([
+        ChatMessage(session_id=rent.session_id, role="user", content="房东不退押金怎么办？"),
+        ChatMessage(session_id=rent.session_id, role="assistant", content="正常损耗不应从押金中扣除，建议保留证据。"),
+        ChatMessage(session_id=labor.session_id, role="user", content="公司扣了我一个月工资作为押金，合法吗？"),
+        ChatMessage(session_id=other.session_id, role="user", content="押金的问题"),
+    ])
+    db_session.commit()
+    return rent, labor, other
+
+
+class TestChatSearch:
+    """按消息内容检索会话：按用户隔离、命中多的在前、附带片段、增量维护"""
+
+    def test_ranked_by_matches_with_snippets(self, db_session, sessions):
+        rent, labor, _ = sessions
+        results = ChatService(db_session).search_conversations("押金", user_id="u1")
+        assert [r["session_id"] for r in results] == [rent.session_id, labor.session_id]
+        assert results[0]["matches"] == 2 and results[0]["message_count"] == 0
+        # 片段按最新命中在前
+        assert [s["role"] for s in results[0]["snippets"]] == ["assistant", "user"]
+        assert all("押金" in s["snippet"] for s in results[0]["snippets"])
+
+    def test_scoped_by_user_and_excludes_deleted(self, db_session, sessions):
+        rent, labor, other = sessions
+        service = ChatService(db_session)
+        assert [r["session_id"] for r in service.search_conversations("押金", user_id="u2")] == [other.session_id]
+        assert service.search_conversations("押金", user_id="nobody") == []
+
+        service.delete_session(rent.session_id)
+        assert [r["session_id"] for r in service.search_conversations("押金", user_id="u1")] == [labor.session_id]
+
+    def test_title_matches_still_found(self, db_session, sessions):
+        rent, labor, _ = sessions
+        results = ChatService(db_session).search_conversations("劳动", user_id="u1")
+        assert [r["session_id"] for r in results] == [labor.session_id]
+        assert results[0]["matches"] == 1 and results[0]["snippets"] == []
+
+    def test_incremental_insert(self, db_session, sessions):
+        rent, labor, _ = sessions
+        service = ChatService(db_session)
+        assert service.search_conversations("仲裁", user_id="u1") == []
+        assert chat_search_index.built
+
+        message = service.create_message(ChatMessageCreate(
+            session_id=labor.session_id, role="assistant", content="可以申请劳动仲裁要求返还。"
+        ))
+        assert chat_search_index.messages.contains(message.id)
+        results = service.search_conversations("仲裁", user_id="u1")
+        assert [r["session_id"] for r in results] == [labor.session_id]
+        assert results[0]["snippets"][0]["message_id"] == message.id
+
+    def test_falls_back_to_database_while_warming(self, db_session, sessions):
+        rent, labor, _ = sessions
+        chat_search_index._warming = True
+        try:
+            results = ChatService(db_session).search_conversations("押金", user_id="u1")
+            assert [r["session_id"] for r in results] == [rent.session_id, labor.session_id]
+            assert results[0]["matches"] == 2 and len(results[0]["snippets"]) == 2
+            assert ChatService(db_session).search_conversations("押", user_id="u1") == []
+            assert not chat_search_index.built and chat_search_index.messages.doc_count == 0
+        finally:
+            chat_search_index._warming = False
+
+        thread = chat_search_index.warm_in_background(lambda: db_session, "test")
+        thread.join(5)
+        assert chat_search_index.built and chat_search_index.messages.doc_count == 4
+        assert not chat_search_index._warming
+
+    def test_endpoint(self, db_session, sessions):
+        response = search_conversations(q="押金", user_id="u1", limit=1, db=db_session)
+        body = json.loads(response.body)
+        assert len(body) == 1 and body[0]["title"] == "租房纠纷"
+
+    def test_make_snippet(self):
+        text = "甲" * 50 + "押金" + "乙" * 50
+        snippet = make_snippet(text, "押金", context=5)
+        assert snippet == "…甲甲甲甲甲押金乙乙乙乙乙…"
+        assert make_snippet("退押金", "押金") == "退押金"
@@ -0,0 +1,77 @@
+"""
+聊天上下文组装测试
+"""
+from app.services.context_builder import (
+    BUNDLED_TOKENIZER_DIR, MESSAGE_OVERHEAD_TOKENS, ContextBuilder, TokenCounter, estimate_tokens
+)
+
+counter = TokenCounter([BUNDLED_TOKENIZER_DIR])
+
+
+def builder(max_prompt_tokens=200, max_summary_tokens=30, max_facts_tokens=30, token_counter=counter):
+    return ContextBuilder(
+        token_counter, max_prompt_tokens, max_summary_tokens, max_facts_tokens, system_prompt="你是助手。"
+    )
+
+
+def prompt_tokens(context, token_counter=counter):
+    """实际发送的消息的token数"""
+    return sum(token_counter.count(m["content"]) + MESSAGE_OVERHEAD_TOKENS for m in context.messages)
+
+
+class TestContextBuilder:
+    """按真实token数分配预算，输出结构化角色消息"""
+
+    def test_counts_with_local_tokenizer(self):
+        assert counter.exact
+        assert counter.count("合同违约金") == 5
+        assert counter.count("hello world") < len("hello world")
+        assert counter.truncate("合同违约金过高", 3) == "合同违"
+        assert counter.truncate("合同违约金过高", 2, keep="tail") == "过高"
+
+    def test_fallback_estimate(self):
+        fallback = TokenCounter([])
+        assert not fallback.exact
+        assert fallback.count("合同abcd") == estimate_tokens("合同abcd") == 3
+        assert estimate_tokens(fallback.truncate("合同" * 10, 5)) <= 5
+
+    def test_structured_messages(self):
+        context = builder().build(
+            "违约金怎么算？", summary="用户咨询买卖合同纠纷。", facts="民法典第585条",
+            history=[("user", "你好"), ("assistant", "您好，请问有什么可以帮您？")]
+        )
+        roles = [m["role"] for m in context.messages]
+        assert roles == ["system", "user", "assistant", "user"]
+        assert "[对话摘要]\n用户咨询买卖合同纠纷。" in context.messages[0]["content"]
+        assert "[参考资料]\n民法典第585条" in context.messages[0]["content"]
+        assert context.messages[-1]["content"] == "违约金怎么算？"
+        assert context.turns_dropped == 0
+
+    def test_budget_keeps_recent_turns(self):
+        history = [("user" if i % 2 == 0 else "assistant", f"第{i}轮对话内容" * 3) for i in range(30)]
+        context = builder(max_prompt_tokens=150).build("新问题", summary="很长的摘要" * 50, history=history)
+
+        assert context.total_tokens <= 150
+        assert 0 < context.turns_included < 30
+        assert context.turns_included + context.turns_dropped == 30
+        # 保留的是最近的对话，摘要保留末尾且不超过上限
+        assert context.messages[-2]["content"] == history[-1][1]
+        assert context.tokens["summary"] <= 30 + counter.count("[对话摘要]\n")
+        assert context.tokens["history"] == sum(
+            counter.count(m["content"]) + MESSAGE_OVERHEAD_TOKENS for m in context.messages[1:-1]
+        )
+
+    def test_long_user_message_truncated(self):
+        context = builder(max_prompt_tokens=50).build("很" * 500)
+        assert context.total_tokens <= 50
+        assert context.messages[-1]["content"].startswith("很")
+
+    def test_joined_prompt_fits_budget(self):
+        # 估算模式下段落分隔符 "\n\n" 也占token，必须计入预算
+        for token_counter in (counter, TokenCounter([])):
+            for max_tokens in range(40, 121, 7):
+                context = builder(max_tokens, 40, 40, token_counter=token_counter).build(
+                    "问题abc", summary="摘要text" * 40, facts="资料data" * 40, keypoints="要点note" * 40,
+                    history=[("user", "早先的问题abc" * 3), ("assistant", "回答xyz" * 3)]
+                )
+                assert prompt_tokens(context, token_counter) <= context.total_tokens <= max_tokens
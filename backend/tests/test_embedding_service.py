@@ -0,0 +1,69 @@
+"""
+句向量服务测试
+"""
+import numpy as np
+import pytest
+import torch
+
+from app.services.embedding_service import BertEncoder, EmbeddingCache, EmbeddingService
+
+
+class FakeEncoder:
+    """按文本长度生成向量，记录每批编码的文本"""
+    dim = 4
+
+    def __init__(self):
+        self.batches = []
+
+    def token_lengths(self, texts):
+        return [len(t) for t in texts]
+
+    def encode(self, texts):
+        self.batches.append(list(texts))
+        return np.array([[len(t), 1, 0, 0] for t in texts], dtype=np.float32)
+
+
+@pytest.fixture
+def tiny_encoder():
+    from transformers import BertConfig, BertModel
+    torch.manual_seed(0)
+    config = BertConfig(vocab_size=21128, hidden_size=32, num_hidden_layers=1, num_attention_heads=2,
+                        intermediate_size=64, max_position_embeddings=128)
+    return BertEncoder(None, max_length=64, model=BertModel(config))
+
+
+class TestEmbeddingService:
+    """按长度分批、动态补齐，结果按模型版本+内容持久化缓存"""
+
+    def test_batches_sorted_and_deduplicated(self, tmp_path):
+        encoder = FakeEncoder()
+        service = EmbeddingService(encoder, "v1", batch_size=2, cache=EmbeddingCache(tmp_path / "c.sqlite3"))
+        texts = ["aaaa", "a", "aaa", "a", "aa"]
+        vectors = service.embed(texts)
+        assert vectors[:, 0].tolist() == [4, 1, 3, 1, 2]
+        assert encoder.batches == [["a", "aa"], ["aaa", "aaaa"]]
+
+    def test_cache_survives_restart_and_keys_on_version(self, tmp_path):
+        path = tmp_path / "c.sqlite3"
+        EmbeddingService(FakeEncoder(), "v1", cache=EmbeddingCache(path)).embed(["第一条", "第二条"])
+
+        encoder = FakeEncoder()
+        restarted = EmbeddingService(encoder, "v1", cache=EmbeddingCache(path))
+        assert restarted.embed(["第二条", "第一条"])[:, 0].tolist() == [3, 3]
+        assert encoder.batches == []
+
+        EmbeddingService(encoder, "v2", cache=EmbeddingCache(path)).embed(["第一条"])
+        assert encoder.batches == [["第一条"]]
+        assert len(EmbeddingCache(path)) == 3
+
+    def test_dynamic_padding_matches_single_encoding(self, tiny_encoder):
+        short, long = "限制竞争", "排斥或者限制外地经营者参加本地招标投标活动，设置歧视性资质要求"
+        batched = tiny_encoder.encode([short, long])
+        alone = tiny_encoder.encode([short])
+        assert batched.shape == (2, 32)
+        np.testing.assert_allclose(batched[0], alone[0], atol=1e-5)
+        np.testing.assert_allclose(np.linalg.norm(batched, axis=1), 1.0, atol=1e-5)
+
+        service = EmbeddingService(tiny_encoder, "tiny")
+        assert service.dim == 32 and service.name == "bert-tiny"
+        np.testing.assert_allclose(service.embed([long, short]), batched[::-1], atol=1e-5)
@@ -0,0 +1,42 @@
+"""
+数据库引擎工厂与连接池指标测试
+"""
+import pytest
+from sqlalchemy import create_engine, exc, text
+
+from app.models.engine_factory import InstrumentedQueuePool, _register_pool_gauges, create_replica_engine
+from app.utils.metrics import metrics
+
+
+class TestEngineFactory:
+    """连接池指标"""
+
+    def test_pool_wait_and_timeout_metrics(self, tmp_path):
+        pool_class = type("PoolUnderTest", (InstrumentedQueuePool,), {"metrics_name": "pooltest"})
+        engine = create_engine(
+            f"sqlite:///{tmp_path / 'pool.db'}", poolclass=pool_class, pool_size=1, max_overflow=0, pool_timeout=0.05
+        )
+        _register_pool_gauges(engine, "pooltest")
+
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            assert metrics.snapshot()["db_pool_pooltest_checked_out"] == 1
+            with pytest.raises(exc.TimeoutError):
+                engine.connect()
+
+        snapshot = metrics.snapshot()
+        assert snapshot["db_pool_pooltest_checked_out"] == 0
+        assert snapshot["db_pool_pooltest_overflow"] == 0
+        assert snapshot["db_pool_pooltest_timeouts_total"] == 1
+        wait = snapshot["db_pool_pooltest_wait_seconds"]
+        assert wait["count"] == 2 and wait["max"] >= 0.05
+
+        # dispose() 重建连接池后仍使用同一指标
+        engine.dispose()
+        with engine.connect():
+            pass
+        assert metrics.snapshot()["db_pool_pooltest_wait_seconds"]["count"] == 3
+
+    def test_replica_defaults_to_primary(self):
+        primary = object()
+        assert create_replica_engine(primary, None) is primary
@@ -0,0 +1,103 @@
+"""
+对话历史抽取式压缩测试
+"""
+import time
+
+import pytest
+
+from app.models.db_models import ChatMessage, ChatSession, ChatSettings
+from app.config import settings
+from app.services.context_builder import ContextBuilder, token_counter
+from app.services.extractive_compressor import compress_history, rank_sentences
+from app.services.memory_service import MEMORY_MODE_EXTRACTIVE, MEMORY_MODE_LLM, MemoryService
+from app.services.memory_store import LocalMemoryStore, MemoryStore
+
+HISTORY = [
+    ("user", "我和房东签了两年的租赁合同，押金交了三个月租金。房东现在要提前收回房子。"),
+    ("assistant", "好的，请问合同里有没有约定提前解约的违约责任？"),
+    ("user", "合同约定任何一方提前解约需支付一个月租金作为违约金。今天天气不错。"),
+    ("assistant", "根据合同约定，房东提前收回房屋应向您支付违约金，并退还押金。"),
+    ("user", "房东说押金不退了，因为墙面有污渍。"),
+    ("assistant", "正常使用造成的损耗不应从押金中扣除，您可以保留入住时的照片作为证据。"),
+]
+
+
+@pytest.fixture
+def memory(db_session, llm_configured):
+    session = ChatSession(title="租房纠纷", user_id="u1")
+    db_session.add(session)
+    db_session.flush()
+    for role, content in HISTORY:
+        db_session.add(ChatMessage(session_id=session.session_id, role=role, content=content))
+    db_session.commit()
+    store = MemoryStore(LocalMemoryStore(max_entries=10, max_bytes=1 << 20, ttl=60))
+    return MemoryService(db_session, store), session.session_id
+
+
+class TestExtractiveCompressor:
+    """本地要点抽取：有预算上限、保持对话顺序、可按会话选择记忆方式"""
+
+    def test_bounded_and_ordered(self):
+        keypoints = compress_history(HISTORY, max_tokens=60, query="押金能退吗")
+        lines = keypoints.split("\n")
+        assert token_counter.count(keypoints) <= 60 + len(lines)
+        assert any("押金" in line for line in lines)
+        # 输出按对话顺序排列
+        positions = [next(i for i, (_, c) in enumerate(HISTORY) if line.split("：", 1)[1] in c) for line in lines]
+        assert positions == sorted(positions)
+
+    def test_query_relevance_and_user_weight(self):
+        _, _, _, text = rank_sentences(HISTORY, query="违约金是多少")[0]
+        assert "违约金" in text
+        assert compress_history([], max_tokens=50) == ""
+
+    def test_fast_for_long_sessions(self):
+        history = HISTORY * 10
+        started = time.perf_counter()
+        compress_history(history, max_tokens=300, query="押金")
+        assert time.perf_counter() - started < 0.5
+
+    def test_memory_mode_resolution(self, db_session, memory):
+        service, session_id = memory
+        assert service.memory_mode(session_id, "u1") == MEMORY_MODE_EXTRACTIVE
+
+        db_session.add(ChatSettings(user_id=None, settings_key="memory_mode", settings_value="llm"))
+        db_session.commit()
+        assert service.memory_mode(session_id, "u1") == MEMORY_MODE_LLM
+
+        db_session.add(ChatSettings(user_id="u1", settings_key="memory_mode", settings_value={"mode": "extractive"}))
+        db_session.commit()
+        assert service.memory_mode(session_id, "u1") == MEMORY_MODE_EXTRACTIVE
+        assert service.memory_mode(session_id, "u2") == MEMORY_MODE_LLM
+
+        db_session.add(ChatSettings(user_id="u1", settings_key=f"memory_mode:{session_id}", settings_value="llm"))
+        db_session.commit()
+        assert service.memory_mode(session_id, "u1") == MEMORY_MODE_LLM
+
+    def test_prompt_memory_includes_keypoints(self, db_session, memory):
+        service, session_id = memory
+        prompt_memory = service.get_prompt_memory(session_id, "押金能退吗")
+        assert prompt_memory.summary is None
+        assert "押金" in prompt_memory.keypoints
+        # 要点只来自较早的对话，最近的对话原样发送，两者不重复
+        assert prompt_memory.history == HISTORY[-settings.chat_keypoints_recent_turns:]
+        older = HISTORY[:-settings.chat_keypoints_recent_turns]
+        for line in prompt_memory.keypoints.split("\n"):
+            assert any(line.split("：", 1)[1] in content for _, content in older)
+
+        db_session.add(ChatSettings(user_id=None, settings_key=f"memory_mode:{session_id}", settings_value="llm"))
+        db_session.commit()
+        prompt_memory = service.get_prompt_memory(session_id)
+        assert prompt_memory.keypoints is None and prompt_memory.history == HISTORY
+
+    def test_keypoints_budgeted_separately_from_summary(self):
+        builder = ContextBuilder(token_counter, max_prompt_tokens=3000, max_summary_tokens=200,
+                                 max_facts_tokens=200, max_keypoints_tokens=40)
+        summary = "房东提前解约，约定违约金为一个月租金。" * 8
+        keypoints = compress_history(HISTORY, max_tokens=300)
+        context = builder.build("押金能退吗", summary=summary, keypoints=keypoints, history=HISTORY[-2:])
+        system = context.messages[0]["content"]
+        # 要点超出自己的预算只截断要点，摘要完整保留
+        assert f"[对话摘要]\n{summary}" in system
+        assert "[要点]\n" in system and context.tokens["keypoints"] <= 40 + token_counter.count("[要点]\n")
+        assert context.turns_included == 2
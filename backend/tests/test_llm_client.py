@@ -0,0 +1,94 @@
+"""
+共享大模型客户端测试
+"""
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.services import llm_client
+from app.services.llm_client import LLMClientProvider, LLMConfig
+from app.utils.metrics import metrics
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("content-length", 0)))
+        body = b'{"choices":[{"message":{"role":"assistant","content":"ok"}}]}'
+        self.send_response(200)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+
+
+class TestLLMClient:
+    """配置只读取一次，连接池复用长连接"""
+
+    def test_config_read_once(self, monkeypatch):
+        monkeypatch.setenv("ARK_API_KEY", "k1")
+        monkeypatch.setenv("ARK_MODEL", "m1")
+        provider = LLMClientProvider()
+        assert provider.config == LLMConfig(api_key="k1", base_url=provider.config.base_url, model="m1")
+        monkeypatch.setenv("ARK_MODEL", "m2")
+        assert provider.config.model == "m1"
+
+    def test_missing_api_key(self, monkeypatch):
+        for name in ("ARK_API_KEY", "VOLC_ARK_API_KEY", "VOLC_ARK_APIKEY", "VOLCENGINE_ARK_API_KEY"):
+            monkeypatch.delenv(name, raising=False)
+        monkeypatch.setattr(llm_client.settings, "ai_api_key", "")
+        with pytest.raises(Exception, match="未配置 Ark API Key"):
+            LLMClientProvider().ark()
+
+    def test_ark_reuses_pooled_connection(self, server, monkeypatch):
+        monkeypatch.setenv("ARK_API_KEY", "k")
+        monkeypatch.setenv("ARK_BASE_URL", server)
+        provider = LLMClientProvider()
+        before = metrics.snapshot()
+
+        for _ in range(3):
+            response = provider.ark().chat.completions.create(
+                model="m", messages=[{"role": "user", "content": "hi"}]
+            )
+            assert response.choices[0].message.content == "ok"
+        assert provider.ark() is provider.ark()
+
+        after = metrics.snapshot()
+        assert after["llm_http_requests_total"] - before["llm_http_requests_total"] == 3
+        assert after["llm_http_connections_opened_total"] - before["llm_http_connections_opened_total"] == 1
+        provider.reset()
+
+    def test_async_client_per_event_loop(self):
+        provider = LLMClientProvider()
+
+        async def use():
+            client = provider.async_http_client
+            assert provider.async_http_client is client  # 同一事件循环内复用
+            return client
+
+        first, second = asyncio.run(use()), asyncio.run(use())
+        assert first is not second
+        assert list(provider._async_http_clients.values()) == [second]  # 已关闭事件循环的客户端被丢弃
+
+        async def shutdown():
+            client = provider.async_http_client
+            await provider.aclose()
+            return client
+
+        assert asyncio.run(shutdown()).is_closed
+        assert provider._async_http_clients == {}
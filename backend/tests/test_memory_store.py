@@ -0,0 +1,152 @@
+"""
+会话记忆缓存测试
+"""
+import threading
+
+import pytest
+
+from app.models.db_models import ChatMessage, ChatSession
+from app.services.memory_service import MemoryService
+from app.services.memory_store import LocalMemoryStore, MemoryStore, RedisMemoryStore, memory_size
+from app.utils.cache import TTLCache
+from app.utils.metrics import metrics
+
+
+class FakeRedis:
+    """只实现 RedisMemoryStore 用到的几个命令（pipeline 按顺序执行）"""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value.encode("utf-8")
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    def lrange(self, key, start, end):
+        items = self.data.get(key, [])
+        return items[start:] if end == -1 else items[start:end + 1]
+
+    def rpush(self, key, *values):
+        self.data.setdefault(key, []).extend(v.encode("utf-8") for v in values)
+        return len(self.data[key])
+
+    def ltrim(self, key, start, end):
+        self.data[key] = self.lrange(key, start, end)
+
+    def expire(self, key, seconds):
+        return key in self.data
+
+    def scan_iter(self, pattern):
+        return [k for k in list(self.data) if k.startswith(pattern.rstrip("*"))]
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.commands.append((name, args, kwargs))
+
+    def execute(self):
+        return [getattr(self.client, name)(*args, **kwargs) for name, args, kwargs in self.commands]
+
+
+@pytest.fixture
+def chat_session(db_session):
+    session = ChatSession(title="t")
+    db_session.add(session)
+    db_session.flush()
+    for role, content in [("user", "你好"), ("assistant", "您好")]:
+        db_session.add(ChatMessage(session_id=session.session_id, role=role, content=content))
+    db_session.commit()
+    return session.session_id
+
+
+@pytest.fixture
+def store(llm_configured):
+    return MemoryStore(LocalMemoryStore(max_entries=10, max_bytes=1 << 20, ttl=60))
+
+
+class TestMemoryStore:
+    """跨请求复用会话记忆，按条目数/字节数/TTL淘汰"""
+
+    def test_byte_budget_evicts_lru(self):
+        cache = TTLCache(max_entries=10, ttl=60, max_bytes=10, sizeof=len)
+        cache.set("a", "xxxx")
+        cache.set("b", "yyyy")
+        cache.get("a")
+        cache.set("c", "zzzz")
+        assert cache.get("b") is None and cache.get("a") == "xxxx"
+        assert cache.total_bytes == 8 and cache.evictions == 1
+        cache.delete("a")
+        assert cache.total_bytes == 4
+
+    def test_memory_size_counts_utf8_bytes(self):
+        assert memory_size({"history": [("user", "你好")], "summary": "ab"}) == 2 + 4 + 6
+
+    def test_shared_across_requests(self, db_session, chat_session, store, query_recorder):
+        before_hits = metrics.counter("chat_memory_cache_hits_total").value
+        MemoryService(db_session, store).get_or_create_memory(chat_session)
+
+        # 新请求新建 MemoryService，不再查询数据库
+        with query_recorder.record():
+            memory = MemoryService(db_session, store).get_or_create_memory(chat_session)
+        assert query_recorder.selects == []
+        assert memory["history"] == [("user", "你好"), ("assistant", "您好")]
+        assert metrics.counter("chat_memory_cache_hits_total").value == before_hits + 1
+
+    def test_add_message_after_miss_does_not_duplicate(self, db_session, chat_session, store):
+        db_session.add(ChatMessage(session_id=chat_session, role="user", content="第二句"))
+        db_session.commit()
+        service = MemoryService(db_session, store)
+        service.add_message(chat_session, "user", "第二句")
+        service.add_message(chat_session, "assistant", "好的")
+        assert [c for _, c in store.get(chat_session)["history"]] == ["你好", "您好", "第二句", "好的"]
+
+    def test_redis_backend_round_trip(self, db_session, chat_session, llm_configured):
+        shared = FakeRedis()
+        # 两个 worker 各自的存储实例共享同一个 Redis
+        worker_a = MemoryStore(RedisMemoryStore(shared, ttl=60))
+        worker_b = MemoryStore(RedisMemoryStore(shared, ttl=60))
+        MemoryService(db_session, worker_a).add_message(chat_session, "user", "你好")
+        MemoryService(db_session, worker_a).add_message(chat_session, "assistant", "新回复")
+        assert worker_b.get(chat_session)["history"][-1] == ["assistant", "新回复"]
+        MemoryService(db_session, worker_b).clear_memory(chat_session)
+        assert worker_a.get(chat_session) is None
+
+    def test_redis_history_is_trimmed_list(self, db_session, chat_session, llm_configured):
+        shared = FakeRedis()
+        store = RedisMemoryStore(shared, ttl=60)
+        assert store.append_history(chat_session, ("user", "x"), max_len=3) is False  # 未缓存
+        assert shared.data == {}
+
+        store.set(chat_session, {"history": [("user", "a")], "summary": None, "user_id": None})
+        for content in "bcd":
+            assert store.append_history(chat_session, ("user", content), max_len=3) is True
+        assert store.set_summary(chat_session, "摘要") is True
+        memory = store.get(chat_session)
+        assert [c for _, c in memory["history"]] == ["b", "c", "d"] and memory["summary"] == "摘要"
+
+    def test_concurrent_appends_are_not_lost(self, store):
+        store.set("s", {"history": [], "summary": None})
+
+        def append(worker):
+            for i in range(50):
+                store.append_history("s", ("user", f"{worker}-{i}"), max_len=1000)
+
+        threads = [threading.Thread(target=append, args=(w,)) for w in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(store.get("s")["history"]) == 400
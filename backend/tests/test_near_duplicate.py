@@ -0,0 +1,82 @@
+"""
+近似重复条款检测测试
+"""
+from app.models.db_models import Annotation, Article, Sentence
+from app.services.near_duplicate_service import MinHasher, MinHashLSH, NearDuplicateIndex, normalize_text
+
+CLAUSE = "对外地企业在本地投资设立分支机构设置歧视性条件，要求其在本地缴纳税收或者租用场地"
+EDITED = "对外地企业在本市投资设立分支机构设置歧视性条件，要求其必须在本地缴纳税收或者租用场地"
+OTHER = "鼓励各类市场主体公平参与政府采购活动，不得限定供应商所在地区和所有制形式"
+
+
+def make_index():
+    return NearDuplicateIndex(num_perm=64, bands=16, shingle_size=4, threshold=0.5, min_chars=10)
+
+
+class TestMinHashLSH:
+    """签名相似度接近 Jaccard，候选只来自同桶"""
+
+    def test_signature_estimates_jaccard(self):
+        hasher = MinHasher(num_perm=256, shingle_size=4)
+        a, b = hasher.shingles(CLAUSE), hasher.shingles(EDITED)
+        jaccard = len(a & b) / len(a | b)
+        estimate = (hasher.signature(CLAUSE) == hasher.signature(EDITED)).mean()
+        assert abs(estimate - jaccard) < 0.1
+        assert (hasher.signature(CLAUSE) == hasher.signature(OTHER)).mean() < 0.1
+
+    def test_query_is_sublinear(self):
+        hasher = MinHasher(num_perm=64, shingle_size=4)
+        lsh = MinHashLSH(hasher, bands=16, threshold=0.5)
+        for i in range(2000):
+            lsh.add(i, hasher.signature(f"第{i}条 不相关的条款内容编号{i * 7919}号"))
+        lsh.add(5000, hasher.signature(CLAUSE))
+
+        matches = lsh.query(hasher.signature(EDITED))
+        assert [doc_id for doc_id, _ in matches] == [5000]
+        lsh.discard([5000])
+        assert lsh.query(hasher.signature(EDITED)) == []
+
+
+class TestNearDuplicateIndex:
+    """先例查询：更早的已审查文档中近似重复句子的标注分布"""
+
+    def _article(self, db, name, status, sentences):
+        article = Article(name=name, original_path="o", annotated_path="a", status=status)
+        db.add(article)
+        db.flush()
+        db.add_all([Sentence(content=c, article_id=article.id, has_problem=p, annotation_id=l) for c, p, l in sentences])
+        db.commit()
+        return article
+
+    def test_precedents_and_clusters(self, db_session, query_recorder):
+        db_session.add(Annotation(id=12, content="设置地方保护"))
+        for i in range(3):
+            self._article(db_session, f"旧{i}.docx", "已审查", [(EDITED if i else CLAUSE, True, 12), (OTHER, False, None)])
+        self._article(db_session, "未审查.docx", "待审查", [(CLAUSE, None, None)])
+        current = self._article(db_session, "新.docx", "待审查", [(CLAUSE, None, None), ("短句", None, None)])
+        later = self._article(db_session, "更新.docx", "已审查", [(CLAUSE, True, 12)])
+
+        index = make_index()
+        index.sync(db_session)
+        current_id, later_id = current.id, later.id
+        with query_recorder.record():
+            precedents = index.precedents(db_session, current_id)
+        # 追平（只扫ID）+ 本文档句子 + 候选批量查询，与匹配数量无关
+        assert len(query_recorder.selects) == 3
+
+        assert len(precedents) == 1
+        entry = precedents[0]
+        assert entry["content"] == CLAUSE
+        assert entry["earlier_articles"] == 3  # 未审查与更晚的文档不计入
+        assert entry["labels"] == [
+            {"annotation_id": 12, "annotation_content": "设置地方保护", "sentences": 3, "articles": 3}
+        ]
+
+        clusters = index.clusters(db_session, min_articles=2)
+        assert [c["articles"] for c in clusters] == [6, 3]
+        assert clusters[0]["labels"] == {12: 4}
+
+        # 删除文档后不再作为先例
+        index.forget(s.id for s in db_session.query(Sentence).filter(Sentence.article_id != later_id))
+        assert index.precedents(db_session, later_id) == []
+        assert normalize_text(" 对外 地") == "对外地"
@@ -0,0 +1,107 @@
+"""
+热点查询的执行计划回归测试：
+在预置数据的测试库上执行真实的服务/接口查询，记录其SQL，
+再逐条 EXPLAIN，若热点表出现全表扫描则失败（防止索引被误删或查询写法退化）。
+"""
+import re
+from datetime import datetime, timedelta
+
+import pytest
+from docx import Document
+from fastapi import Request
+
+from app.api.endpoints.files import get_article_detail, get_full_article_content
+from app.api.endpoints.reviews import get_review_detail, get_review_progress
+from app.models.db_models import Annotation, Article, ChatMessage, ChatSession, Sentence
+from app.services import review_cache_service
+from app.services.article_list_service import fetch_article_page
+from app.services.chat_service import ChatService
+
+HOT_TABLES = {"articles", "sentences", "chat_sessions", "chat_messages"}
+FULL_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$")
+
+
+def full_scans(db, statements):
+    """返回 [(表名, SQL)]：EXPLAIN QUERY PLAN 中对热点表的全表扫描"""
+    conn = db.connection()
+    scans = []
+    for statement, params in statements:
+        plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", params).fetchall()
+        for row in plan:
+            match = FULL_SCAN.match(row[-1])
+            if match and match.group(1) in HOT_TABLES:
+                scans.append((match.group(1), statement))
+    return scans
+
+
+@pytest.fixture
+def seeded(db_session, tmp_path):
+    docx_path = tmp_path / "annotated.docx"
+    doc = Document()
+    doc.add_paragraph("第一句。第二句。")
+    doc.save(docx_path)
+
+    db = db_session
+    db.add(Annotation(id=1, content="设置地方保护"))
+    base = datetime(2025, 1, 1)
+    articles = [
+        Article(name=f"doc_{i}.docx", original_path="o", annotated_path=str(docx_path),
+                upload_time=base + timedelta(minutes=i), status="已审查", review_time=base)
+        for i in range(50)
+    ]
+    db.add_all(articles)
+    db.flush()
+    db.add_all([
+        Sentence(content=f"句子{j}", article_id=a.id, has_problem=j % 3 == 0, annotation_id=1 if j % 3 == 0 else None)
+        for a in articles for j in range(20)
+    ])
+    sessions = [ChatSession(user_id=f"user_{i % 5}", title=f"会话{i}") for i in range(20)]
+    db.add_all(sessions)
+    db.flush()
+    db.add_all([
+        ChatMessage(session_id=s.session_id, role="user" if k % 2 == 0 else "assistant",
+                    content=f"消息{k}", created_at=base + timedelta(seconds=k))
+        for s in sessions for k in range(30)
+    ])
+    db.commit()
+    db.connection().exec_driver_sql("ANALYZE")
+    return {"article": articles[10], "session": sessions[3]}
+
+
+class TestHotPathQueryPlans:
+    """热点查询不允许全表扫描"""
+
+    def test_article_queries(self, db_session, seeded, query_recorder, monkeypatch):
+        article_id = seeded["article"].id
+        request = Request({"type": "http", "method": "GET", "path": "/", "headers": []})
+        monkeypatch.setattr(review_cache_service, "session_factory", lambda: db_session)
+        with query_recorder.record():
+            _, cursor = fetch_article_page(db_session, page_size=10)
+            fetch_article_page(db_session, page_size=10, cursor=cursor)
+            get_article_detail(article_id, db_session)
+            get_review_progress(article_id, db_session)
+            get_review_detail(article_id, request, db_session)
+            get_full_article_content(article_id, request, db_session)
+
+        assert query_recorder.selects
+        assert full_scans(db_session, query_recorder.selects) == []
+
+    def test_chat_queries(self, db_session, seeded, query_recorder):
+        session_id = seeded["session"].session_id
+        service = ChatService(db_session)
+        with query_recorder.record():
+            service.get_user_sessions("user_3", limit=50)
+            service.get_session(session_id)
+            service.get_session_messages(session_id, limit=100)
+            _, cursor = service.get_message_page(session_id, limit=10)
+            service.get_message_page(session_id, limit=10, before=cursor)
+            service.get_message_count(session_id)
+
+        assert query_recorder.selects
+        assert full_scans(db_session, query_recorder.selects) == []
+
+    def test_harness_detects_full_scan(self, db_session, seeded, query_recorder):
+        """自检：未建索引的过滤条件必须被识别为全表扫描"""
+        with query_recorder.record():
+            db_session.query(Sentence).filter(Sentence.content == "句子1").all()
+        assert [table for table, _ in full_scans(db_session, query_recorder.selects)] == ["sentences"]
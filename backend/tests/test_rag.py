@@ -0,0 +1,88 @@
+"""
+向量检索测试
+"""
+import numpy as np
+import pytest
+
+from app.models.db_models import Annotation
+from app.rag.chunker import chunk_text
+from app.rag.embedder import HashingEmbedder
+from app.rag.indexer import build_index
+from app.rag.retriever import Retriever
+from app.rag.vector_store import VectorStore, write_store
+from app.services.context_builder import context_builder, token_counter
+
+REGULATION = """公平竞争审查条例
+第一条 为了规范公平竞争审查工作，促进市场公平竞争，制定本条例。
+第八条 起草单位起草的政策措施，不得含有下列限制或者变相限制市场准入和退出的内容：设置不合理或者歧视性的准入、退出条件。
+第十条 起草单位起草的政策措施，不得含有下列限制商品、要素自由流动的内容：对外地商品、服务实行歧视性价格。
+"""
+
+
+@pytest.fixture
+def index_dir(tmp_path, db_session):
+    corpus = tmp_path / "regulations"
+    corpus.mkdir()
+    (corpus / "公平竞争审查条例.txt").write_text(REGULATION, encoding="utf-8")
+    db_session.add(Annotation(id=7, content="设置地方保护，排斥外地经营者参与本地招标投标"))
+    db_session.commit()
+    output = tmp_path / "index"
+    assert build_index(db_session, HashingEmbedder(64), corpus, output, max_tokens=60) == 5
+    return output
+
+
+class TestRag:
+    """按条款切块，内存映射向量检索，检索结果注入提示"""
+
+    def test_chunk_by_article_and_budget(self):
+        chunks = chunk_text(REGULATION, max_tokens=30)
+        assert all(token_counter.count(c) <= 30 for c in chunks)
+        assert not any("第八条" in c and "第十条" in c for c in chunks)
+        assert chunk_text("", max_tokens=30) == []
+
+    def test_ivf_matches_flat_search(self, tmp_path):
+        rng = np.random.default_rng(0)
+        vectors = rng.standard_normal((500, 16)).astype(np.float32)
+        chunks = [{"id": str(i), "source": "s", "text": f"t{i}"} for i in range(500)]
+        flat = VectorStore(write_store(tmp_path / "flat", vectors, chunks, "e"))
+        ivf = VectorStore(write_store(tmp_path / "ivf", vectors, chunks, "e", nlist=8))
+        assert isinstance(flat.vectors, np.memmap)
+
+        query = vectors[42]
+        exact = [flat.chunk(row)["id"] for row, _ in flat.search(query, 5)]
+        assert exact[0] == "42"
+        # 扫描全部分区时与全量扫描一致；只扫描少数分区时最近邻仍在其中
+        assert [ivf.chunk(row)["id"] for row, _ in ivf.search(query, 5, nprobe=8)] == exact
+        assert ivf.chunk(ivf.search(query, 1, nprobe=2)[0][0])["id"] == "42"
+
+    def test_retriever_facts_and_reload(self, tmp_path, index_dir):
+        retriever = Retriever(index_dir, HashingEmbedder(64), top_k=2, min_score=0.1, nprobe=4)
+        passages = retriever.search("对外地商品实行歧视性价格")
+        assert passages[0].title == "公平竞争审查条例" and "第十条" in passages[0].text
+
+        facts = retriever.facts_for("排斥外地经营者参与招标", context="用户上传的合同")
+        assert facts.startswith("用户上传的合同\n") and "【审查要点】设置地方保护" in facts
+        prompt = context_builder.build("排斥外地经营者参与招标", facts=facts)
+        assert "[参考资料]" in prompt.messages[0]["content"] and "facts" in prompt.tokens
+
+        # 向量化器不匹配或没有索引时不检索
+        assert Retriever(index_dir, HashingEmbedder(32), 2, 0.1, 4).search("价格") == []
+        assert Retriever(tmp_path / "missing", HashingEmbedder(64), 2, 0.1, 4).facts_for("价格") is None
+
+        # 重建索引后自动加载新内容
+        write_store(index_dir, HashingEmbedder(64).embed(["招标投标"]), [{"id": "x", "source": "s", "text": "招标投标"}], "hashing-64")
+        assert [p.id for p in retriever.search("招标投标")] == ["x"]
+
+    def test_failures_are_logged(self, index_dir, monkeypatch, caplog):
+        (index_dir / "meta.json").write_text("{broken", encoding="utf-8")  # 索引损坏：加载失败
+        retriever = Retriever(index_dir, HashingEmbedder(64), top_k=2, min_score=0.1, nprobe=4)
+        assert retriever.search("价格") == []
+
+        def broken_search(query, k=None):
+            raise RuntimeError("search down")
+
+        monkeypatch.setattr(retriever, "search", broken_search)
+        assert retriever.facts_for("价格", context="上下文") == "上下文"
+        records = [r for r in caplog.records if r.name == "app.rag.retriever"]
+        assert [r.levelname for r in records] == ["ERROR", "ERROR"]
+        assert all(r.exc_info is not None for r in records)
@@ -0,0 +1,83 @@
+"""
+读写分离路由测试
+"""
+import time
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+
+from app.models.read_routing import (
+    READ_YOUR_WRITES_COOKIE, ReplicaLagMonitor, choose_read_primary, ReadYourWritesMiddleware
+)
+
+
+def _request(cookie: str = None) -> Request:
+    headers = [(b"cookie", f"{READ_YOUR_WRITES_COOKIE}={cookie}".encode())] if cookie else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+class StubMonitor:
+    def __init__(self, usable):
+        self._usable = usable
+
+    def usable(self):
+        return self._usable
+
+
+class TestReadRouting:
+    """读请求分流"""
+
+    def test_routing_decisions(self):
+        now_ms = str(int(time.time() * 1000))
+        old_ms = str(int((time.time() - 3600) * 1000))
+        assert choose_read_primary(_request(), None) is True  # 未配置副本
+        assert choose_read_primary(_request(), StubMonitor(True)) is False
+        assert choose_read_primary(_request(now_ms), StubMonitor(True)) is True  # 刚写入
+        assert choose_read_primary(_request(old_ms), StubMonitor(True)) is False
+        assert choose_read_primary(_request(), StubMonitor(False)) is True  # 副本延迟
+
+    def test_write_sets_sticky_cookie(self):
+        app = FastAPI()
+        app.add_middleware(ReadYourWritesMiddleware)
+        app.post("/w")(lambda: {"ok": True})
+        app.get("/r")(lambda: {"ok": True})
+        app.post("/stream")(lambda: StreamingResponse(iter([b"a", b"b"])))
+
+        @app.delete("/missing")
+        def missing():
+            raise HTTPException(status_code=404)
+
+        client = TestClient(app)
+
+        assert READ_YOUR_WRITES_COOKIE not in client.get("/r").cookies
+        assert READ_YOUR_WRITES_COOKIE in client.post("/w").cookies
+        assert READ_YOUR_WRITES_COOKIE not in client.delete("/missing").cookies  # 写入失败不标记
+        response = client.post("/stream")
+        assert response.content == b"ab" and READ_YOUR_WRITES_COOKIE in response.cookies
+
+    def test_lag_monitor_caches_and_falls_back(self, tmp_path, monkeypatch):
+        engine = create_engine(f"sqlite:///{tmp_path / 'r.db'}")
+        assert ReplicaLagMonitor(engine, max_lag=5).usable() is True  # 非MySQL不检测
+
+        monitor = ReplicaLagMonitor(engine, max_lag=5, check_interval=60)
+        monkeypatch.setattr(engine.dialect, "name", "mysql")
+        calls = []
+        monkeypatch.setattr(monitor, "_query_lag", lambda: calls.append(1) or 30.0)
+        assert monitor.usable() is False
+        assert monitor.usable() is False
+        assert len(calls) == 1 and monitor.last_lag == 30.0
+
+    def test_lag_check_failure_is_logged(self, tmp_path, monkeypatch, caplog):
+        engine = create_engine(f"sqlite:///{tmp_path / 'r.db'}")
+        monitor = ReplicaLagMonitor(engine, max_lag=5)
+        monkeypatch.setattr(engine.dialect, "name", "mysql")
+
+        def broken():
+            raise RuntimeError("replica down")
+
+        monkeypatch.setattr(monitor, "_query_lag", broken)
+        assert monitor.usable() is False
+        record = next(r for r in caplog.records if r.name == "app.models.read_routing")
+        assert record.levelname == "ERROR" and record.exc_info is not None
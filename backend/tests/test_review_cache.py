@@ -0,0 +1,68 @@
+"""
+已审查文档ETag与响应缓存测试
+"""
+import gzip
+import json
+from datetime import datetime
+
+import pytest
+from fastapi import Request
+
+from app.api.endpoints.reviews import get_review_detail
+from app.models.db_models import Annotation, Article, ArticleResponseCache, ArticleReviewStats, Sentence
+from app.services import review_cache_service
+
+
+def _request(**headers) -> Request:
+    raw = [(k.replace("_", "-").encode(), v.encode()) for k, v in headers.items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw})
+
+
+@pytest.fixture
+def reviewed(db_session, monkeypatch):
+    monkeypatch.setattr(review_cache_service, "session_factory", lambda: db_session)
+    db_session.add(Annotation(id=7, content="设置地方保护"))
+    article = Article(
+        name="缓存.docx", original_path="o", annotated_path="a",
+        status="已审查", risk_level="中风险", review_time=datetime(2025, 5, 1, 8, 30)
+    )
+    db_session.add(article)
+    db_session.flush()
+    db_session.add_all([
+        Sentence(content="违规句", article_id=article.id, has_problem=True, annotation_id=7),
+        Sentence(content="正常句", article_id=article.id, has_problem=False),
+    ])
+    db_session.add(ArticleReviewStats(article_id=article.id, total_sentences=2, violation_count=1, model_version="v1"))
+    db_session.commit()
+    return article.id
+
+
+class TestReviewCache:
+    """强ETag + 预压缩响应"""
+
+    def test_etag_304_and_precompressed_body(self, db_session, reviewed, query_recorder):
+        first = get_review_detail(reviewed, _request(), db_session)
+        etag = first.headers["etag"]
+        data = json.loads(first.body)["data"]
+        assert data["total_violation"] == 1 and data["violation_sentences"][0]["content"] == "违规句"
+        assert db_session.query(ArticleResponseCache).count() == 1
+
+        with query_recorder.record():
+            gz = get_review_detail(reviewed, _request(accept_encoding="gzip, br;q=0"), db_session)
+            not_modified = get_review_detail(reviewed, _request(if_none_match=f'W/"x", {etag}'), db_session)
+        assert gz.headers["content-encoding"] == "gzip"
+        assert gzip.decompress(gz.body) == first.body
+        assert not_modified.status_code == 304 and not_modified.headers["etag"] == etag
+        # 命中缓存后不再查询句子表
+        assert not any("FROM sentences" in s for s, _ in query_recorder.selects)
+
+    def test_re_review_changes_etag(self, db_session, reviewed):
+        etag = get_review_detail(reviewed, _request(), db_session).headers["etag"]
+
+        db_session.get(Article, reviewed).review_time = datetime(2025, 6, 1)
+        db_session.commit()
+        response = get_review_detail(reviewed, _request(if_none_match=etag), db_session)
+
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+        assert db_session.get(ArticleResponseCache, (reviewed, "review_detail")).etag == response.headers["etag"]
@@ -0,0 +1,55 @@
+"""
+审查统计物化测试
+"""
+from app.models import schemas
+from app.models.db_models import Annotation, Article, ArticleReviewStats, Sentence
+from app.services import analytics_service, review_service
+
+
+def _article(db, contents):
+    article = Article(name="测试.docx", original_path="o", annotated_path="a", status="审查中")
+    db.add(article)
+    db.flush()
+    db.add_all([Sentence(content=c, article_id=article.id) for c in contents])
+    db.commit()
+    return article
+
+
+class TestReviewStats:
+    """审查完成后写入统计"""
+
+    def test_stats_written_on_completion(self, db_session, fake_model):
+        db_session.add_all([Annotation(id=7, content="设置地方保护"), Annotation(id=9, content="限定交易")])
+        article = _article(db_session, list(fake_model))
+
+        review_service.start_review_task(article.id, db_session)
+
+        stats = db_session.get(ArticleReviewStats, article.id)
+        assert stats.total_sentences == 5
+        assert stats.reviewed_sentences == 5
+        assert stats.violation_count == 3
+        assert stats.label_histogram == {"7": 2, "9": 1}
+        assert stats.review_duration_ms >= 0
+
+        db_session.expire_all()
+        response = schemas.ArticleResponseSchema.from_orm(db_session.get(Article, article.id)).dict()
+        assert response["status"] == "已审查"
+        assert response["review_stats"]["violation_count"] == 3
+
+    def test_empty_article(self, db_session, fake_model):
+        article = _article(db_session, [])
+        review_service.start_review_task(article.id, db_session)
+        stats = db_session.get(ArticleReviewStats, article.id)
+        assert (stats.total_sentences, stats.violation_count, stats.label_histogram) == (0, 0, {})
+
+    def test_histogram_matches_backfill_rule(self, db_session, fake_model):
+        # 标签9没有对应的 Annotation：句子计为违规，但不进入标签分布（与 _histograms_from_sentences 一致）
+        db_session.add(Annotation(id=7, content="设置地方保护"))
+        article = _article(db_session, list(fake_model))
+
+        review_service.start_review_task(article.id, db_session)
+
+        stats = db_session.get(ArticleReviewStats, article.id)
+        assert stats.violation_count == 3
+        assert stats.label_histogram == {"7": 2}
+        assert analytics_service._histograms_from_sentences(db_session, [article.id])[article.id] == (5, 3, {"7": 2})
@@ -0,0 +1,138 @@
+"""
+n-gram 倒排索引检索测试
+"""
+from datetime import datetime
+
+from app.models.db_models import Annotation, Article, Sentence
+from app.services.search_service import NgramIndex, SearchIndex
+
+
+class TestNgramIndex:
+    """倒排索引测试"""
+
+    def test_intersection_and_order(self):
+        index = NgramIndex(n=2)
+        index.add(1, "排除、限制竞争")
+        index.add(3, "限制商品流通")
+        index.add(2, "不得限制竞争")
+        assert index.search("限制竞争") == [2, 1]
+        assert index.search("限制") == [3, 2, 1]
+        assert index.search("竞") == []
+
+    def test_discard_and_compact(self):
+        index = NgramIndex(n=2)
+        for doc_id in range(1, 2001):
+            index.add(doc_id, f"条款{doc_id}地方保护")
+        index.discard(range(1, 1500))
+        assert index.search("地方保护") == list(range(2000, 1499, -1))
+        assert index.stats()["postings"] < 2000 * 10
+
+
+class TestSearchIndex:
+    """检索服务测试"""
+
+    def _seed(self, db):
+        db.add_all([Annotation(id=7, content="设置地方保护"), Annotation(id=9, content="限定交易")])
+        a1 = Article(name="招标办法.docx", original_path="o", annotated_path="a")
+        a2 = Article(name="补贴政策.docx", original_path="o", annotated_path="a")
+        db.add_all([a1, a2])
+        db.flush()
+        db.add_all([
+            Sentence(content="限定本地企业参与招标", article_id=a1.id, has_problem=True, annotation_id=9),
+            Sentence(content="本地企业优先", article_id=a1.id, has_problem=False),
+            Sentence(content="仅限本地企业享受补贴", article_id=a2.id, has_problem=True, annotation_id=7),
+        ])
+        db.commit()
+        return a1, a2
+
+    def test_filters_and_incremental_sync(self, db_session):
+        a1, a2 = self._seed(db_session)
+        index = SearchIndex(n=2)
+
+        hits = index.search_sentences(db_session, "本地企业")
+        assert [h["content"] for h in hits] == ["仅限本地企业享受补贴", "本地企业优先", "限定本地企业参与招标"]
+
+        flagged = index.search_sentences(db_session, "本地企业", has_problem=True, annotation_id=7)
+        assert [h["article_name"] for h in flagged] == ["补贴政策.docx"]
+        assert flagged[0]["annotation_content"] == "设置地方保护"
+
+        # 新写入的句子在下一次查询前自动追平
+        db_session.add(Sentence(content="鼓励本地企业兼并", article_id=a2.id))
+        db_session.commit()
+        assert len(index.search_sentences(db_session, "本地企业", article_id=a2.id)) == 2
+
+        assert [a.id for a in index.search_articles(db_session, "政策")] == [a2.id]
+
+    def test_label_filter_before_verification(self, db_session, query_recorder):
+        a1, _ = self._seed(db_session)
+        db_session.add_all([
+            Sentence(content=f"本地企业条款{k}", article_id=a1.id, has_problem=False) for k in range(1200)
+        ])
+        db_session.commit()
+        index = SearchIndex(n=2)
+        index.sync(db_session)
+
+        with query_recorder.record():
+            flagged = index.search_sentences(db_session, "本地企业", has_problem=True, limit=5)
+        assert [h["annotation_id"] for h in flagged] == [7, 9]
+        # 追平（审查时间、两张表的ID扫描）之外只有一次回库校验，不随非违规候选数增长
+        verify = [s for s, _ in query_recorder.selects if "JOIN articles" in s]
+        assert len(verify) == 1
+
+    def test_labels_refresh_after_review(self, db_session):
+        a1, a2 = self._seed(db_session)
+        index = SearchIndex(n=2)
+        assert index.search_sentences(db_session, "本地企业", annotation_id=9)[0]["article_id"] == a1.id
+
+        # 模拟（其他worker上的）重新审查：句子标签改变，审查完成时间前移
+        sentence = db_session.query(Sentence).filter(Sentence.content == "本地企业优先").one()
+        sentence.has_problem, sentence.annotation_id = True, 9
+        a1.review_time = datetime(2025, 1, 2)
+        db_session.commit()
+        hits = index.search_sentences(db_session, "本地企业", annotation_id=9)
+        assert [h["content"] for h in hits] == ["本地企业优先", "限定本地企业参与招标"]
+
+    def test_late_commit_with_earlier_review_time(self, db_session):
+        a1, a2 = self._seed(db_session)
+        index = SearchIndex(n=2)
+        a1.review_time = datetime(2025, 1, 1, 12, 0, 5)
+        db_session.commit()
+        assert len(index.search_sentences(db_session, "本地企业", annotation_id=7)) == 1
+
+        # 另一个 worker 的审查更早取得 review_time、但在水位前移之后才提交
+        sentence = db_session.query(Sentence).filter(Sentence.content == "仅限本地企业享受补贴").one()
+        sentence.annotation_id = 9
+        a2.review_time = datetime(2025, 1, 1, 12, 0, 1)
+        db_session.commit()
+        hits = index.search_sentences(db_session, "本地企业", annotation_id=9)
+        assert [h["content"] for h in hits] == ["仅限本地企业享受补贴", "限定本地企业参与招标"]
+
+        # 回看窗口内已读取过的审查不重复读取句子标签
+        assert index._recent_reviews == {a1.id: a1.review_time, a2.id: a2.review_time}
+
+    def test_falls_back_to_database_while_warming(self, db_session):
+        self._seed(db_session)
+        index = SearchIndex(n=2)
+        index._warming = True
+        hits = index.search_sentences(db_session, "本地企业", has_problem=True)
+        assert [h["content"] for h in hits] == ["仅限本地企业享受补贴", "限定本地企业参与招标"]
+        assert not index.built and index.sentences.doc_count == 0
+
+        index._warming = False
+        thread = index.warm_in_background(lambda: db_session, "test")
+        thread.join(5)
+        assert index.built and index.sentences.doc_count == 3
+
+    def test_warm_failure_is_logged(self, db_session, caplog):
+        class BrokenSession:
+            def query(self, *args):
+                raise RuntimeError("database unavailable")
+
+            def close(self):
+                pass
+
+        index = SearchIndex(n=2)
+        index.warm_in_background(BrokenSession, "test").join(5)
+        record = next(r for r in caplog.records if r.name == "app.services.search_service")
+        assert record.levelname == "ERROR" and record.exc_info[0] is RuntimeError
+        assert not index.built and not index._warming
@@ -0,0 +1,43 @@
+"""
+直接序列化与Pydantic序列化结果一致性测试
+"""
+import json
+from datetime import datetime
+
+from fastapi.encoders import jsonable_encoder
+
+from app.models import schemas, serializers
+from app.models.db_models import Article, ArticleReviewStats, ChatSession
+from app.utils import json_response
+
+
+def _same_json(direct, reference):
+    return json.loads(json_response.dumps(direct)) == jsonable_encoder(reference)
+
+
+class TestSerializers:
+    """row→dict 输出与原 Schema 输出相同"""
+
+    def test_article(self, db_session):
+        reviewed = Article(
+            name="a.docx", original_path="/srv/o", annotated_path="/srv/a", status="已审查", review_progress=100,
+            risk_level="低风险", upload_time=datetime(2025, 1, 2, 3, 4, 5, 678), review_time=datetime(2025, 1, 3)
+        )
+        pending = Article(name="b.docx", original_path="o", annotated_path="a")
+        db_session.add_all([reviewed, pending])
+        db_session.flush()
+        db_session.add(ArticleReviewStats(article_id=reviewed.id, total_sentences=3, label_histogram={"7": 1}))
+        db_session.commit()
+        db_session.expire_all()
+
+        for article in db_session.query(Article).all():
+            direct = serializers.article_to_dict(article)
+            assert "original_path" not in direct
+            assert _same_json(direct, schemas.ArticleResponseSchema.from_orm(article).dict())
+
+    def test_chat_session(self, db_session):
+        session = ChatSession(user_id="u1", title="标题")
+        db_session.add(session)
+        db_session.commit()
+        reference = schemas.ChatSessionSchema.from_orm(session).copy(update={"message_count": 4})
+        assert _same_json(serializers.chat_session_to_dict(session, 4), reference)
@@ -0,0 +1,113 @@
+"""
+会话摘要后台任务测试
+"""
+import pytest
+
+from app.models.db_models import ChatMessage, ChatSession
+from app.services import memory_service
+from app.services.memory_service import MemoryService
+from app.services.memory_store import LocalMemoryStore, MemoryStore
+from app.services.summary_worker import SummaryWorker
+
+
+@pytest.fixture
+def llm_calls(llm_configured, monkeypatch):
+    calls = []
+
+    def fake_llm(self, prompt):
+        calls.append(prompt)
+        return f"摘要{len(calls)}"
+
+    monkeypatch.setattr(memory_service.VolcengineLLMWrapper, "__call__", fake_llm)
+    return calls
+
+
+def add_turns(db, session_id, count):
+    for i in range(count):
+        db.add(ChatMessage(session_id=session_id, role="user" if i % 2 == 0 else "assistant", content=f"消息{i}"))
+    db.commit()
+
+
+@pytest.fixture
+def chat_session(db_session):
+    session = ChatSession(title="t")
+    db_session.add(session)
+    db_session.commit()
+    return session.session_id
+
+
+class TestSummaryWorker:
+    """按阈值合并摘要，带版本号持久化，重复通知合并"""
+
+    def test_threshold_and_version(self, db_session, chat_session, llm_calls):
+        store = MemoryStore(LocalMemoryStore(max_entries=10, max_bytes=1 << 20, ttl=60))
+        service = MemoryService(db_session, store)
+        add_turns(db_session, chat_session, 2)
+        updated_at = db_session.query(ChatSession.updated_at).filter_by(session_id=chat_session).scalar()
+        service.get_or_create_memory(chat_session)
+
+        assert service.summarize_pending(chat_session, min_turns=4, min_tokens=1000) is False
+        assert llm_calls == []
+
+        add_turns(db_session, chat_session, 2)
+        assert service.summarize_pending(chat_session, min_turns=4, min_tokens=1000) is True
+        db_session.expire_all()
+        session = db_session.query(ChatSession).filter_by(session_id=chat_session).one()
+        last_id = db_session.query(ChatMessage.id).order_by(ChatMessage.id.desc()).limit(1).scalar()
+        assert (session.memory_summary, session.memory_summary_version) == ("摘要1", 1)
+        assert session.memory_summarized_message_id == last_id
+        assert session.updated_at == updated_at
+        assert store.get(chat_session)["summary"] == "摘要1"
+
+        # 已摘要的消息不再计入
+        assert service.summarize_pending(chat_session, min_turns=1) is False
+        add_turns(db_session, chat_session, 1)
+        assert service.summarize_pending(chat_session, min_turns=1) is True
+        assert "[之前的摘要]\n摘要1" in llm_calls[-1] and "消息0" in llm_calls[-1]
+        assert "消息1" not in llm_calls[-1]
+
+    def test_concurrent_update_is_discarded(self, db_session, chat_session, llm_calls, monkeypatch):
+        add_turns(db_session, chat_session, 2)
+
+        def racing_llm(self, prompt):
+            # 生成摘要期间另一进程已写入新版本
+            db_session.query(ChatSession).update({ChatSession.memory_summary_version: 5})
+            return "过期摘要"
+
+        monkeypatch.setattr(memory_service.VolcengineLLMWrapper, "__call__", racing_llm)
+        assert MemoryService(db_session).summarize_pending(chat_session) is False
+        db_session.expire_all()
+        assert db_session.query(ChatSession.memory_summary).filter_by(session_id=chat_session).scalar() is None
+
+    def test_notify_coalesces_and_bounds(self, db_session, chat_session, llm_calls, configure_llm, monkeypatch):
+        add_turns(db_session, chat_session, 2)
+        worker = SummaryWorker(
+            max_queue=1, min_turns=2, min_tokens=1000, consolidate_turns=2, session_factory=lambda: db_session
+        )
+        monkeypatch.setattr(worker, "_ensure_worker", lambda: None)
+
+        assert worker.notify(chat_session) is True
+        assert worker.notify(chat_session) is False  # 已在队列中，合并
+        assert worker.notify("other") is False  # 队列已满，丢弃
+
+        monkeypatch.undo()
+        configure_llm()
+        monkeypatch.setattr(memory_service.VolcengineLLMWrapper, "__call__", lambda self, prompt: "后台摘要")
+        worker._ensure_worker()
+        assert worker.join(timeout=5)
+        assert db_session.query(ChatSession.memory_summary).filter_by(session_id=chat_session).scalar() == "后台摘要"
+        # 处理完成后可再次入队
+        assert worker.notify(chat_session) is True
+        assert worker.join(timeout=5)
+
+    def test_failure_is_logged(self, chat_session, caplog):
+        def broken_session():
+            raise RuntimeError("db down")
+
+        worker = SummaryWorker(
+            max_queue=4, min_turns=2, min_tokens=1000, consolidate_turns=2, session_factory=broken_session
+        )
+        assert worker.notify(chat_session) is True
+        assert worker.join(timeout=5)
+        record = next(r for r in caplog.records if r.name == "app.services.summary_worker")
+        assert record.levelname == "ERROR" and record.exc_info is not None